@@ -1,27 +1,74 @@
 import os
+import logging
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from dotenv import load_dotenv  # 1. Importe o load_dotenv
 
-db = SQLAlchemy()
+_db = None
+
+
+def __getattr__(name):
+    # "from app import db" continua funcionando, mas o Flask-SQLAlchemy (~0.3s de
+    # import) só é carregado por quem realmente usa; nenhuma rota usa.
+    if name == "db":
+        return get_sqlalchemy()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_sqlalchemy():
+    global _db
+    if _db is None:
+        from flask_sqlalchemy import SQLAlchemy
+        _db = SQLAlchemy()
+    return _db
+
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
 
-    # 2. Carregue o config.env explicitamente
-    # Isso garante que as variáveis sejam lidas antes de usar o os.getenv abaixo
-    load_dotenv(os.path.join(os.getcwd(), 'config.env'))
+    # config.py carrega o config.env (uma única vez, no import)
+    from config import Config
+    app.config.from_object(Config)
 
     # Agora o DATABASE_URL será encontrado
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///../instance/users.db")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-    db.init_app(app)
+    from app.services.json_provider import create_json_provider
+    app.json = create_json_provider(app, app.config.get("JSON_PROVIDER", "orjson"),
+                                    app.config.get("JSON_DATETIME_FORMAT", "http"))
+
+    if app.config.get("SQLALCHEMY_ENABLED"):
+        get_sqlalchemy().init_app(app)
+
+    # Schema versionado: aplicado uma vez na subida, nunca durante as requisições.
+    # Falha aqui derruba a subida: as rotas dependem do schema novo (version, JSONB...)
+    # e um deploy meio migrado responderia 500 em tudo.
+    if app.config.get("AUTO_MIGRATE") and app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgres"):
+        run_startup_migrations(app)
 
     # Registrar blueprints
     from app.routes.session_routes import session_bp
     from app.routes.agente_control_routes import agente_control_bp
+    from app.routes.metrics_routes import metrics_bp
     app.register_blueprint(session_bp)
     app.register_blueprint(agente_control_bp)
+    app.register_blueprint(metrics_bp)
+
+    return app
+
+
+def run_startup_migrations(app):
+    try:
+        from db import get_db_connection
+        from migrate import run_migrations
+    except ImportError:
+        from ..db import get_db_connection
+        from ..migrate import run_migrations
 
-    return app
\ No newline at end of file
+    try:
+        with app.app_context(), get_db_connection() as conn:
+            applied = run_migrations(conn)
+        if applied:
+            logging.info(f"Schema migrations applied at startup: {applied}")
+    except Exception as e:
+        logging.error(f"Startup migrations failed, refusing to start: {e}")
+        raise
\ No newline at end of file
@@ -1,18 +1,50 @@
 import logging
-import os
-from flask import Blueprint, request, jsonify, current_app
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, url_for, current_app, Response, stream_with_context
 # from google import genai
 from config import Config
-from openai import OpenAI
 
 # Tenta importar a conexão do banco de dados
 try:
-    from db import create_connection
+    from db import get_db_connection, PoolTimeout
 except ImportError:
-    from ...db import create_connection
+    from ...db import get_db_connection, PoolTimeout
+
+from ..services.agent_jobs import JobQueueFull, get_job, get_job_runner
+from ..services.llm_cache import cached_chat_completion, stream_chat_completion
+from ..services.session_stats import PERFORMANCE_STATS_COLUMNS, SCORE_MAX, SCORE_MIN, performance_digest
+
+LLM_MODEL = "llama-3.3-70b-versatile"
 
 agente_control_bp = Blueprint('agente_control_bp', __name__)
 
+
+def _wants_async():
+    return request.args.get('async') in ('1', 'true')
+
+
+def _wants_stream():
+    return request.args.get('stream') in ('1', 'true')
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+
+def _submit_job(kind, params, fn, *args):
+    """Agenda ``fn(*args)`` no pool de jobs e responde 202 com a URL de acompanhamento."""
+    try:
+        job_id = get_job_runner().submit(kind, params, fn, *args)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+
+    status_url = url_for('agente_control_bp.get_agent_job', job_id=job_id)
+    return jsonify({
+        "job_id": job_id,
+        "status": "pending",
+        "status_url": status_url
+    }), 202, {"Location": status_url}
+
 # ... (Mantenha suas outras rotas existentes: create_session, etc.) ...
 
 # ==============================================================================
@@ -24,140 +56,244 @@ def agent_session_summary(session_id):
     Agente Control: Analisa os dados macro da sessão.
     Foco: Desempenho geral, adesão às atividades extras e status do plano de aula.
     Não analisa alunos individualmente.
+    Com ?async=1 responde 202 e o resumo é gerado em background (ver GET /jobs/<id>).
+    Com ?stream=1 responde em Server-Sent Events: 'metrics' imediatamente, um
+    'token' por trecho gerado pelo LLM e por fim 'summary' com o payload completo.
+    """
+    if _wants_async():
+        return _submit_job('agent_summary', {"session_id": session_id}, _session_summary, session_id)
+
+    if _wants_stream():
+        return _stream_session_summary(session_id)
+
+    try:
+        payload, status = _session_summary(session_id)
+        return jsonify(payload), status
+
+    except PoolTimeout:
+        raise  # 503 pelo handler do app, como nas rotas de sessão
+    except Exception as e:
+        logging.error(f"Erro no Agente Control Summary: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+SUMMARY_LLM_PARAMS = {"temperature": 0.2}  # response_format omitido para permitir texto livre
+
+SUMMARY_BATCH_MAX = 100
+# Chamadas LLM simultâneas por lote (o gateway ainda limita o total do processo)
+SUMMARY_BATCH_FANOUT = 4
+
+
+def _session_summary(session_id):
+    """Gera o resumo da sessão; retorna (payload, status HTTP)."""
+    context = _session_summary_context(session_id)
+    if context is None:
+        return {"error": "Sessão não encontrada"}, 404
+
+    # Chamada LLM (Groq via gateway compartilhado), reaproveitada quando os dados do prompt não mudaram
+    content_text, summary_cached = cached_chat_completion(LLM_MODEL, context["messages"], **SUMMARY_LLM_PARAMS)
+
+    return _summary_payload(context, content_text, summary_cached), 200
+
+
+@agente_control_bp.route('/sessions/agent_summary/batch', methods=['POST'])
+def agent_session_summary_batch():
+    """
+    Resumo de várias sessões (painel do coordenador). As métricas de todas
+    as sessões saem das mesmas 4 queries; as chamadas ao LLM rodam em
+    paralelo, no máximo SUMMARY_BATCH_FANOUT por vez. Falhas são reportadas
+    por sessão, sem derrubar o lote.
     """
-    conn = None
+    data = request.get_json(silent=True)
+    session_ids = data.get('session_ids') if isinstance(data, dict) else data
+
+    if not isinstance(session_ids, list) or not session_ids:
+        return jsonify({"error": "A non-empty list of session_ids is required"}), 400
+    if len(session_ids) > SUMMARY_BATCH_MAX:
+        return jsonify({"error": f"At most {SUMMARY_BATCH_MAX} sessions per batch"}), 400
+    try:
+        session_ids = list(dict.fromkeys(int(session_id) for session_id in session_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "session_ids must be integers"}), 400
+
     try:
-        # 1. Conexão
-        db_url = current_app.config.get("SQLALCHEMY_DATABASE_URI") or os.getenv("DATABASE_URL")
-        conn = create_connection(db_url)
-        
-        if not conn:
-            return jsonify({"error": "Falha na conexão com o banco de dados"}), 500
-
-        with conn.cursor() as cur:
-            # A. Dados da Sessão
-            cur.execute("""
-                SELECT status, start_time, current_tactic_index, rating_average, rating_count
-                FROM session 
-                WHERE id = %s
-            """, (session_id,))
-            session_info = cur.fetchone()
-
-            if not session_info:
-                return jsonify({"error": "Sessão não encontrada"}), 404
-
-            # B. Total de Estratégias no Plano
-            cur.execute("""
-                SELECT COUNT(*) as total 
-                FROM session_strategies 
-                WHERE session_id = %s
-            """, (session_id,))
-            total_strategies = cur.fetchone()['total']
-
-            # C. Notas dos Exercícios (Lista de inteiros)
-            # Pegamos apenas os scores para análise estatística
-            cur.execute("""
-                SELECT score 
-                FROM verified_answers 
-                WHERE session_id = %s
-            """, (session_id,))
-            exercise_rows = cur.fetchall()
-            # Ex: [10, 5, 8, 9]
-            exercise_scores = [row['score'] for row in exercise_rows]
-
-            # D. Notas Extras (Lista de floats)
-            cur.execute("""
-                SELECT extra_notes 
-                FROM extra_notes 
-                WHERE session_id = %s
-            """, (session_id,))
-            extra_rows = cur.fetchall()
-            # Ex: [9.5, 8.0]
-            extra_scores = [row['extra_notes'] for row in extra_rows]
-
-        # 2. Estatísticas Gerais (Cálculos Python)
-        total_exercises = len(exercise_scores)
-        avg_exercises = sum(exercise_scores) / total_exercises if total_exercises > 0 else 0
-        
-        total_extras = len(extra_scores)
-        avg_extras = sum(extra_scores) / total_extras if total_extras > 0 else 0
-
-        # 3. Engenharia de Prompt (Foco no Coletivo)
-        # Passamos as listas de notas para ele detectar padrões (ex: turma homogênea vs heterogênea)
-        prompt = f"""
-        Atue como o 'Agente de Memória' de uma plataforma de ensino.
-        Analise o estado geral desta Sessão de Ensino (ID {session_id}) para orientar o Orquestrador.
-        Não cite alunos. Foque na eficácia das estratégias e no desempenho da turma como um todo.
-
-        DADOS DA SESSÃO:
-        - Status: {session_info['status']}
-        - Progresso do Plano: {total_strategies} estratégias vinculadas.
-        - Avaliação Média da Turma: {session_info.get('rating_average', 0.0):.1f} estrelas ({session_info.get('rating_count', 0)} votos).
-        
-        DESEMPENHO NOS EXERCÍCIOS OBRIGATÓRIOS:
-        - Quantidade de respostas: {total_exercises}
-        - Média Geral: {avg_exercises:.1f} / 10
-        - Distribuição das Notas: {exercise_scores}
-        
-        DESEMPENHO NAS ATIVIDADES EXTRAS (BÔNUS):
-        - Quantidade de entregas: {total_extras}
-        - Média Geral: {avg_extras:.1f}
-        - Notas: {extra_scores}
-
-        OBJETIVO:
-        Gere um resumo narrativo curto (2-3 frases) respondendo:
-        1. O conteúdo obrigatório está sendo bem assimilado pela maioria?
-        2. Existe interesse/adesão ao conteúdo extra?
-        3. A sessão parece fluir bem ou está estagnada (poucas respostas)?
-        """
-
-        # 4. Chamada LLM (Groq)
-        client = OpenAI(
-            api_key=Config.GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1"
-        )
-        
-        # 2. Chamada LLM (Sem response_format JSON)
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "Você é um assistente pedagógico conciso."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2 
-            # response_format removido para permitir texto livre
-        )
-
-        content_text = response.choices[0].message.content
-
-        # 4. Chamada ao Gemini
-        # if not Config.GEMINI_API_KEY:
-        #      return jsonify({"error": "GEMINI_API_KEY não configurada"}), 500
-
-        # client = genai.Client(api_key=Config.GEMINI_API_KEY)
-        # response = client.models.generate_content(
-        #     model="gemini-2.5-flash-lite-preview-09-2025", 
-        #     contents=prompt
-        # )
-
-        # 5. Retorno
-        return jsonify({
-            "session_id": session_id,
-            "status": session_info['status'],
-            "summary": content_text,
-            "metrics": {
-                "exercise_avg": round(avg_exercises, 2),
-                "extra_avg": round(avg_extras, 2),
-                "participation_count": total_exercises + total_extras
-            }
-        }), 200
+        contexts = _load_summary_contexts(session_ids)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logging.error(f"Erro no Agente Control Summary (batch): {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
+    def summarize(context):
+        try:
+            content_text, summary_cached = cached_chat_completion(LLM_MODEL, context["messages"], **SUMMARY_LLM_PARAMS)
+        except Exception as e:
+            logging.warning(f"LLM Error in agent_summary batch (session {context['session_id']}): {e}")
+            return {"session_id": context["session_id"], "ok": False, "error": str(e), "metrics": context["metrics"]}
+        return {"ok": True, **_summary_payload(context, content_text, summary_cached)}
+
+    found = [contexts[session_id] for session_id in session_ids if session_id in contexts]
+    with ThreadPoolExecutor(max_workers=min(SUMMARY_BATCH_FANOUT, len(found) or 1)) as executor:
+        summaries = {result["session_id"]: result for result in executor.map(summarize, found)}
+
+    results = [
+        summaries.get(session_id) or {"session_id": session_id, "ok": False, "error": "Sessão não encontrada"}
+        for session_id in session_ids
+    ]
+    failed = sum(1 for result in results if not result["ok"])
+    return jsonify({
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed
+    }), 200
+
+
+def _stream_session_summary(session_id):
+    try:
+        context = _session_summary_context(session_id)
+    except PoolTimeout:
+        raise
     except Exception as e:
         logging.error(f"Erro no Agente Control Summary: {str(e)}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
+    if context is None:
+        return jsonify({"error": "Sessão não encontrada"}), 404
+
+    def stream():
+        # Métricas já calculadas saem antes de qualquer token do LLM
+        yield _sse('metrics', {
+            "session_id": context["session_id"],
+            "status": context["status"],
+            "metrics": context["metrics"]
+        })
+        try:
+            chunks, summary_cached = stream_chat_completion(LLM_MODEL, context["messages"], **SUMMARY_LLM_PARAMS)
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk)
+                yield _sse('token', {"text": chunk})
+        except Exception as e:
+            logging.error(f"Erro no Agente Control Summary (stream): {str(e)}")
+            yield _sse('error', {"error": str(e)})
+            return
+        yield _sse('summary', _summary_payload(context, "".join(parts), summary_cached))
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def _summary_payload(context, content_text, summary_cached):
+    return {
+        "session_id": context["session_id"],
+        "status": context["status"],
+        "summary": content_text,
+        "summary_cached": summary_cached,
+        "metrics": context["metrics"]
+    }
+
+
+def _session_summary_context(session_id):
+    """Lê os dados da sessão e monta o prompt; None se a sessão não existe."""
+    return _load_summary_contexts([session_id]).get(session_id)
+
+
+def _load_summary_contexts(session_ids):
+    """
+    Contexto (métricas + prompt) de várias sessões em uma única query: as
+    notas vêm dos agregados de session_performance_stats, não das linhas.
+    Sessões inexistentes ficam de fora.
+    """
+    # 1. Conexão (devolvida ao pool antes da chamada ao LLM)
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT s.id, s.status, s.start_time, s.current_tactic_index, s.rating_average, s.rating_count,
+                   (SELECT COUNT(*) FROM session_strategies ss WHERE ss.session_id = s.id) AS total_strategies,
+                   {PERFORMANCE_STATS_COLUMNS}
+            FROM session s
+            LEFT JOIN session_performance_stats p ON p.session_id = s.id
+            WHERE s.id = ANY(%s)
+        """, (list(session_ids),))
+        rows = cur.fetchall()
+
+    return {row['id']: _build_summary_context(row['id'], row) for row in rows}
+
+
+def _format_histogram(scores):
+    text = ", ".join(f"notas {label}: {count}" for label, count in scores["histogram"].items()) or "sem respostas"
+    if scores.get("out_of_range"):
+        text += f" ({scores['out_of_range']} fora da faixa {SCORE_MIN}-{SCORE_MAX}, contadas nas pontas)"
+    return text
+
+
+def _format_range(distribution):
+    if not distribution["count"]:
+        return "sem notas"
+    return (f"desvio padrão {distribution['stddev']:.1f}, "
+            f"mínima {distribution['min']:g}, máxima {distribution['max']:g}")
+
+
+def _build_summary_context(session_id, session_info):
+    # 2. Estatísticas Gerais (pré-calculadas a cada nota gravada)
+    digest = performance_digest(session_info)
+    scores, extras = digest["scores"], digest["extras"]
+    total_exercises, avg_exercises = scores["count"], scores["avg"]
+    total_extras, avg_extras = extras["count"], extras["avg"]
+    total_strategies = session_info.get('total_strategies') or 0
+
+    # 3. Engenharia de Prompt (Foco no Coletivo)
+    # Passamos a distribuição das notas para ele detectar padrões (ex: turma homogênea vs heterogênea)
+    prompt = f"""
+    Atue como o 'Agente de Memória' de uma plataforma de ensino.
+    Analise o estado geral desta Sessão de Ensino (ID {session_id}) para orientar o Orquestrador.
+    Não cite alunos. Foque na eficácia das estratégias e no desempenho da turma como um todo.
+
+    DADOS DA SESSÃO:
+    - Status: {session_info['status']}
+    - Progresso do Plano: {total_strategies} estratégias vinculadas.
+    - Avaliação Média da Turma: {session_info.get('rating_average', 0.0):.1f} estrelas ({session_info.get('rating_count', 0)} votos).
+    
+    DESEMPENHO NOS EXERCÍCIOS OBRIGATÓRIOS:
+    - Quantidade de respostas: {total_exercises}
+    - Média Geral: {avg_exercises:.1f} / {SCORE_MAX} ({_format_range(scores)})
+    - Distribuição das Notas: {_format_histogram(scores)}
+    
+    DESEMPENHO NAS ATIVIDADES EXTRAS (BÔNUS):
+    - Quantidade de entregas: {total_extras}
+    - Média Geral: {avg_extras:.1f}
+    - Notas: {_format_range(extras)}
+
+    OBJETIVO:
+    Gere um resumo narrativo curto (2-3 frases) respondendo:
+    1. O conteúdo obrigatório está sendo bem assimilado pela maioria?
+    2. Existe interesse/adesão ao conteúdo extra?
+    3. A sessão parece fluir bem ou está estagnada (poucas respostas)?
+    """
+
+    messages = [
+        {"role": "system", "content": "Você é um assistente pedagógico conciso."},
+        {"role": "user", "content": prompt}
+    ]
+
+    # 4. Chamada ao Gemini
+    # if not Config.GEMINI_API_KEY:
+    #      return jsonify({"error": "GEMINI_API_KEY não configurada"}), 500
+
+    # client = genai.Client(api_key=Config.GEMINI_API_KEY)
+    # response = client.models.generate_content(
+    #     model="gemini-2.5-flash-lite-preview-09-2025", 
+    #     contents=prompt
+    # )
+
+    return {
+        "session_id": session_id,
+        "status": session_info['status'],
+        "messages": messages,
+        "metrics": {
+            "exercise_avg": round(avg_exercises, 2),
+            "extra_avg": round(avg_extras, 2),
+            "participation_count": total_exercises + total_extras
+        }
+    }
 
 
 @agente_control_bp.route('/students/<string:student_id>/grades_history', methods=['GET'])
@@ -165,122 +301,159 @@ def get_student_grades_history(student_id):
     """
     Retorna o histórico completo de notas de um aluno específico (pelo ID),
     agrupado por Session ID.
+    Com ?async=1 responde 202 e a análise é gerada em background (ver GET /jobs/<id>).
     """
-    conn = None
+    if _wants_async():
+        return _submit_job('grades_history', {"student_id": student_id}, _student_grades_history, student_id)
+
     try:
-        db_url = current_app.config.get("SQLALCHEMY_DATABASE_URI") or os.getenv("DATABASE_URL")
-        conn = create_connection(db_url)
-        
-        if not conn:
-            return jsonify({"error": "Falha na conexão com o banco"}), 500
-
-        with conn.cursor() as cur:
-            # Estrutura: { "session_id": { "notes": [], "extra_notes": [] } }
-            history_map = {}
-
-            # ---------------------------------------------------------
-            # 1. Buscar Notas de Exercícios (Verified Answers)
-            # ---------------------------------------------------------
-            # Filtramos pelo student_id (muito mais seguro que nome)
-            cur.execute("""
-                SELECT session_id, score 
-                FROM verified_answers 
-                WHERE student_id = %s
-            """, (student_id,))
-            
-            answers = cur.fetchall()
-            for row in answers:
-                # Tratamento seguro (Dict vs Tupla)
-                sess_id = row['session_id'] if isinstance(row, dict) else row[0]
-                val = row['score'] if isinstance(row, dict) else row[1]
-                
-                # O ID da sessão vira a chave (convertido para string para o JSON)
-                sess_key = str(sess_id)
-                
-                if sess_key not in history_map:
-                    history_map[sess_key] = {"notes": [], "extra_notes": []}
-                
-                history_map[sess_key]["notes"].append(val)
-
-            # ---------------------------------------------------------
-            # 2. Buscar Notas Extras (Extra Notes)
-            # ---------------------------------------------------------
-            # Filtramos pelo ID (ajustando a query para student_id)
-            cur.execute("""
-                SELECT session_id, extra_notes 
-                FROM extra_notes 
-                WHERE student_id = %s
-            """, (int(student_id) if student_id.isdigit() else 0,))
-            
-            extras = cur.fetchall()
-            for row in extras:
-                # Tratamento seguro (Dict vs Tupla)
-                sess_id = row['session_id'] if isinstance(row, dict) else row[0]
-                # Nota: no seu banco a coluna de valor chama-se 'extra_notes' também
-                val = row['extra_notes'] if isinstance(row, dict) else row[1]
-                
-                sess_key = str(sess_id)
-                
-                if sess_key not in history_map:
-                    history_map[sess_key] = {"notes": [], "extra_notes": []}
-                
-                history_map[sess_key]["extra_notes"].append(val)
-
-            # ---------------------------------------------------------
-            # 3. Buscar Avaliações do Aluno (Ratings)
-            # ---------------------------------------------------------
-            cur.execute("""
-                SELECT session_id, rating
-                FROM session_ratings
-                WHERE student_id = %s
-            """, (student_id,))
-
-            ratings = cur.fetchall()
-            for row in ratings:
-                sess_id = row['session_id'] if isinstance(row, dict) else row[0]
-                val = row['rating'] if isinstance(row, dict) else row[1]
-
-                sess_key = str(sess_id)
-                if sess_key not in history_map:
-                    history_map[sess_key] = {"notes": [], "extra_notes": []}
-
-                history_map[sess_key]["student_rating"] = val
-
-        # 3. LLM Analysis
-        analysis_text = "Análise indisponível"
-        try:
-            if getattr(Config, 'GROQ_API_KEY', None):
-                client = OpenAI(
-                    api_key=Config.GROQ_API_KEY,
-                    base_url="https://api.groq.com/openai/v1"
-                )
-                prompt = f"""
-                Você é um analista de desempenho escolar.
-                Analise as notas e identifique tendências (melhora, piora, estagnação) e pontos de atenção.
-
-                Dados brutos (Sessão -> Notas):
-                {history_map}
-
-                Responda com um parágrafo conciso.
-                """
-
-                resp = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2
-                )
-                analysis_text = resp.choices[0].message.content
-        except Exception as llm_err:
-            logging.warning(f"LLM Error in grades_history: {llm_err}")
-
-        return jsonify({
-            "student_performance_summary": analysis_text,
-            "raw_history_by_session": history_map
-        }), 200
+        payload, status = _student_grades_history(student_id)
+        return jsonify(payload), status
 
+    except PoolTimeout:
+        raise
     except Exception as e:
-        logging.error(f"Erro ao buscar histórico do aluno {username}: {str(e)}")
+        logging.error(f"Erro ao buscar histórico do aluno {student_id}: {str(e)}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+
+
+GRADES_HISTORY_BATCH_MAX = 100
+
+# Uma linha por (aluno, sessão). Cada ramo do UNION ALL preenche só a sua coluna,
+# então notes (INTEGER), extra_notes (FLOAT) e student_rating mantêm seus tipos.
+GRADES_HISTORY_SQL = """
+    WITH grades AS (
+        SELECT student_id, session_id, id AS ord,
+               score, NULL::float AS extra_note, NULL::integer AS rating
+        FROM verified_answers
+        WHERE student_id = ANY(%(ids)s)
+        UNION ALL
+        SELECT student_id::text, session_id, id,
+               NULL, extra_notes, NULL
+        FROM extra_notes
+        WHERE student_id = ANY(%(int_ids)s)
+        UNION ALL
+        SELECT student_id, session_id, id,
+               NULL, NULL, rating
+        FROM session_ratings
+        WHERE student_id = ANY(%(ids)s)
+    )
+    SELECT student_id, session_id,
+           COALESCE(array_agg(score ORDER BY ord) FILTER (WHERE score IS NOT NULL), '{}') AS notes,
+           COALESCE(array_agg(extra_note ORDER BY ord) FILTER (WHERE extra_note IS NOT NULL), '{}') AS extra_notes,
+           MAX(rating) AS student_rating
+    FROM grades
+    GROUP BY student_id, session_id
+    ORDER BY student_id, session_id
+"""
+
+
+def _load_grades_history(student_ids):
+    """
+    Histórico de vários alunos em uma única query:
+    { student_id: { "session_id": { "notes": [], "extra_notes": [], "student_rating"?: n } } }
+    """
+    student_ids = [str(student_id) for student_id in student_ids]
+    histories = {student_id: {} for student_id in student_ids}
+
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute(GRADES_HISTORY_SQL, {
+            "ids": student_ids,
+            # extra_notes.student_id é INTEGER
+            "int_ids": [int(student_id) for student_id in student_ids if student_id.isdigit()],
+        })
+        rows = cur.fetchall()
+
+    for row in rows:
+        entry = {"notes": list(row['notes']), "extra_notes": list(row['extra_notes'])}
+        if row['student_rating'] is not None:
+            entry["student_rating"] = row['student_rating']
+        # O ID da sessão vira a chave (convertido para string para o JSON)
+        histories.setdefault(str(row['student_id']), {})[str(row['session_id'])] = entry
+
+    return histories
+
+
+def _grades_analysis(history_map):
+    analysis_text = "Análise indisponível"
+    try:
+        if getattr(Config, 'GROQ_API_KEY', None):
+            prompt = f"""
+            Você é um analista de desempenho escolar.
+            Analise as notas e identifique tendências (melhora, piora, estagnação) e pontos de atenção.
+
+            Dados brutos (Sessão -> Notas):
+            {history_map}
+
+            Responda com um parágrafo conciso.
+            """
+
+            analysis_text, _ = cached_chat_completion(
+                LLM_MODEL,
+                [{"role": "user", "content": prompt}],
+                temperature=0.2
+            )
+    except Exception as llm_err:
+        logging.warning(f"LLM Error in grades_history: {llm_err}")
+    return analysis_text
+
+
+def _student_grades_history(student_id):
+    """Monta o histórico e a análise do aluno; retorna (payload, status HTTP)."""
+    history_map = _load_grades_history([student_id])[str(student_id)]
+
+    return {
+        "student_performance_summary": _grades_analysis(history_map),
+        "raw_history_by_session": history_map
+    }, 200
+
+
+@agente_control_bp.route('/students/grades_history', methods=['GET'])
+def get_students_grades_history():
+    """
+    Histórico de notas de vários alunos (?ids=1,2,3), em uma única query.
+    A análise do LLM é opcional (?analysis=1), feita em paralelo por aluno.
+    """
+    student_ids = [part.strip() for value in request.args.getlist('ids') for part in value.split(',') if part.strip()]
+    student_ids = list(dict.fromkeys(student_ids))
+
+    if not student_ids:
+        return jsonify({"error": "Query parameter ids is required (ex: ?ids=1,2,3)"}), 400
+    if len(student_ids) > GRADES_HISTORY_BATCH_MAX:
+        return jsonify({"error": f"At most {GRADES_HISTORY_BATCH_MAX} students per request"}), 400
+
+    try:
+        histories = _load_grades_history(student_ids)
+    except PoolTimeout:
+        raise
+    except Exception as e:
+        logging.error(f"Erro ao buscar histórico dos alunos {student_ids}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    students = {student_id: {"raw_history_by_session": histories[student_id]} for student_id in student_ids}
+
+    if request.args.get('analysis') in ('1', 'true'):
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_BATCH_FANOUT, len(student_ids))) as executor:
+            analyses = executor.map(_grades_analysis, [histories[student_id] for student_id in student_ids])
+            for student_id, analysis_text in zip(student_ids, analyses):
+                students[student_id]["student_performance_summary"] = analysis_text
+
+    return jsonify({"students": students}), 200
+
+
+# ==============================================================================
+# JOBS ASSÍNCRONOS (?async=1 nas rotas acima)
+# ==============================================================================
+@agente_control_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_agent_job(job_id):
+    """
+    Estado de um job. Enquanto status for pending/running, o cliente repete o GET;
+    em done, "result" traz o mesmo corpo que a rota síncrona teria devolvido.
+    """
+    with get_db_connection() as conn, conn.cursor() as cur:
+        job = get_job(cur, job_id)
+
+    if not job:
+        return jsonify({"error": "Job não encontrado"}), 404
+
+    return jsonify(job), 200
@@ -0,0 +1,28 @@
+from flask import Blueprint, jsonify
+
+try:
+    from db import pool_stats
+except ImportError:
+    from ...db import pool_stats
+
+from ..services.agent_jobs import job_runner_stats
+from ..services.answer_writes import answer_buffer_stats
+from ..services.cache import session_cache_stats
+from ..services.llm_cache import llm_cache_stats
+from ..services.llm_gateway import llm_gateway_stats
+from ..services.session_events import event_hub_stats
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({
+        "db_pool": pool_stats(),
+        "session_events": event_hub_stats(),
+        "session_cache": session_cache_stats(),
+        "llm_cache": llm_cache_stats(),
+        "llm_gateway": llm_gateway_stats(),
+        "agent_jobs": job_runner_stats(),
+        "answer_buffer": answer_buffer_stats()
+    }), 200
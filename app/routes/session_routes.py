@@ -3,137 +3,51 @@ import sys
 import json
 import random
 import string
-import os
-from flask import Blueprint, request, jsonify, current_app
+import queue
+from concurrent.futures import TimeoutError as FuturesTimeout
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
-from contextlib import contextmanager
+from psycopg2.extras import execute_values
 
 try:
-    from db import create_connection
+    from db import get_db_connection, PoolTimeout
 except ImportError:
-    from ...db import create_connection
+    from ...db import get_db_connection, PoolTimeout
+
+from ..services.answer_writes import (
+    AnswerBufferFull, get_answer_buffer, insert_answers, parse_answer, write_behind_enabled
+)
+from ..services.session_loader import (
+    InvalidFields, invalidate_sessions, load_session_details, load_session_details_cached,
+    parse_session_fields, session_fields_etag_suffix
+)
+from ..services.session_events import (
+    HUB_STOPPED, get_event_hub, load_session_state, notify_sql, publish_session_event
+)
+from ..services.session_stats import (
+    record_score, record_extra_note, refresh_extra_note_stats, reset_score_stats
+)
+from ..services.session_versions import (
+    VERSION_BUMP_SQL, bump_session_version, get_session_version, get_sessions_list_etag, session_etag
+)
 
 session_bp = Blueprint('session_bp', __name__)
 
 def generate_unique_code(length=8):
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
-@contextmanager
-def get_db_connection():
-    db_url = current_app.config.get("SQLALCHEMY_DATABASE_URI") or os.getenv("DATABASE_URL")
-    conn = create_connection(db_url)
-    if conn is None:
-        raise Exception("Failed to connect to database")
-    try:
-        yield conn
-    finally:
-        conn.close()
-
-def ensure_rating_tables(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS session_ratings (
-                id SERIAL PRIMARY KEY,
-                session_id INTEGER NOT NULL,
-                student_id VARCHAR(50) NOT NULL,
-                rating INTEGER NOT NULL,
-                CONSTRAINT fk_rating_session FOREIGN KEY (session_id) REFERENCES session(id) ON DELETE CASCADE,
-                UNIQUE(session_id, student_id)
-            );
-        """)
-        try:
-            cur.execute("ALTER TABLE session ADD COLUMN IF NOT EXISTS rating_average FLOAT DEFAULT 0.0")
-            cur.execute("ALTER TABLE session ADD COLUMN IF NOT EXISTS rating_count INTEGER DEFAULT 0")
-        except Exception as e:
-            conn.rollback()
-            logging.warning(f"Columns ensure error (ignored): {e}")
-        conn.commit()
-
-def get_session_details(conn, session_id):
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM session WHERE id = %s", (session_id,))
-        session = cur.fetchone()
-
-        if not session:
-            return None
-
-        cur.execute("SELECT strategy_id FROM session_strategies WHERE session_id = %s", (session_id,))
-        strategies = [row['strategy_id'] for row in cur.fetchall()]
-
-        cur.execute("SELECT teacher_id FROM session_teachers WHERE session_id = %s", (session_id,))
-        teachers = [row['teacher_id'] for row in cur.fetchall()]
-
-        cur.execute("SELECT student_id FROM session_students WHERE session_id = %s", (session_id,))
-        students = [row['student_id'] for row in cur.fetchall()]
-
-        cur.execute("SELECT domain_id FROM session_domains WHERE session_id = %s", (session_id,))
-        domains = [row['domain_id'] for row in cur.fetchall()]
-
-        cur.execute("SELECT * FROM verified_answers WHERE session_id = %s", (session_id,))
-        verified_answers = cur.fetchall()
-
-        cur.execute("SELECT * FROM extra_notes WHERE session_id = %s", (session_id,))
-        extra_notes = cur.fetchall()
-
-        session_dict = dict(session)
-        session_dict['use_agent'] = session.get('use_agent', False)
-        session_dict['end_on_next_completion'] = session.get('end_on_next_completion', False)
-
-        # Rating fields might not be in dict if row factory doesn't include them yet (lazy migration)
-        # But 'dict(session)' from RealDictCursor should include them if columns exist.
-        # We handle defaults just in case
-        session_dict['rating_average'] = session.get('rating_average', 0.0)
-        session_dict['rating_count'] = session.get('rating_count', 0)
-
-        try:
-            session_dict['executed_indices'] = json.loads(session.get('executed_indices', '[]'))
-        except:
-            session_dict['executed_indices'] = []
-
-        session_dict['strategies'] = strategies
-        session_dict['teachers'] = teachers
-        session_dict['students'] = students
-        session_dict['domains'] = domains
-        session_dict['verified_answers'] = [dict(va) for va in verified_answers]
-        session_dict['extra_notes'] = [dict(en) for en in extra_notes]
-
-        return session_dict
+@session_bp.app_errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    logging.warning(f"Database pool exhausted: {e}")
+    return jsonify({"error": "Database busy, try again"}), 503
 
-def ensure_end_flag_column(conn):
-    with conn.cursor() as cur:
-        try:
-            cur.execute("ALTER TABLE session ADD COLUMN IF NOT EXISTS end_on_next_completion BOOLEAN DEFAULT FALSE")
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logging.warning(f"Note on ensure_end_flag_column: {e}")
-
-def ensure_executed_indices_column(conn):
-    with conn.cursor() as cur:
-        try:
-            cur.execute("ALTER TABLE session ADD COLUMN IF NOT EXISTS executed_indices TEXT DEFAULT '[]'")
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logging.warning(f"Note on ensure_executed_indices_column: {e}")
-
-def update_executed_indices(conn, session_id):
-    with conn.cursor() as cur:
-        cur.execute("SELECT current_tactic_index, executed_indices FROM session WHERE id = %s", (session_id,))
-        row = cur.fetchone()
-
-        if row:
-            current_idx = row['current_tactic_index']
-            try:
-                history = json.loads(row['executed_indices'] or '[]')
-            except:
-                history = []
-
-            if not history or history[-1] != current_idx:
-                history.append(current_idx)
-
-            cur.execute("UPDATE session SET executed_indices = %s WHERE id = %s", (json.dumps(history), session_id))
-            conn.commit()
+# Appends the current tactic to the JSONB history unless it is already the last entry
+APPEND_CURRENT_TACTIC_SQL = """
+    CASE WHEN executed_indices -> -1 = to_jsonb(COALESCE(current_tactic_index, 0))
+         THEN executed_indices
+         ELSE COALESCE(executed_indices, '[]'::jsonb) || to_jsonb(COALESCE(current_tactic_index, 0))
+    END
+"""
 
 def _end_session(conn, session_id):
     with conn.cursor() as cur:
@@ -148,92 +62,241 @@ def _end_session(conn, session_id):
             cur.execute("INSERT INTO session_strategies (session_id, strategy_id) VALUES (%s, %s)",
                        (session_id, str(original_strategy_id)))
 
-            cur.execute("UPDATE session SET status = 'finished', original_strategy_id = NULL WHERE id = %s", (session_id,))
+            cur.execute(f"UPDATE session SET status = 'finished', original_strategy_id = NULL, {VERSION_BUMP_SQL} WHERE id = %s", (session_id,))
         else:
-            cur.execute("UPDATE session SET status = 'finished' WHERE id = %s", (session_id,))
+            cur.execute(f"UPDATE session SET status = 'finished', {VERSION_BUMP_SQL} WHERE id = %s", (session_id,))
 
+        publish_session_event(cur, session_id, 'finished')
         conn.commit()
+        invalidate_sessions(session_id)
     return True
 
 @session_bp.route('/sessions/<int:session_id>/set_end_flag', methods=['POST'])
 def set_end_flag(session_id):
     with get_db_connection() as conn:
-        ensure_end_flag_column(conn)
         with conn.cursor() as cur:
-             cur.execute("UPDATE session SET end_on_next_completion = TRUE WHERE id = %s", (session_id,))
+             cur.execute(f"UPDATE session SET end_on_next_completion = TRUE, {VERSION_BUMP_SQL} WHERE id = %s", (session_id,))
              conn.commit()
+             invalidate_sessions(session_id)
     return jsonify({"success": True}), 200
 
+SESSION_CREATE_BATCH_MAX = 1000
+SESSION_CODE_MAX_ATTEMPTS = 10
+
+# (chave no JSON de criação, tabela, coluna)
+SESSION_CREATE_LINKS = (
+    ('strategies', 'session_strategies', 'strategy_id'),
+    ('teachers', 'session_teachers', 'teacher_id'),
+    ('students', 'session_students', 'student_id'),
+    ('domains', 'session_domains', 'domain_id'),
+)
+
+def _insert_session_rows(cur, count):
+    """
+    Inserts ``count`` sessions with fresh random codes and no probing: the
+    UNIQUE constraint on session.code rejects collisions (ON CONFLICT DO
+    NOTHING) and only the rejected rows are retried with new codes.
+    Concurrent creators are serialized by the unique index itself.
+    Returns [{"id", "code"}].
+    """
+    created = []
+    for _ in range(SESSION_CODE_MAX_ATTEMPTS):
+        missing = count - len(created)
+        if missing == 0:
+            return created
+
+        codes = set()
+        while len(codes) < missing:
+            codes.add(generate_unique_code())
+
+        created.extend(execute_values(cur, """
+            INSERT INTO session (status, code, current_tactic_index)
+            VALUES %s
+            ON CONFLICT (code) DO NOTHING
+            RETURNING id, code
+        """, [('aguardando', code, 0) for code in codes], page_size=len(codes), fetch=True))
+
+    if len(created) < count:
+        raise Exception("Could not allocate unique session codes")
+    return created
+
+def _create_sessions(cur, specs):
+    """
+    Inserts every spec (dict with strategies/teachers/students/domains) using
+    one multi-row INSERT per table. Returns [{"id", "code"}] in spec order.
+    """
+    created = [{"id": row['id'], "code": row['code']} for row in _insert_session_rows(cur, len(specs))]
+
+    for key, table, column in SESSION_CREATE_LINKS:
+        link_rows = [(session['id'], value)
+                     for session, spec in zip(created, specs)
+                     for value in dict.fromkeys(str(v) for v in spec.get(key) or [])]
+        if link_rows:
+            execute_values(cur, f"INSERT INTO {table} (session_id, {column}) VALUES %s",
+                           link_rows, page_size=len(link_rows))
+    return created
+
 @session_bp.route('/sessions/create', methods=['POST'])
 def create_session():
     data = request.get_json()
     strategies = data.get('strategies', [])
-    teachers = data.get('teachers', [])
-    students = data.get('students', [])
-    domains = data.get('domains', [])
 
     if not strategies:
         return jsonify({"error": "Strategies not provided"}), 400
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            while True:
-                code = generate_unique_code()
-                cur.execute("SELECT 1 FROM session WHERE code = %s", (code,))
-                if not cur.fetchone():
-                    break
+            _create_sessions(cur, [data])
+            conn.commit()
+
+    return jsonify({"success": "Session created!"}), 200
+
+@session_bp.route('/sessions/create_batch', methods=['POST'])
+def create_sessions_batch():
+    data = request.get_json()
+    specs = data.get('sessions') if isinstance(data, dict) else data
+
+    if not isinstance(specs, list) or not specs:
+        return jsonify({"error": "A non-empty list of sessions is required"}), 400
+    if len(specs) > SESSION_CREATE_BATCH_MAX:
+        return jsonify({"error": f"At most {SESSION_CREATE_BATCH_MAX} sessions per batch"}), 400
 
-            cur.execute("""
-                INSERT INTO session (status, code, current_tactic_index)
-                VALUES (%s, %s, %s)
-                RETURNING id
-            """, ('aguardando', code, 0))
-            session_id = cur.fetchone()['id']
-
-            if strategies:
-                cur.executemany("INSERT INTO session_strategies (session_id, strategy_id) VALUES (%s, %s)",
-                                [(session_id, str(s)) for s in strategies])
-            if teachers:
-                cur.executemany("INSERT INTO session_teachers (session_id, teacher_id) VALUES (%s, %s)",
-                                [(session_id, str(t)) for t in teachers])
-            if students:
-                cur.executemany("INSERT INTO session_students (session_id, student_id) VALUES (%s, %s)",
-                                [(session_id, str(s)) for s in students])
-            if domains:
-                cur.executemany("INSERT INTO session_domains (session_id, domain_id) VALUES (%s, %s)",
-                                [(session_id, str(d)) for d in domains])
+    invalid = [i for i, spec in enumerate(specs) if not isinstance(spec, dict) or not spec.get('strategies')]
+    if invalid:
+        return jsonify({"error": "Strategies not provided", "invalid_indexes": invalid}), 400
 
+    # Uma única transação: ou todas as sessões são criadas, ou nenhuma
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            created = _create_sessions(cur, specs)
             conn.commit()
 
-    return jsonify({"success": "Session created!"}), 200
+    return jsonify({"success": f"{len(created)} sessions created!", "sessions": created}), 201
+
+SESSIONS_PAGE_DEFAULT_LIMIT = 50
+SESSIONS_PAGE_MAX_LIMIT = 500
+SESSIONS_STREAM_BATCH_SIZE = 200
+
+def _parse_int_arg(name):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    return int(value)
+
+def _session_fields():
+    # ?fields=status,code,current_tactic_index e/ou ?include=students,verified_answers
+    return parse_session_fields(request.args.get('fields'), request.args.get('include'))
+
+def _wants_ndjson():
+    return (request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson')
+
+def _stream_sessions_ndjson(after_id, fields=None):
+    # Named (server-side) cursor: only one batch of ids and details is in memory at a time
+    with get_db_connection() as conn:
+        with conn.cursor(name='list_sessions_stream') as ids_cur:
+            ids_cur.itersize = SESSIONS_STREAM_BATCH_SIZE
+            ids_cur.execute("SELECT id FROM session WHERE id > %s ORDER BY id", (after_id or 0,))
+            while True:
+                rows = ids_cur.fetchmany(SESSIONS_STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                for session in load_session_details(conn, [row['id'] for row in rows], fields):
+                    yield current_app.json.dumps(session) + "\n"
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate with If-None-Match
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _not_modified(etag):
+    if etag in request.if_none_match:
+        return _with_etag(Response(status=304), etag)
+    return None
 
 @session_bp.route('/sessions', methods=['GET'])
 def list_sessions():
+    try:
+        after_id = _parse_int_arg('after_id')
+        limit = _parse_int_arg('limit')
+    except ValueError:
+        return jsonify({"error": "after_id and limit must be integers"}), 400
+    try:
+        fields = _session_fields()
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    fields_suffix = session_fields_etag_suffix(fields)
+
+    if _wants_ndjson():
+        return Response(stream_with_context(_stream_sessions_ndjson(after_id, fields)),
+                        mimetype='application/x-ndjson')
+
+    # Sem paginação: lista completa, formato original
+    if after_id is None and limit is None:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                etag = get_sessions_list_etag(cur, suffix=fields_suffix)
+                not_modified = _not_modified(etag)
+                if not_modified:
+                    return not_modified
+
+                cur.execute("SELECT id, version FROM session ORDER BY id")
+                session_versions = [(row['id'], row['version']) for row in cur.fetchall()]
+
+            all_sessions = load_session_details_cached(conn, session_versions, fields)
+
+        return _with_etag(jsonify(all_sessions), etag)
+
+    # Keyset pagination: WHERE id > cursor usa o índice da PK, sem OFFSET
+    limit = min(max(limit or SESSIONS_PAGE_DEFAULT_LIMIT, 1), SESSIONS_PAGE_MAX_LIMIT)
     with get_db_connection() as conn:
-        ensure_rating_tables(conn) # Ensure tables exist when listing (lazy init)
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM session")
-            rows = cur.fetchall()
+            etag = get_sessions_list_etag(cur, after_id, suffix=f"-a{after_id or 0}-n{limit}{fields_suffix}")
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
+            cur.execute("SELECT id, version FROM session WHERE id > %s ORDER BY id LIMIT %s", (after_id or 0, limit + 1))
+            session_versions = [(row['id'], row['version']) for row in cur.fetchall()]
 
-            all_sessions = []
-            for row in rows:
-                details = get_session_details(conn, row['id'])
-                if details:
-                    all_sessions.append(details)
+        has_more = len(session_versions) > limit
+        session_versions = session_versions[:limit]
+        sessions = load_session_details_cached(conn, session_versions, fields)
 
-    return jsonify(all_sessions)
+    return _with_etag(jsonify({
+        "sessions": sessions,
+        "next_cursor": session_versions[-1][0] if has_more else None
+    }), etag)
 
 @session_bp.route('/sessions/<int:session_id>', methods=['GET'])
 def get_session_by_id(session_id):
+    try:
+        fields = _session_fields()
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+    fields_suffix = session_fields_etag_suffix(fields)
+
     with get_db_connection() as conn:
-        ensure_rating_tables(conn)
-        session_dict = get_session_details(conn, session_id)
+        # Uma consulta barata à versão antes da carga completa (ou do cache)
+        with conn.cursor() as cur:
+            version = get_session_version(cur, session_id)
+        if version is None:
+            return jsonify({"error": "Session not found"}), 404
+
+        # Cada projeção é uma representação diferente: ETag própria
+        not_modified = _not_modified(session_etag(session_id, version) + fields_suffix)
+        if not_modified:
+            return not_modified
+
+        sessions = load_session_details_cached(conn, [(session_id, version)], fields)
+        session_dict = sessions[0] if sessions else None
 
     if session_dict:
-        return jsonify(session_dict), 200
-        
+        return _with_etag(jsonify(session_dict), session_etag(session_id, session_dict['version']) + fields_suffix)
+
     return jsonify({"error": "Session not found"}), 404
-    
+
 
 @session_bp.route('/sessions/delete/<int:session_id>', methods=['DELETE']) 
 def delete_session(session_id):
@@ -245,6 +308,7 @@ def delete_session(session_id):
 
             cur.execute("DELETE FROM session WHERE id = %s", (session_id,))
             conn.commit()
+            invalidate_sessions(session_id)
 
     return jsonify({"success": "Session deleted!"}), 200
 
@@ -260,28 +324,77 @@ def get_session_status(session_id):
     return jsonify({"error": "Session not found"}), 404
 
 
+SSE_HEARTBEAT_SECONDS = 15
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+@session_bp.route('/sessions/<int:session_id>/events', methods=['GET'])
+def session_events(session_id):
+    """
+    Server-Sent Events: a 'snapshot' with the current state, then one event
+    per change (started, tactic_changed, strategy_changed, domain_changed,
+    finished) delivered through PostgreSQL LISTEN/NOTIFY.
+    """
+    hub = get_event_hub()
+    # Subscribe before reading the snapshot so no change falls in between
+    events = hub.subscribe(session_id)
+    try:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                state = load_session_state(cur, session_id)
+    except Exception:
+        hub.unsubscribe(session_id, events)
+        raise
+
+    if state is None:
+        hub.unsubscribe(session_id, events)
+        return jsonify({"error": "Session not found"}), 404
+
+    def stream():
+        try:
+            yield _sse('snapshot', state)
+            while True:
+                try:
+                    event = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is HUB_STOPPED:
+                    # Worker desligando: fecha o stream, o EventSource reconecta em outro worker
+                    break
+                yield _sse(event['event'], event)
+                if event['event'] == 'finished':
+                    break
+        finally:
+            hub.unsubscribe(session_id, events)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @session_bp.route('/sessions/start/<int:session_id>', methods=['POST'])
 def start_session(session_id):
     data = request.get_json() or {}
     use_agent = data.get('use_agent', False)
 
     with get_db_connection() as conn:
-        ensure_end_flag_column(conn)
-        ensure_executed_indices_column(conn)
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM session WHERE id = %s", (session_id,))
             if not cur.fetchone():
                 return jsonify({"error": "Session not found"}), 404
 
             start_time = datetime.utcnow()
-            cur.execute("""
+            cur.execute(f"""
                 UPDATE session
-                SET status = 'in-progress', start_time = %s, current_tactic_index = 0, current_tactic_started_at = %s, use_agent = %s, end_on_next_completion = FALSE, executed_indices = '[]'
+                SET status = 'in-progress', start_time = %s, current_tactic_index = 0, current_tactic_started_at = %s, use_agent = %s, end_on_next_completion = FALSE, executed_indices = '[]', {VERSION_BUMP_SQL}
                 WHERE id = %s
                 RETURNING status, start_time
             """, (start_time, start_time, use_agent, session_id))
             updated = cur.fetchone()
+            publish_session_event(cur, session_id, 'started')
             conn.commit()
+            invalidate_sessions(session_id)
 
     return jsonify({
         "session_id": session_id,
@@ -310,8 +423,6 @@ def temp_switch_strategy(session_id):
         return jsonify({"error": "Strategy ID is required"}), 400
 
     with get_db_connection() as conn:
-        ensure_end_flag_column(conn)
-        ensure_executed_indices_column(conn)
         with conn.cursor() as cur:
             cur.execute("SELECT id, original_strategy_id FROM session WHERE id = %s", (session_id,))
             session = cur.fetchone()
@@ -329,16 +440,19 @@ def temp_switch_strategy(session_id):
             cur.execute("INSERT INTO session_strategies (session_id, strategy_id) VALUES (%s, %s)", (session_id, str(new_strategy_id)))
 
             start_time = datetime.utcnow()
-            cur.execute("""
+            cur.execute(f"""
                 UPDATE session
                 SET current_tactic_index = 0,
                     current_tactic_started_at = %s,
                     end_on_next_completion = FALSE,
-                    executed_indices = '[]'
+                    executed_indices = '[]',
+                    {VERSION_BUMP_SQL}
                 WHERE id = %s
             """, (start_time, session_id))
 
+            publish_session_event(cur, session_id, 'strategy_changed')
             conn.commit()
+            invalidate_sessions(session_id)
 
     return jsonify({"success": "Strategy temporarily switched!"}), 200
 
@@ -346,41 +460,37 @@ def temp_switch_strategy(session_id):
 @session_bp.route('/sessions/tactic/next/<int:session_id>', methods=['POST'])
 def next_tactic(session_id):
     with get_db_connection() as conn:
-        ensure_executed_indices_column(conn)
-
-        end_flag = False
         with conn.cursor() as cur:
-            try:
-                cur.execute("SELECT end_on_next_completion FROM session WHERE id = %s", (session_id,))
-                res = cur.fetchone()
-                if res and res.get('end_on_next_completion'):
-                    end_flag = True
-            except Exception:
-                conn.rollback()
-
-        if end_flag:
-            _end_session(conn, session_id)
-            return jsonify({"success": True, "session_status": "finished", "message": "Session ended by rule."})
-
-        update_executed_indices(conn, session_id)
-
-        with conn.cursor() as cur:
-            cur.execute("SELECT id, current_tactic_index FROM session WHERE id = %s", (session_id,))
+            # Single statement: the row lock serializes concurrent clicks, so no history is lost
+            cur.execute(f"""
+                UPDATE session
+                SET executed_indices = {APPEND_CURRENT_TACTIC_SQL},
+                    current_tactic_index = COALESCE(current_tactic_index, 0) + 1,
+                    current_tactic_started_at = %s,
+                    {VERSION_BUMP_SQL}
+                WHERE id = %s AND end_on_next_completion IS NOT TRUE
+                RETURNING current_tactic_index, executed_indices, {notify_sql('tactic_changed')} AS notified
+            """, (datetime.utcnow(), session_id))
             session = cur.fetchone()
+
             if not session:
-                return jsonify({"error": "Session not found"}), 404
+                # Either the session does not exist or it must end on this completion
+                cur.execute("SELECT end_on_next_completion FROM session WHERE id = %s", (session_id,))
+                res = cur.fetchone()
+                if not res:
+                    return jsonify({"error": "Session not found"}), 404
 
-            new_index = session['current_tactic_index'] + 1
-            now = datetime.utcnow()
+                _end_session(conn, session_id)
+                return jsonify({"success": True, "session_status": "finished", "message": "Session ended by rule."})
 
-            cur.execute("""
-                UPDATE session
-                SET current_tactic_index = %s, current_tactic_started_at = %s
-                WHERE id = %s
-            """, (new_index, now, session_id))
             conn.commit()
+            invalidate_sessions(session_id)
 
-    return jsonify({"success": True, "current_tactic_index": new_index})
+    return jsonify({
+        "success": True,
+        "current_tactic_index": session['current_tactic_index'],
+        "executed_indices": session['executed_indices']
+    })
 
 
 @session_bp.route('/sessions/tactic/set/<int:session_id>', methods=['POST'])
@@ -392,74 +502,112 @@ def set_tactic_index(session_id):
         return jsonify({"error": "tactic_index is required"}), 400
 
     with get_db_connection() as conn:
-        ensure_executed_indices_column(conn)
-        update_executed_indices(conn, session_id)
-
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM session WHERE id = %s", (session_id,))
-            if not cur.fetchone():
-                return jsonify({"error": "Session not found"}), 404
-
-            now = datetime.utcnow()
-            cur.execute("""
+            cur.execute(f"""
                 UPDATE session
-                SET current_tactic_index = %s, current_tactic_started_at = %s
+                SET executed_indices = {APPEND_CURRENT_TACTIC_SQL},
+                    current_tactic_index = %s,
+                    current_tactic_started_at = %s,
+                    {VERSION_BUMP_SQL}
                 WHERE id = %s
-            """, (new_index, now, session_id))
+                RETURNING current_tactic_index, executed_indices, {notify_sql('tactic_changed')} AS notified
+            """, (new_index, datetime.utcnow(), session_id))
+            session = cur.fetchone()
+            if not session:
+                return jsonify({"error": "Session not found"}), 404
+
             conn.commit()
+            invalidate_sessions(session_id)
 
-    return jsonify({"success": True, "current_tactic_index": new_index})
+    return jsonify({
+        "success": True,
+        "current_tactic_index": session['current_tactic_index'],
+        "executed_indices": session['executed_indices']
+    })
 
 
 @session_bp.route('/sessions/tactic/prev/<int:session_id>', methods=['POST'])
 def prev_tactic(session_id):
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT id, current_tactic_index FROM session WHERE id = %s", (session_id,))
+            cur.execute(f"""
+                UPDATE session
+                SET current_tactic_index = GREATEST(COALESCE(current_tactic_index, 0) - 1, 0),
+                    current_tactic_started_at = %s,
+                    {VERSION_BUMP_SQL}
+                WHERE id = %s
+                RETURNING current_tactic_index, executed_indices, {notify_sql('tactic_changed')} AS notified
+            """, (datetime.utcnow(), session_id))
             session = cur.fetchone()
             if not session:
                 return jsonify({"error": "Session not found"}), 404
 
-            new_index = max(0, session['current_tactic_index'] - 1)
-            now = datetime.utcnow()
-
-            cur.execute("""
-                UPDATE session
-                SET current_tactic_index = %s, current_tactic_started_at = %s
-                WHERE id = %s
-            """, (new_index, now, session_id))
             conn.commit()
+            invalidate_sessions(session_id)
 
-    return jsonify({"success": True, "current_tactic_index": new_index})
+    return jsonify({
+        "success": True,
+        "current_tactic_index": session['current_tactic_index'],
+        "executed_indices": session['executed_indices']
+    })
+
+
+SUBMIT_ANSWER_SQL = """
+    INSERT INTO verified_answers (student_name, student_id, answers, score, session_id)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (session_id, student_id) DO NOTHING
+    RETURNING id
+"""
+
+# Seconds a buffered submit waits for its group commit before giving up with 503
+ANSWER_BUFFER_COMMIT_TIMEOUT = 10
+
+def _submit_answer_buffered(data):
+    parsed = parse_answer(data)
+    if parsed is None:
+        return jsonify({"error": "student_id, student_name, session_id and answers are required"}), 400
 
+    try:
+        future = get_answer_buffer().submit(*parsed)
+        status = future.result(timeout=ANSWER_BUFFER_COMMIT_TIMEOUT)
+    except (AnswerBufferFull, FuturesTimeout) as e:
+        return jsonify({"error": str(e) or "Timed out waiting for the answer to be committed"}), 503, {"Retry-After": "1"}
+
+    if status == 'duplicate':
+        return jsonify({"error": "Answer already submitted for this student"}), 409
+    if status == 'session_not_found':
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(data), 200
 
 @session_bp.route('/sessions/submit_answer', methods=['POST'])
 def submit_answer():
     data = request.get_json()
+
+    # Opt-in (ANSWER_WRITE_BEHIND=1): grouped with concurrent submits into one commit
+    if write_behind_enabled():
+        return _submit_answer_buffered(data)
+
     student_id = str(data['student_id'])
-    session_id = data['session_id']
+    session_id = int(data['session_id'])
     
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("""
-                SELECT 1 FROM verified_answers
-                WHERE student_id = %s AND session_id = %s
-            """, (student_id, session_id))
-
-            if cur.fetchone():
-                return jsonify({"error": "Answer already submitted for this student"}), 409
-
-            cur.execute("""
-                INSERT INTO verified_answers (student_name, student_id, answers, score, session_id)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
+            # Unique (session_id, student_id), migrations/0011: no SELECT, no race between two submits
+            cur.execute(SUBMIT_ANSWER_SQL, (
                 data['student_name'],
                 student_id,
                 json.dumps(data['answers']),
                 data.get('score', 0),
                 session_id
             ))
+
+            if cur.fetchone() is None:
+                return jsonify({"error": "Answer already submitted for this student"}), 409
+
+            record_score(cur, session_id, data.get('score', 0))
+            bump_session_version(cur, session_id)
             conn.commit()
+            invalidate_sessions(session_id)
 
     logging.basicConfig(level=logging.INFO)
     logging.info("🔍 dados das respostas no micr. control: %s", data)
@@ -468,6 +616,63 @@ def submit_answer():
     return jsonify(data), 200
 
 
+ANSWER_BATCH_MAX = 1000
+
+@session_bp.route('/sessions/submit_answers', methods=['POST'])
+def submit_answers():
+    """
+    Bulk /sessions/submit_answer: every record in one transaction and one
+    multi-row INSERT. Returns a status per record, in request order:
+    inserted, duplicate (already stored, or repeated in this batch),
+    session_not_found or invalid.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('answers') if isinstance(data, dict) else data
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of answers is required"}), 400
+    if len(items) > ANSWER_BATCH_MAX:
+        return jsonify({"error": f"At most {ANSWER_BATCH_MAX} answers per batch"}), 400
+
+    statuses = [None] * len(items)
+    pending = {}  # (session_id, student_id) -> (index, row); first record of a student wins
+    for i, item in enumerate(items):
+        parsed = parse_answer(item) if isinstance(item, dict) else None
+        if parsed is None:
+            statuses[i] = 'invalid'
+            continue
+        session_id, student_id, row = parsed
+        if (session_id, student_id) in pending:
+            statuses[i] = 'duplicate'
+            continue
+        pending[(session_id, student_id)] = (i, row)
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            results, session_ids = insert_answers(cur, {key: row for key, (_, row) in pending.items()})
+            if session_ids:
+                conn.commit()
+                invalidate_sessions(*session_ids)
+
+    for key, (i, _) in pending.items():
+        statuses[i] = results[key]
+
+    counts = {status: statuses.count(status) for status in ('inserted', 'duplicate', 'session_not_found', 'invalid')}
+    return jsonify({
+        "results": [{"index": i, "status": status} for i, status in enumerate(statuses)],
+        **counts
+    }), 200
+
+
+# xmax = 0 only on rows created by this statement: tells insert from update
+UPSERT_EXTRA_NOTES_SQL = """
+    INSERT INTO extra_notes (estudante_username, student_id, extra_notes, session_id)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (session_id, estudante_username) DO UPDATE
+    SET extra_notes = EXCLUDED.extra_notes
+    RETURNING (xmax = 0) AS inserted
+"""
+
 @session_bp.route("/sessions/add_extra_notes", methods=["POST"])
 def add_extra_notes():
     logging.basicConfig(level=logging.INFO)
@@ -483,35 +688,48 @@ def add_extra_notes():
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            # Check if exists
-            cur.execute("""
-                SELECT id FROM extra_notes
-                WHERE estudante_username = %s AND session_id = %s
-            """, (estudante_username, session_id))
-            existing_note = cur.fetchone()
-
-            if existing_note:
-                cur.execute("""
-                    UPDATE extra_notes
-                    SET extra_notes = %s
-                    WHERE id = %s
-                """, (extra_notes, existing_note['id']))
-                conn.commit()
-                return jsonify({"message": "Extra notes updated successfully"}), 200
+            cur.execute(UPSERT_EXTRA_NOTES_SQL, (estudante_username, student_id, extra_notes, session_id))
+            inserted = cur.fetchone()['inserted']
 
-            cur.execute("""
-                INSERT INTO extra_notes (estudante_username, student_id, extra_notes, session_id)
-                VALUES (%s, %s, %s, %s)
-            """, (estudante_username, student_id, extra_notes, session_id))
+            if inserted:
+                record_extra_note(cur, session_id, extra_notes)
+            else:
+                refresh_extra_note_stats(cur, session_id)
+            bump_session_version(cur, session_id)
             conn.commit()
+            invalidate_sessions(session_id)
 
-            # Logging new note info for consistency with previous code
-            logging.info("🔍 new_note inserted for student_id: %s", student_id)
-            sys.stdout.flush()
+    if not inserted:
+        return jsonify({"message": "Extra notes updated successfully"}), 200
+
+    # Logging new note info for consistency with previous code
+    logging.info("🔍 new_note inserted for student_id: %s", student_id)
+    sys.stdout.flush()
 
     return jsonify({"message": "Extra notes added successfully"}), 201
 
 
+# Looks the session up by code, enrolls and bumps the version in one statement.
+# The INSERT only runs if the session exists; the bump only if a row was inserted.
+ENTER_SESSION_SQL = """
+    WITH target AS (
+        SELECT id FROM session WHERE code = %(code)s
+    ), enrolled AS (
+        INSERT INTO {table} (session_id, {column})
+        SELECT id, %(requester_id)s FROM target
+        ON CONFLICT DO NOTHING
+        RETURNING session_id
+    ), bumped AS (
+        UPDATE session SET {bump}
+        WHERE id IN (SELECT session_id FROM enrolled)
+        RETURNING id
+    )
+    SELECT id, (SELECT COUNT(*) FROM bumped) > 0 AS inserted FROM target
+"""
+
+ENTER_STUDENT_SQL = ENTER_SESSION_SQL.format(table='session_students', column='student_id', bump=VERSION_BUMP_SQL)
+ENTER_TEACHER_SQL = ENTER_SESSION_SQL.format(table='session_teachers', column='teacher_id', bump=VERSION_BUMP_SQL)
+
 @session_bp.route('/sessions/enter', methods=['POST'])
 def enter_session():
     data = request.get_json()
@@ -522,25 +740,17 @@ def enter_session():
 
     with get_db_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM session WHERE code = %s", (session_code,))
+            # Already enrolled is not an error: ON CONFLICT DO NOTHING
+            sql = ENTER_STUDENT_SQL if user_type == 'student' else ENTER_TEACHER_SQL
+            cur.execute(sql, {"code": session_code, "requester_id": requester_id})
             session = cur.fetchone()
 
             if not session:
                 return jsonify({"error": "Session not found"}), 404
 
-            session_id = session['id']
-
-            # Check if already enrolled to avoid duplicates or error
-            if user_type == 'student':
-                cur.execute("SELECT 1 FROM session_students WHERE session_id = %s AND student_id = %s", (session_id, requester_id))
-                if not cur.fetchone():
-                    cur.execute("INSERT INTO session_students (session_id, student_id) VALUES (%s, %s)", (session_id, requester_id))
-                    conn.commit()
-            else:
-                cur.execute("SELECT 1 FROM session_teachers WHERE session_id = %s AND teacher_id = %s", (session_id, requester_id))
-                if not cur.fetchone():
-                    cur.execute("INSERT INTO session_teachers (session_id, teacher_id) VALUES (%s, %s)", (session_id, requester_id))
-                    conn.commit()
+            if session['inserted']:
+                conn.commit()
+                invalidate_sessions(session['id'])
 
     return jsonify({"success": "Entered session successfully"}), 200
 
@@ -553,8 +763,6 @@ def change_session_strategy(session_id):
         return jsonify({"error": "Strategy ID is required"}), 400
 
     with get_db_connection() as conn:
-        ensure_end_flag_column(conn)
-        ensure_executed_indices_column(conn)
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM session WHERE id = %s", (session_id,))
             if not cur.fetchone():
@@ -564,20 +772,24 @@ def change_session_strategy(session_id):
             cur.execute("INSERT INTO session_strategies (session_id, strategy_id) VALUES (%s, %s)", (session_id, str(new_strategy_id)))
 
             cur.execute("DELETE FROM verified_answers WHERE session_id = %s", (session_id,))
+            reset_score_stats(cur, session_id)
 
             start_time = datetime.utcnow()
-            cur.execute("""
+            cur.execute(f"""
                 UPDATE session
                 SET status = 'in-progress',
                     start_time = %s,
                     current_tactic_index = 0,
                     current_tactic_started_at = %s,
                     end_on_next_completion = FALSE,
-                    executed_indices = '[]'
+                    executed_indices = '[]',
+                    {VERSION_BUMP_SQL}
                 WHERE id = %s
             """, (start_time, start_time, session_id))
 
+            publish_session_event(cur, session_id, 'strategy_changed')
             conn.commit()
+            invalidate_sessions(session_id)
 
     return jsonify({"success": "Strategy changed and session restarted!"}), 200
 
@@ -591,8 +803,6 @@ def change_session_domain(session_id):
         return jsonify({"error": "Domain ID is required"}), 400
 
     with get_db_connection() as conn:
-        ensure_end_flag_column(conn)
-        ensure_executed_indices_column(conn)
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM session WHERE id = %s", (session_id,))
             if not cur.fetchone():
@@ -602,20 +812,24 @@ def change_session_domain(session_id):
             cur.execute("INSERT INTO session_domains (session_id, domain_id) VALUES (%s, %s)", (session_id, str(new_domain_id)))
 
             cur.execute("DELETE FROM verified_answers WHERE session_id = %s", (session_id,))
+            reset_score_stats(cur, session_id)
 
             start_time = datetime.utcnow()
-            cur.execute("""
+            cur.execute(f"""
                 UPDATE session
                 SET status = 'in-progress',
                     start_time = %s,
                     current_tactic_index = 0,
                     current_tactic_started_at = %s,
                     end_on_next_completion = FALSE,
-                    executed_indices = '[]'
+                    executed_indices = '[]',
+                    {VERSION_BUMP_SQL}
                 WHERE id = %s
             """, (start_time, start_time, session_id))
 
+            publish_session_event(cur, session_id, 'domain_changed')
             conn.commit()
+            invalidate_sessions(session_id)
 
     return jsonify({"success": "Domain changed and session restarted!"}), 200
 
@@ -623,6 +837,68 @@ def change_session_domain(session_id):
 # RATING ROUTES
 # ============================
 
+RATING_BATCH_MAX = 5000
+
+def _apply_ratings(cur, session_id, ratings):
+    """
+    Upserts {student_id: rating} and adjusts session.rating_sum/rating_count
+    by the difference from the previous votes.
+    Returns the new (average, count), or None if the session does not exist.
+    """
+    # Serializa os votos da sessão: o delta abaixo precisa ler o voto anterior já
+    # commitado. Sem o lock, dois votos simultâneos do mesmo aluno (duplo clique,
+    # retry) partem do mesmo "previous" e inflam rating_count/rating_sum para sempre.
+    # NO KEY UPDATE (o mesmo lock do UPDATE session abaixo) não conflita com o
+    # FOR KEY SHARE das checagens de FK: inserts em verified_answers etc. seguem livres.
+    cur.execute("SELECT id FROM session WHERE id = %s FOR NO KEY UPDATE", (session_id,))
+    if cur.fetchone() is None:
+        return None
+
+    # Statement novo = snapshot novo (READ COMMITTED), tirado depois do lock
+    cur.execute(f"""
+        WITH incoming AS (
+            SELECT student_id, rating
+            FROM unnest(%(student_ids)s::varchar[], %(ratings)s::int[]) AS t(student_id, rating)
+        ),
+        previous AS (
+            SELECT r.rating
+            FROM session_ratings r
+            JOIN incoming i ON i.student_id = r.student_id
+            WHERE r.session_id = %(session_id)s
+        ),
+        upserted AS (
+            INSERT INTO session_ratings (session_id, student_id, rating)
+            SELECT %(session_id)s, student_id, rating FROM incoming
+            ON CONFLICT (session_id, student_id)
+            DO UPDATE SET rating = EXCLUDED.rating
+            RETURNING rating
+        ),
+        delta AS (
+            SELECT (SELECT COALESCE(SUM(rating), 0) FROM upserted)
+                 - (SELECT COALESCE(SUM(rating), 0) FROM previous) AS rating_sum,
+                   (SELECT COUNT(*) FROM upserted)
+                 - (SELECT COUNT(*) FROM previous) AS rating_count
+        )
+        UPDATE session s
+        SET rating_sum = s.rating_sum + d.rating_sum,
+            rating_count = COALESCE(s.rating_count, 0) + d.rating_count,
+            rating_average = COALESCE(
+                (s.rating_sum + d.rating_sum)::float / NULLIF(COALESCE(s.rating_count, 0) + d.rating_count, 0),
+                0.0),
+            {VERSION_BUMP_SQL}
+        FROM delta d
+        WHERE s.id = %(session_id)s
+        RETURNING s.rating_average, s.rating_count
+    """, {
+        "session_id": session_id,
+        "student_ids": list(ratings.keys()),
+        "ratings": list(ratings.values()),
+    })
+    row = cur.fetchone()
+    if not row:
+        return None
+    return row['rating_average'], row['rating_count']
+
 @session_bp.route('/sessions/<int:session_id>/rate', methods=['POST'])
 def rate_session(session_id):
     data = request.get_json()
@@ -633,47 +909,63 @@ def rate_session(session_id):
         return jsonify({"error": "Rating must be between 1 and 5"}), 400
 
     with get_db_connection() as conn:
-        ensure_rating_tables(conn)
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM session WHERE id = %s", (session_id,))
-            if not cur.fetchone():
+            result = _apply_ratings(cur, session_id, {student_id: rating})
+            if result is None:
                 return jsonify({"error": "Session not found"}), 404
 
-            # Upsert Rating
-            cur.execute("""
-                INSERT INTO session_ratings (session_id, student_id, rating)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (session_id, student_id)
-                DO UPDATE SET rating = EXCLUDED.rating
-            """, (session_id, student_id, rating))
-
-            # Recalculate Average
-            cur.execute("""
-                SELECT AVG(rating) as avg, COUNT(*) as cnt
-                FROM session_ratings
-                WHERE session_id = %s
-            """, (session_id,))
-            row = cur.fetchone()
-            new_avg = row['avg'] or 0.0
-            new_count = row['cnt'] or 0
+            conn.commit()
+            invalidate_sessions(session_id)
 
-            # Update Session Table
-            cur.execute("""
-                UPDATE session
-                SET rating_average = %s, rating_count = %s
-                WHERE id = %s
-            """, (new_avg, new_count, session_id))
+    new_avg, new_count = result
+    return jsonify({"success": True, "average": new_avg, "count": new_count}), 200
+
+@session_bp.route('/sessions/<int:session_id>/rate_batch', methods=['POST'])
+def rate_session_batch(session_id):
+    data = request.get_json()
+    items = data.get('ratings') if isinstance(data, dict) else data
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of ratings is required"}), 400
+    if len(items) > RATING_BATCH_MAX:
+        return jsonify({"error": f"At most {RATING_BATCH_MAX} ratings per batch"}), 400
+
+    # Ultimo voto de cada aluno no lote prevalece
+    ratings = {}
+    invalid = []
+    for i, item in enumerate(items):
+        try:
+            rating = int(item['rating'])
+            student_id = item['student_id']
+        except (TypeError, KeyError, ValueError):
+            invalid.append(i)
+            continue
+        if student_id is None or not (1 <= rating <= 5):
+            invalid.append(i)
+            continue
+        ratings[str(student_id)] = rating
+
+    if invalid:
+        return jsonify({"error": "Rating must be between 1 and 5 and student_id is required",
+                        "invalid_indexes": invalid}), 400
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cur:
+            result = _apply_ratings(cur, session_id, ratings)
+            if result is None:
+                return jsonify({"error": "Session not found"}), 404
 
             conn.commit()
+            invalidate_sessions(session_id)
 
-    return jsonify({"success": True, "average": new_avg, "count": new_count}), 200
+    new_avg, new_count = result
+    return jsonify({"success": True, "average": new_avg, "count": new_count, "accepted": len(ratings)}), 200
 
 @session_bp.route('/sessions/<int:session_id>/rating', methods=['GET'])
 def get_session_rating(session_id):
     student_id = request.args.get('student_id')
 
     with get_db_connection() as conn:
-        ensure_rating_tables(conn)
         with conn.cursor() as cur:
             cur.execute("SELECT rating_average, rating_count FROM session WHERE id = %s", (session_id,))
             row = cur.fetchone()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from psycopg2.extras import Json
+
+try:
+    from db import get_db_connection, get_setting
+except ImportError:
+    from ...db import get_db_connection, get_setting
+
+JOB_STATUSES = ('pending', 'running', 'done', 'failed')
+
+STALE_JOB_ERROR = "Job abandonado: o worker que o executava parou antes de terminar"
+
+
+class JobQueueFull(Exception):
+    """Raised when the job runner already has ``max_workers + max_queue`` jobs in flight."""
+
+
+def _json(value):
+    # Mesma serialização do jsonify para Decimal/datetime vindos do banco
+    return Json(value, dumps=lambda obj: json.dumps(obj, default=str))
+
+
+class AgentJobRunner:
+    """
+    Bounded background pool for the slow (LLM) agent endpoints.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` wait;
+    beyond that ``submit`` raises ``JobQueueFull`` instead of growing an
+    unbounded queue. Job state is written to ``agent_jobs`` so any worker
+    process can answer the poll; rows older than ``retention_days`` are
+    deleted on each submit.
+    """
+
+    def __init__(self, app, max_workers=4, max_queue=32, retention_days=7):
+        self.app = app
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention_days = retention_days
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agent-job')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "running": 0, "done": 0, "failed": 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def submit(self, kind, params, fn, *args):
+        """
+        Records a pending job and schedules ``fn(*args)``, which must return
+        ``(payload, http_status)``. Returns the job id.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise JobQueueFull(f"Too many agent jobs in flight (limit {self.max_workers + self.max_queue})")
+
+        job_id = uuid.uuid4().hex
+        try:
+            with get_db_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO agent_jobs (id, kind, params) VALUES (%s, %s, %s)",
+                    (job_id, kind, _json(params))
+                )
+                if self.retention_days > 0:
+                    # Usa o índice em created_at; mantém a tabela limitada sem um cron à parte
+                    cur.execute(
+                        "DELETE FROM agent_jobs WHERE created_at < NOW() - make_interval(days => %s)",
+                        (self.retention_days,)
+                    )
+                conn.commit()
+            self._executor.submit(self._run, job_id, fn, args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._count("submitted")
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        self._count("running")
+        try:
+            with self.app.app_context():
+                self._update(job_id, "UPDATE agent_jobs SET status = 'running', started_at = NOW() WHERE id = %s")
+                try:
+                    payload, http_status = fn(*args)
+                except Exception as e:
+                    logging.error(f"Agent job {job_id} failed: {e}")
+                    self._update(job_id, """
+                        UPDATE agent_jobs SET status = 'failed', error = %s, http_status = 500, finished_at = NOW()
+                        WHERE id = %s
+                    """, str(e))
+                    self._count("failed")
+                    return
+
+                self._update(job_id, """
+                    UPDATE agent_jobs SET status = 'done', result = %s, http_status = %s, finished_at = NOW()
+                    WHERE id = %s
+                """, _json(payload), http_status)
+                self._count("done")
+        except Exception as e:
+            logging.error(f"Could not record the state of agent job {job_id}: {e}")
+        finally:
+            self._count("running", -1)
+            self._slots.release()
+
+    @staticmethod
+    def _update(job_id, sql, *params):
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, params + (job_id,))
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {"max_workers": self.max_workers, "max_queue": self.max_queue, **self._stats}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def get_job(cur, job_id, stale_after=None, pending_stale_after=None):
+    """
+    Reads a job for the poll. A job still ``running`` ``stale_after`` seconds
+    after it started (or ``pending`` ``pending_stale_after`` seconds after it
+    was created) lost its worker and is reported as ``failed``, so clients
+    stop polling instead of waiting forever.
+    """
+    if stale_after is None:
+        stale_after = get_setting("AGENT_JOB_STALE_AFTER", get_setting("LLM_TIMEOUT", 20.0, float) + 60, float)
+    if pending_stale_after is None:
+        pending_stale_after = get_setting("AGENT_JOB_PENDING_STALE_AFTER", 600.0, float)
+
+    cur.execute("""
+        WITH job AS (
+            SELECT *,
+                   (status = 'running' AND started_at < NOW() - make_interval(secs => %s))
+                   OR (status = 'pending' AND created_at < NOW() - make_interval(secs => %s)) AS stale
+            FROM agent_jobs
+            WHERE id = %s
+        )
+        SELECT id, kind,
+               CASE WHEN stale THEN 'failed' ELSE status END AS status,
+               CASE WHEN stale THEN 500 ELSE http_status END AS http_status,
+               result,
+               CASE WHEN stale THEN %s ELSE error END AS error,
+               created_at, started_at, finished_at
+        FROM job
+    """, (stale_after, pending_stale_after, job_id, STALE_JOB_ERROR))
+    return cur.fetchone()
+
+
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    global _runner, _runner_pid
+
+    pid = os.getpid()
+    if _runner is None or _runner_pid != pid:
+        with _runner_lock:
+            if _runner is None or _runner_pid != pid:
+                _runner = AgentJobRunner(
+                    current_app._get_current_object(),
+                    max_workers=get_setting("AGENT_JOB_WORKERS", 4, int),
+                    max_queue=get_setting("AGENT_JOB_QUEUE_SIZE", 32, int),
+                    retention_days=get_setting("AGENT_JOB_RETENTION_DAYS", 7, int),
+                )
+                _runner_pid = pid
+    return _runner
+
+
+def job_runner_stats():
+    if _runner is None or _runner_pid != os.getpid():
+        return None
+    return _runner.stats()
+
+
+def shutdown_job_runner(wait=True):
+    if _runner is not None and _runner_pid == os.getpid():
+        _runner.shutdown(wait=wait)
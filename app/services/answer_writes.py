@@ -0,0 +1,279 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+from psycopg2.extras import execute_values
+
+try:
+    from db import get_db_connection, get_setting
+except ImportError:
+    from ...db import get_db_connection, get_setting
+
+from .session_loader import invalidate_sessions
+from .session_stats import record_scores
+from .session_versions import bump_session_version
+
+INSERT_ANSWERS_SQL = """
+    INSERT INTO verified_answers (student_name, student_id, answers, score, session_id)
+    VALUES %s
+    ON CONFLICT (session_id, student_id) DO NOTHING
+    RETURNING session_id, student_id, score
+"""
+
+
+# Limites das colunas de verified_answers (0001_initial_schema.sql): um registro fora
+# deles levantaria DataError e abortaria o INSERT do lote inteiro
+STUDENT_ID_MAX_LENGTH = 50
+STUDENT_NAME_MAX_LENGTH = 100
+PG_INT_MIN, PG_INT_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+def parse_answer(item):
+    """
+    (session_id, student_id, row for verified_answers) or None if the record
+    is malformed or would not fit the columns.
+    """
+    try:
+        session_id = int(item['session_id'])
+        student_id = str(item['student_id'])
+        score = int(item.get('score', 0))
+        row = (item['student_name'], student_id, json.dumps(item['answers']), score, session_id)
+    except (TypeError, KeyError, ValueError, AttributeError):
+        return None
+    if item['student_id'] is None or item['student_name'] is None:
+        return None
+    if len(student_id) > STUDENT_ID_MAX_LENGTH or len(str(item['student_name'])) > STUDENT_NAME_MAX_LENGTH:
+        return None
+    if not (PG_INT_MIN <= score <= PG_INT_MAX and PG_INT_MIN <= session_id <= PG_INT_MAX):
+        return None
+    return session_id, student_id, row
+
+
+def insert_answers(cur, answers):
+    """
+    Writes ``answers`` ({(session_id, student_id): row}) with one multi-row
+    INSERT, updates the score aggregates and bumps the session versions.
+    Does not commit. Returns ({key: 'inserted' | 'duplicate' | 'session_not_found'},
+    ids of the sessions that changed).
+    """
+    if not answers:
+        return {}, []
+
+    # Only sessions that exist: a missing one must not abort the whole batch (FK)
+    cur.execute("SELECT id FROM session WHERE id = ANY(%s)", (list({session_id for session_id, _ in answers}),))
+    existing = {row['id'] for row in cur.fetchall()}
+
+    statuses = {key: 'session_not_found' for key in answers if key[0] not in existing}
+    rows = [row for key, row in answers.items() if key not in statuses]
+
+    inserted = []
+    if rows:
+        inserted = execute_values(cur, INSERT_ANSWERS_SQL, rows, page_size=len(rows), fetch=True)
+
+    inserted_keys = {(row['session_id'], row['student_id']) for row in inserted}
+    for key in answers:
+        statuses.setdefault(key, 'inserted' if key in inserted_keys else 'duplicate')
+
+    session_ids = sorted({row['session_id'] for row in inserted})
+    if inserted:
+        record_scores(cur, [(row['session_id'], row['score']) for row in inserted])
+        bump_session_version(cur, session_ids)
+    return statuses, session_ids
+
+
+class AnswerBufferFull(Exception):
+    """Raised when the write-behind queue stays full for ``enqueue_timeout`` seconds, or is shutting down."""
+
+
+_STOP = object()
+
+
+class AnswerWriteBuffer:
+    """
+    Write-behind queue for /sessions/submit_answer bursts.
+
+    A single flusher thread groups whatever is queued into one transaction
+    (one multi-row INSERT) every ``max_delay`` seconds or ``max_batch``
+    records, whichever comes first. ``submit`` returns a Future resolved
+    only after that group commit, so callers still acknowledge durable
+    writes. The queue holds at most ``max_pending`` records: beyond that
+    callers wait up to ``enqueue_timeout`` and then get ``AnswerBufferFull``.
+    """
+
+    def __init__(self, app, max_batch=200, max_delay=0.005, max_pending=5000, enqueue_timeout=1.0):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "rejected": 0, "batches": 0, "flushed": 0, "failed": 0, "largest_batch": 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def submit(self, session_id, student_id, row):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise AnswerBufferFull("Answer buffer is shutting down")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='answer-write-behind', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put(((session_id, student_id), row, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._count("rejected")
+            raise AnswerBufferFull(f"Answer buffer full ({self._queue.maxsize} pending records)")
+        self._count("enqueued")
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+        # Drain: o que entrou antes do shutdown ainda é gravado
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+            if len(batch) >= self.max_batch:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        answers = {}
+        repeated = set()  # mesmo aluno duas vezes no lote: o primeiro vence
+        for i, (key, row, _) in enumerate(batch):
+            if key in answers:
+                repeated.add(i)
+            else:
+                answers[key] = row
+
+        try:
+            statuses = self._write(answers)
+        except Exception as e:
+            # Um registro ruim não pode derrubar o lote: regrava um a um e só
+            # o Future do registro que falhou recebe a exceção
+            logging.warning(f"Answer write-behind flush of {len(batch)} records failed, retrying one by one: {e}")
+            statuses = {}
+            for key, row in answers.items():
+                try:
+                    statuses.update(self._write({key: row}))
+                except Exception as record_error:
+                    logging.error(f"Answer write-behind record {key} failed: {record_error}")
+                    statuses[key] = record_error
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        for i, (key, _, future) in enumerate(batch):
+            status = statuses[key]
+            if isinstance(status, Exception):
+                self._count("failed")
+                future.set_exception(status)
+            else:
+                self._count("flushed")
+                future.set_result('duplicate' if i in repeated else status)
+
+    def _write(self, answers):
+        """One transaction for ``answers``; returns their statuses."""
+        with self.app.app_context():
+            with get_db_connection() as conn, conn.cursor() as cur:
+                statuses, session_ids = insert_answers(cur, answers)
+                conn.commit()
+            if session_ids:
+                invalidate_sessions(*session_ids)
+        return statuses
+
+    def shutdown(self, timeout=10.0):
+        """Stops accepting records and waits until everything queued is committed."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {"max_batch": self.max_batch, "max_delay_ms": self.max_delay * 1000,
+                    "pending": self._queue.qsize(), **self._stats}
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def write_behind_enabled():
+    return get_setting("ANSWER_WRITE_BEHIND", False, _flag)
+
+
+_buffer = None
+_buffer_pid = None
+_buffer_lock = threading.Lock()
+
+
+def get_answer_buffer():
+    global _buffer, _buffer_pid
+
+    pid = os.getpid()
+    if _buffer is None or _buffer_pid != pid:
+        with _buffer_lock:
+            if _buffer is None or _buffer_pid != pid:
+                _buffer = AnswerWriteBuffer(
+                    current_app._get_current_object(),
+                    max_batch=get_setting("ANSWER_BUFFER_MAX_BATCH", 200, int),
+                    max_delay=get_setting("ANSWER_BUFFER_MAX_DELAY_MS", 5.0, float) / 1000,
+                    max_pending=get_setting("ANSWER_BUFFER_MAX_PENDING", 5000, int),
+                    enqueue_timeout=get_setting("ANSWER_BUFFER_ENQUEUE_TIMEOUT", 1.0, float),
+                )
+                _buffer_pid = pid
+                atexit.register(_buffer.shutdown)
+    return _buffer
+
+
+def shutdown_answer_buffer(timeout=10.0):
+    if _buffer is not None and _buffer_pid == os.getpid():
+        _buffer.shutdown(timeout)
+
+
+def answer_buffer_stats():
+    if _buffer is None or _buffer_pid != os.getpid():
+        return None
+    return _buffer.stats()
@@ -0,0 +1,173 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from db import get_setting
+except ImportError:
+    from ...db import get_setting
+
+
+class LocalLRUCache:
+    """
+    In-process cache with LRU eviction and a per-entry TTL.
+    Values are returned as stored (no copy): callers must not mutate them.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, is_fresh=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, value = entry
+            if (expires_at is not None and expires_at <= now) or (is_fresh is not None and not is_fresh(value)):
+                del self._data[key]
+                self._stats["misses"] += 1
+                self._stats["stale"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._stats["invalidations"] += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "size": len(self._data), "max_entries": self.max_entries,
+                    "ttl": self.ttl, **self._stats}
+
+
+class RedisCache:
+    """
+    Shared cache for several workers/nodes: an invalidation made by one
+    worker is seen by all. Requires the optional ``redis`` package.
+    LRU eviction is left to Redis (maxmemory-policy allkeys-lru).
+    """
+
+    def __init__(self, url, ttl=60.0, prefix="control:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Cache backend 'redis' requires the 'redis' package (pip install redis)")
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key, is_fresh=None):
+        raw = self._client.get(self.prefix + str(key))
+        if raw is None:
+            self._count("misses")
+            return None
+        value = pickle.loads(raw)
+        if is_fresh is not None and not is_fresh(value):
+            self._client.delete(self.prefix + str(key))
+            self._count("misses")
+            self._count("stale")
+            return None
+        self._count("hits")
+        return value
+
+    def set(self, key, value):
+        self._client.set(self.prefix + str(key), pickle.dumps(value), ex=int(self.ttl) if self.ttl else None)
+
+    def delete(self, key):
+        self._count("invalidations")
+        self._client.delete(self.prefix + str(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + "*"):
+            self._client.delete(key)
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "redis", "ttl": self.ttl, **self._stats}
+
+
+class NullCache:
+    def get(self, key, is_fresh=None):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+def create_cache(backend, max_entries=1000, ttl=60.0, url=None, prefix="control:"):
+    if backend == "memory":
+        return LocalLRUCache(max_entries=max_entries, ttl=ttl)
+    if backend == "redis":
+        return RedisCache(url, ttl=ttl, prefix=prefix)
+    if backend in ("none", "", None):
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+_session_cache = None
+_session_cache_pid = None
+_session_cache_lock = threading.Lock()
+
+
+def get_session_cache():
+    global _session_cache, _session_cache_pid
+
+    pid = os.getpid()
+    if _session_cache is None or _session_cache_pid != pid:
+        with _session_cache_lock:
+            if _session_cache is None or _session_cache_pid != pid:
+                _session_cache = create_cache(
+                    get_setting("SESSION_CACHE_BACKEND", "memory", str),
+                    max_entries=get_setting("SESSION_CACHE_MAX_ENTRIES", 1000, int),
+                    ttl=get_setting("SESSION_CACHE_TTL", 60.0, float),
+                    url=get_setting("SESSION_CACHE_URL", None, str),
+                    prefix="control:session:",
+                )
+                _session_cache_pid = pid
+    return _session_cache
+
+
+def session_cache_stats():
+    if _session_cache is None or _session_cache_pid != os.getpid():
+        return None
+    return _session_cache.stats()
@@ -0,0 +1,123 @@
+import json
+import logging
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+
+class RawJSON:
+    """
+    JSON text already encoded by the database (e.g. ``jsonb::text``), embedded
+    as-is in the response instead of being decoded to Python and re-encoded.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and other.text == self.text
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __repr__(self):
+        return f"RawJSON({self.text!r})"
+
+    def __getstate__(self):
+        return self.text
+
+    def __setstate__(self, state):
+        self.text = state
+
+
+def raw_json(text):
+    return None if text is None else RawJSON(text)
+
+
+class StdJSONProvider(DefaultJSONProvider):
+    """Flask's default provider (stdlib ``json``) that also understands ``RawJSON``."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, RawJSON):
+            return json.loads(o.text)
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson (C extension, 5-10x faster than ``json``).
+
+    - Same wire format as Flask's default: datetimes as HTTP dates, Decimal
+      as string, sorted keys. ``datetime_format="iso"`` lets orjson write
+      ISO 8601 natively instead (faster, but a different format for clients).
+    - ``RawJSON`` is embedded without re-encoding with orjson >= 3.9
+      (``orjson.Fragment``); older versions fall back to parsing it.
+    - Output is UTF-8, not ASCII-escaped.
+    """
+
+    datetime_format = "http"
+
+    def __init__(self, app):
+        import orjson
+
+        super().__init__(app)
+        self._orjson = orjson
+        self._fragment = getattr(orjson, "Fragment", None)
+
+    def _default(self, o):
+        if isinstance(o, RawJSON):
+            if self._fragment is not None:
+                return self._fragment(o.text)
+            return self._orjson.loads(o.text)
+        if isinstance(o, date):
+            return http_date(o)
+        if isinstance(o, Decimal):
+            return str(o)
+        return DefaultJSONProvider.default(o)
+
+    def _options(self, indent=None, sort_keys=None):
+        options = self._orjson.OPT_NON_STR_KEYS
+        if self.datetime_format != "iso":
+            options |= self._orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys if sort_keys is None else sort_keys:
+            options |= self._orjson.OPT_SORT_KEYS
+        if indent:
+            options |= self._orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=None, sort_keys=None):
+        return self._orjson.dumps(obj, default=self._default, option=self._options(indent, sort_keys))
+
+    def dumps(self, obj, **kwargs):
+        # Argumentos específicos do json.dumps (separators, ensure_ascii...) não se aplicam
+        return self.dumps_bytes(obj, kwargs.get("indent"), kwargs.get("sort_keys")).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+
+def create_json_provider(app, name="orjson", datetime_format="http"):
+    """``orjson`` (falls back to the stdlib provider if orjson is not installed) or ``default``."""
+    if name == "orjson":
+        try:
+            provider = OrjsonProvider(app)
+        except ImportError:
+            logging.warning("JSON_PROVIDER=orjson but orjson is not installed; using the stdlib json provider")
+            return StdJSONProvider(app)
+        provider.datetime_format = datetime_format
+        return provider
+    if name in ("default", "json", "", None):
+        return StdJSONProvider(app)
+    raise ValueError(f"Unknown JSON provider: {name}")
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from db import get_setting
+except ImportError:
+    from ...db import get_setting
+
+from .cache import create_cache
+from .llm_gateway import get_llm_gateway
+
+
+def llm_cache_key(model, messages, **params):
+    """
+    Content address of a chat completion: SHA-256 of the model, the exact
+    messages sent and the sampling parameters. Any change in the data that
+    goes into the prompt produces a different key, so entries never need
+    to be invalidated explicitly; the TTL only bounds how long they live.
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_chat_completion(model, messages, **params):
+    """
+    Returns ``(text, cached)``. The LLM gateway is only called when there is
+    no cached completion for these exact inputs.
+    """
+    cache = get_llm_cache()
+    key = llm_cache_key(model, messages, **params)
+
+    text = cache.get(key)
+    if text is not None:
+        return text, True
+
+    text = get_llm_gateway().complete(model, messages, **params)
+    if text:
+        cache.set(key, text)
+    return text, False
+
+
+def stream_chat_completion(model, messages, **params):
+    """
+    Streaming variant of ``cached_chat_completion``: returns ``(chunks, cached)``.
+    On a hit ``chunks`` yields the stored text at once; on a miss it yields
+    the tokens from the gateway and stores the full text when the stream ends.
+    """
+    cache = get_llm_cache()
+    key = llm_cache_key(model, messages, **params)
+
+    text = cache.get(key)
+    if text is not None:
+        return iter([text]), True
+    return _stream_and_store(cache, key, model, messages, params), False
+
+
+def _stream_and_store(cache, key, model, messages, params):
+    parts = []
+    for chunk in get_llm_gateway().stream(model, messages, **params):
+        parts.append(chunk)
+        yield chunk
+    text = "".join(parts)
+    if text:
+        cache.set(key, text)
+
+
+_llm_cache = None
+_llm_cache_pid = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _llm_cache, _llm_cache_pid
+
+    pid = os.getpid()
+    if _llm_cache is None or _llm_cache_pid != pid:
+        with _llm_cache_lock:
+            if _llm_cache is None or _llm_cache_pid != pid:
+                _llm_cache = create_cache(
+                    get_setting("LLM_CACHE_BACKEND", "memory", str),
+                    max_entries=get_setting("LLM_CACHE_MAX_ENTRIES", 500, int),
+                    ttl=get_setting("LLM_CACHE_TTL", 3600.0, float),
+                    url=get_setting("LLM_CACHE_URL", None, str),
+                    prefix="control:llm:",
+                )
+                _llm_cache_pid = pid
+    return _llm_cache
+
+
+def llm_cache_stats():
+    if _llm_cache is None or _llm_cache_pid != os.getpid():
+        return None
+    return _llm_cache.stats()
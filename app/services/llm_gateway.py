@@ -0,0 +1,268 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from db import get_setting
+except ImportError:
+    from ...db import get_setting
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+class LLMUnavailable(Exception):
+    """Raised when the LLM could not be called: circuit open, no free slot or retries exhausted."""
+
+
+class CircuitBreaker:
+    """
+    closed -> open after ``failure_threshold`` consecutive failures; while open
+    every call fails fast. After ``reset_timeout`` seconds a single trial call
+    is let through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._trial_owner = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_owner = threading.get_ident()
+                return True
+            return False
+
+    def release_trial(self):
+        """Gives back the half-open trial this thread got from ``allow`` without making the call."""
+        with self._lock:
+            if self._trial_in_flight and self._trial_owner == threading.get_ident():
+                self._trial_in_flight = False
+                self._trial_owner = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+def _is_retryable(exc):
+    import openai
+
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError)):  # inclui APITimeoutError
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+class LLMGateway:
+    """
+    Single OpenAI-compatible client shared by every request of the process.
+
+    - One pooled httpx client (keep-alive) instead of a new client per request.
+    - ``timeout`` is the deadline of the whole call, retries included.
+    - Transient errors (connection, timeout, 429, 5xx) are retried up to
+      ``max_retries`` times with full-jitter exponential backoff.
+    - At most ``max_concurrency`` calls are in flight; a caller waits up to
+      ``acquire_timeout`` seconds for a slot.
+    - A circuit breaker fails fast while the provider keeps failing.
+    """
+
+    def __init__(self, base_url, api_key, timeout=20.0, max_retries=2, backoff_base=0.5, backoff_max=4.0,
+                 max_concurrency=8, acquire_timeout=5.0, failure_threshold=5, reset_timeout=30.0):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "retries": 0, "rejected": 0, "short_circuited": 0, "in_flight": 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    from openai import OpenAI
+
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(max_connections=self.max_concurrency,
+                                            max_keepalive_connections=self.max_concurrency),
+                        timeout=self.timeout,
+                    )
+                    # Retries ficam com o gateway, que conhece o deadline total
+                    self._client = OpenAI(api_key=self.api_key, base_url=self.base_url,
+                                          max_retries=0, timeout=self.timeout, http_client=http_client)
+        return self._client
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @contextmanager
+    def _guard(self):
+        """Holds a concurrency slot and a circuit permit; yields the call deadline."""
+        deadline = time.monotonic() + self.timeout
+        # Circuito antes do slot: com o provedor travado os slots estão todos presos
+        # em chamadas que vão estourar, e quem chega deve falhar já, sem esperar
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise LLMUnavailable("LLM circuit is open, failing fast")
+
+        if not self._slots.acquire(timeout=min(self.acquire_timeout, self.timeout)):
+            self.breaker.release_trial()
+            self._count("rejected")
+            raise LLMUnavailable(f"No free LLM slot (max {self.max_concurrency} concurrent calls)")
+
+        self._count("calls")
+        self._count("in_flight")
+        try:
+            yield deadline
+        finally:
+            self._count("in_flight", -1)
+            self._slots.release()
+
+    def _with_retries(self, fn, deadline):
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise LLMUnavailable(f"LLM deadline of {self.timeout}s exceeded")
+                result = fn(self.client, remaining)
+            except Exception as e:
+                retryable = _is_retryable(e)
+                pause = self._backoff(attempt)
+                if retryable and attempt < self.max_retries and time.monotonic() + pause < deadline:
+                    attempt += 1
+                    self._count("retries")
+                    time.sleep(pause)
+                    continue
+                self._count("failures")
+                if retryable or isinstance(e, LLMUnavailable):
+                    self.breaker.record_failure()
+                else:
+                    # Erro do cliente (400, 401...): o provedor respondeu, não conta para o circuito
+                    self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def call(self, fn):
+        """
+        Runs ``fn(client, timeout)`` under the gateway policies; ``timeout`` is
+        what is left of the call deadline and must be passed to the request.
+        """
+        with self._guard() as deadline:
+            return self._with_retries(fn, deadline)
+
+    def complete(self, model, messages, **params):
+        response = self.call(lambda client, timeout: client.chat.completions.create(
+            model=model, messages=messages, timeout=timeout, **params
+        ))
+        return response.choices[0].message.content
+
+    def stream(self, model, messages, **params):
+        """
+        Yields the completion text as it arrives. Opening the stream follows
+        the same deadline/retry policy as ``complete`` (nothing has been sent
+        to the caller yet); a failure after the first chunk is not retried.
+        The concurrency slot is held until the stream is consumed or closed.
+        """
+        with self._guard() as deadline:
+            response = self._with_retries(lambda client, timeout: client.chat.completions.create(
+                model=model, messages=messages, timeout=timeout, stream=True, **params
+            ), deadline)
+            try:
+                for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception:
+                self._count("failures")
+                self.breaker.record_failure()
+                raise
+            finally:
+                response.close()
+
+    def stats(self):
+        with self._lock:
+            return {"max_concurrency": self.max_concurrency, "timeout": self.timeout,
+                    "circuit": self.breaker.state, **self._stats}
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+_gateway = None
+_gateway_pid = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway():
+    global _gateway, _gateway_pid
+
+    pid = os.getpid()
+    if _gateway is None or _gateway_pid != pid:
+        with _gateway_lock:
+            if _gateway is None or _gateway_pid != pid:
+                _gateway = LLMGateway(
+                    get_setting("LLM_BASE_URL", GROQ_BASE_URL, str),
+                    get_setting("GROQ_API_KEY", None, str),
+                    timeout=get_setting("LLM_TIMEOUT", 20.0, float),
+                    max_retries=get_setting("LLM_MAX_RETRIES", 2, int),
+                    max_concurrency=get_setting("LLM_MAX_CONCURRENCY", 8, int),
+                    acquire_timeout=get_setting("LLM_ACQUIRE_TIMEOUT", 5.0, float),
+                    failure_threshold=get_setting("LLM_CIRCUIT_FAILURES", 5, int),
+                    reset_timeout=get_setting("LLM_CIRCUIT_RESET", 30.0, float),
+                )
+                _gateway_pid = pid
+    return _gateway
+
+
+def llm_gateway_stats():
+    if _gateway is None or _gateway_pid != os.getpid():
+        return None
+    return _gateway.stats()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+try:
+    from db import create_connection, get_db_url
+except ImportError:
+    from ...db import create_connection, get_db_url
+
+CHANNEL = 'session_events'
+
+EVENTS = ('started', 'tactic_changed', 'strategy_changed', 'domain_changed', 'finished')
+
+# Posto em todas as filas quando o hub para (desligamento do worker): o stream SSE termina
+HUB_STOPPED = object()
+
+
+def session_state_sql(event):
+    """
+    JSON expression with the state pushed to clients. It reads the ``session``
+    row in scope, so it works both in ``SELECT ... FROM session`` and in the
+    RETURNING clause of ``UPDATE session`` (where it sees the new values).
+    """
+    if event not in EVENTS + ('snapshot',):
+        raise ValueError(f"Unknown session event: {event}")
+    return f"""json_build_object(
+        'event', '{event}',
+        'session_id', session.id,
+        'status', session.status,
+        'current_tactic_index', session.current_tactic_index,
+        'strategies', (SELECT COALESCE(json_agg(strategy_id), '[]') FROM session_strategies WHERE session_id = session.id),
+        'domains', (SELECT COALESCE(json_agg(domain_id), '[]') FROM session_domains WHERE session_id = session.id)
+    )"""
+
+
+def notify_sql(event):
+    # pg_notify só é entregue no COMMIT, e nunca se a transação fizer rollback
+    return f"pg_notify('{CHANNEL}', {session_state_sql(event)}::text)"
+
+
+def publish_session_event(cur, session_id, event):
+    cur.execute(f"SELECT {notify_sql(event)} AS notified FROM session WHERE id = %s", (session_id,))
+
+
+def load_session_state(cur, session_id):
+    cur.execute(f"SELECT {session_state_sql('snapshot')} AS state FROM session WHERE id = %s", (session_id,))
+    row = cur.fetchone()
+    return row['state'] if row else None
+
+
+class SessionEventHub:
+    """
+    One LISTEN connection per process, shared by every SSE subscriber.
+    Notifications are fanned out to per-subscriber bounded queues.
+    """
+
+    def __init__(self, db_url, queue_size=100, poll_interval=5.0):
+        self.db_url = db_url
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._subscribers = {}  # session_id -> set(queue.Queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def subscribe(self, session_id):
+        q = queue.Queue(maxsize=self.queue_size)
+        if self._stopped.is_set():
+            q.put_nowait(HUB_STOPPED)
+            return q
+        with self._lock:
+            self._subscribers.setdefault(session_id, set()).add(q)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen_forever, name='session-events-listener', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, session_id, q):
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def stats(self):
+        return {
+            "subscribers": self.subscriber_count(),
+            "listening": self._thread is not None and self._thread.is_alive(),
+        }
+
+    def stop(self):
+        """Stops the listener and ends every open stream (each subscriber gets ``HUB_STOPPED``)."""
+        self._stopped.set()
+        with self._lock:
+            subscribers = [q for qs in self._subscribers.values() for q in qs]
+        for q in subscribers:
+            self._put_latest(q, HUB_STOPPED)
+
+    def dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+            session_id = int(event['session_id'])
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"Ignoring malformed session event: {payload!r}")
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers.get(session_id, ()))
+        for q in subscribers:
+            self._put_latest(q, event)
+
+    @staticmethod
+    def _put_latest(q, item):
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            # Cliente lento: descarta o evento mais antigo, o estado novo é o que importa
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(item)
+
+    def _listen_forever(self):
+        backoff = 1.0
+        while not self._stopped.is_set():
+            conn = create_connection(self.db_url)
+            if conn is None:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logging.warning(f"Session events listener lost its connection: {e}")
+                time.sleep(backoff)
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+_hub = None
+_hub_pid = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub():
+    global _hub, _hub_pid
+
+    pid = os.getpid()
+    if _hub is None or _hub_pid != pid:
+        with _hub_lock:
+            if _hub is None or _hub_pid != pid:
+                _hub = SessionEventHub(get_db_url())
+                _hub_pid = pid
+    return _hub
+
+
+def event_hub_stats():
+    if _hub is None or _hub_pid != os.getpid():
+        return None
+    return _hub.stats()
+
+
+def stop_event_hub():
+    if _hub is not None and _hub_pid == os.getpid():
+        _hub.stop()
@@ -0,0 +1,213 @@
+import hashlib
+import json
+from collections import namedtuple
+
+from .cache import get_session_cache
+from .json_provider import raw_json
+
+# (chave no JSON, coluna, tabela) das relações simples da sessão
+SESSION_LINK_TABLES = (
+    ('strategies', 'strategy_id', 'session_strategies'),
+    ('teachers', 'teacher_id', 'session_teachers'),
+    ('students', 'student_id', 'session_students'),
+    ('domains', 'domain_id', 'session_domains'),
+)
+
+# (chave no JSON, tabela, colunas) das linhas completas anexadas à sessão.
+# Colunas JSONB vêm como texto (::text) e vão para a resposta sem decode/re-encode.
+SESSION_ROW_TABLES = (
+    ('verified_answers', 'verified_answers',
+     'id, student_name, student_id, answers::text AS answers, score, session_id'),
+    ('extra_notes', 'extra_notes', '*'),
+)
+RAW_JSON_COLUMNS = ('answers',)
+
+# Colunas da tabela session que podem ser pedidas em ?fields= (whitelist: viram SQL)
+SESSION_COLUMNS = (
+    'id', 'status', 'code', 'start_time', 'current_tactic_index', 'current_tactic_started_at',
+    'original_strategy_id', 'use_agent', 'end_on_next_completion', 'executed_indices',
+    'rating_average', 'rating_count', 'rating_sum', 'version',
+)
+# Sempre presentes: identificam o documento e sua versão (ETag/cache)
+SESSION_KEY_COLUMNS = ('id', 'version')
+SESSION_CHILDREN = tuple(key for key, _, _ in SESSION_LINK_TABLES + SESSION_ROW_TABLES)
+
+# Defaults for NULLs in old rows (use_agent/end flag, and the columns created by migrations/0004)
+SESSION_COLUMN_DEFAULTS = (
+    ('use_agent', False),
+    ('end_on_next_completion', False),
+    ('rating_average', 0.0),
+    ('rating_count', 0),
+)
+
+# Projeção pedida pelo cliente; None em todo lugar significa o documento completo
+SessionFields = namedtuple('SessionFields', 'columns children')
+
+
+class InvalidFields(ValueError):
+    """Raised for names in ?fields= / ?include= that are not session columns or child collections."""
+
+
+def _split(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def parse_session_fields(fields=None, include=None):
+    """
+    Parses ``?fields=`` (session columns and/or child collections) and
+    ``?include=`` (child collections) into a ``SessionFields``, or None when
+    neither is given (full document). Without ``fields`` every column is
+    returned and only the children in ``include``.
+    """
+    requested, included = _split(fields), _split(include)
+    if not requested and not included:
+        return None
+
+    unknown = [name for name in requested if name not in SESSION_COLUMNS and name not in SESSION_CHILDREN]
+    unknown += [name for name in included if name not in SESSION_CHILDREN]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+
+    names = set(requested) | set(included) | set(SESSION_KEY_COLUMNS)
+    columns = SESSION_COLUMNS if not requested else tuple(c for c in SESSION_COLUMNS if c in names)
+    # Ordem canônica: a mesma projeção gera sempre a mesma ETag
+    return SessionFields(columns, tuple(c for c in SESSION_CHILDREN if c in names))
+
+
+def session_fields_etag_suffix(fields):
+    if fields is None:
+        return ""
+    digest = hashlib.sha1(f"{','.join(fields.columns)}|{','.join(fields.children)}".encode()).hexdigest()
+    return f"-f{digest[:12]}"
+
+
+def project_session(session, fields):
+    """Cuts a full session document down to ``fields``."""
+    if fields is None:
+        return session
+    return {key: session[key] for key in fields.columns + fields.children if key in session}
+
+
+def _build_session_dict(session, fields=None):
+    session_dict = dict(session)
+    for key, default in SESSION_COLUMN_DEFAULTS:
+        if fields is None or key in fields.columns:
+            session_dict[key] = session.get(key, default)
+
+    # JSONB since migrations/0005 (already decoded by psycopg2); text in older schemas
+    if fields is None or 'executed_indices' in fields.columns:
+        executed_indices = session.get('executed_indices')
+        if isinstance(executed_indices, str):
+            try:
+                executed_indices = json.loads(executed_indices)
+            except ValueError:
+                executed_indices = None
+        session_dict['executed_indices'] = executed_indices if isinstance(executed_indices, list) else []
+
+    for key in SESSION_CHILDREN if fields is None else fields.children:
+        session_dict[key] = []
+    return session_dict
+
+
+def load_session_details(conn, session_ids, fields=None):
+    """
+    Loads the JSON shape of several sessions with one query per table
+    (7 in total for the full document), whatever the number of sessions.
+    With ``fields`` only the requested session columns are selected and
+    child tables that were not asked for are not queried at all.
+    Returns the sessions in the order of ``session_ids``; unknown ids are skipped.
+    """
+    session_ids = list(dict.fromkeys(session_ids))
+    if not session_ids:
+        return []
+
+    columns = '*' if fields is None else ', '.join(fields.columns)
+    children = None if fields is None else set(fields.children)
+
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {columns} FROM session WHERE id = ANY(%s)", (session_ids,))
+        sessions = {row['id']: _build_session_dict(row, fields) for row in cur.fetchall()}
+        if not sessions:
+            return []
+
+        found_ids = list(sessions)
+
+        for key, column, table in SESSION_LINK_TABLES:
+            if children is not None and key not in children:
+                continue
+            cur.execute(f"SELECT session_id, {column} FROM {table} WHERE session_id = ANY(%s)", (found_ids,))
+            for row in cur.fetchall():
+                sessions[row['session_id']][key].append(row[column])
+
+        for key, table, columns in SESSION_ROW_TABLES:
+            if children is not None and key not in children:
+                continue
+            cur.execute(f"SELECT {columns} FROM {table} WHERE session_id = ANY(%s)", (found_ids,))
+            for row in cur.fetchall():
+                row = dict(row)
+                for column in RAW_JSON_COLUMNS:
+                    if isinstance(row.get(column), str):
+                        row[column] = raw_json(row[column])
+                sessions[row['session_id']][key].append(row)
+
+    return [sessions[session_id] for session_id in session_ids if session_id in sessions]
+
+
+def get_session_details(conn, session_id, fields=None):
+    sessions = load_session_details(conn, [session_id], fields)
+    return sessions[0] if sessions else None
+
+
+def load_session_details_cached(conn, session_versions, fields=None):
+    """
+    Read-through variant of ``load_session_details``. ``session_versions`` is
+    a list of (session_id, version) as currently stored in the database; a
+    cached document is only used if it has that exact version, so a worker
+    that missed an invalidation can never serve stale data.
+    Only the misses are loaded, together, in one batch.
+
+    The cache only holds full documents: a sparse read (``fields``) is cut
+    from a cached document when there is one, otherwise loaded sparse and
+    not stored.
+    """
+    if fields is not None:
+        return _load_sparse_cached(conn, session_versions, fields)
+
+    cache = get_session_cache()
+    found = {}
+    misses = []
+    for session_id, version in session_versions:
+        cached = cache.get(session_id, is_fresh=lambda doc, v=version: doc.get('version') == v)
+        if cached is not None:
+            found[session_id] = cached
+        else:
+            misses.append(session_id)
+
+    for session in load_session_details(conn, misses):
+        cache.set(session['id'], session)
+        found[session['id']] = session
+
+    return [found[session_id] for session_id, _ in session_versions if session_id in found]
+
+
+def _load_sparse_cached(conn, session_versions, fields):
+    cache = get_session_cache()
+    found = {}
+    misses = []
+    for session_id, version in session_versions:
+        cached = cache.get(session_id, is_fresh=lambda doc, v=version: doc.get('version') == v)
+        if cached is not None:
+            found[session_id] = project_session(cached, fields)
+        else:
+            misses.append(session_id)
+
+    for session in load_session_details(conn, misses, fields):
+        found[session['id']] = session
+
+    return [found[session_id] for session_id, _ in session_versions if session_id in found]
+
+
+def invalidate_sessions(*session_ids):
+    cache = get_session_cache()
+    for session_id in session_ids:
+        cache.delete(int(session_id))
@@ -0,0 +1,159 @@
+import logging
+import math
+
+from psycopg2.extras import execute_values
+
+# Agregados de migrations/0010. As escritas rodam na mesma transação da
+# rota que grava a nota, então os agregados nunca divergem das tabelas.
+
+# Notas de verified_answers vão de 0 a 100 (ex.: seed.sql grava 50 para 1 de 2 acertos).
+# Histograma com faixas de 10 pontos: 0-9, 10-19, ..., 90-99 e 100 (11 posições).
+# Notas fora de 0..100 vão para as pontas e são contadas em score_out_of_range.
+SCORE_MIN = 0
+SCORE_MAX = 100
+SCORE_BUCKET_WIDTH = 10
+SCORE_BUCKETS = (SCORE_MAX - SCORE_MIN) // SCORE_BUCKET_WIDTH + 1
+
+# Um VALUES por sessão com os agregados das notas novas; histogramas somados posição a posição
+RECORD_SCORES_SQL = """
+    INSERT INTO session_performance_stats AS st
+        (session_id, score_count, score_sum, score_sumsq, score_min, score_max, score_histogram, score_out_of_range)
+    VALUES %s
+    ON CONFLICT (session_id) DO UPDATE
+    SET score_count = st.score_count + EXCLUDED.score_count,
+        score_out_of_range = st.score_out_of_range + EXCLUDED.score_out_of_range,
+        score_sum = st.score_sum + EXCLUDED.score_sum,
+        score_sumsq = st.score_sumsq + EXCLUDED.score_sumsq,
+        score_min = LEAST(st.score_min, EXCLUDED.score_min),
+        score_max = GREATEST(st.score_max, EXCLUDED.score_max),
+        score_histogram = ARRAY(
+            SELECT old + new
+            FROM unnest(st.score_histogram, EXCLUDED.score_histogram) WITH ORDINALITY AS h(old, new, pos)
+            ORDER BY pos
+        )
+"""
+
+RECORD_EXTRA_NOTE_SQL = """
+    INSERT INTO session_performance_stats AS st
+        (session_id, extra_count, extra_sum, extra_sumsq, extra_min, extra_max)
+    VALUES (%(session_id)s, 1, %(value)s, %(value)s * %(value)s, %(value)s, %(value)s)
+    ON CONFLICT (session_id) DO UPDATE
+    SET extra_count = st.extra_count + 1,
+        extra_sum = st.extra_sum + EXCLUDED.extra_sum,
+        extra_sumsq = st.extra_sumsq + EXCLUDED.extra_sumsq,
+        extra_min = LEAST(st.extra_min, EXCLUDED.extra_min),
+        extra_max = GREATEST(st.extra_max, EXCLUDED.extra_max)
+"""
+
+# Uma nota extra foi substituída: min/max não podem ser "desfeitos" incrementalmente,
+# então os agregados de extras da sessão são recalculados (índice por session_id).
+REFRESH_EXTRA_NOTES_SQL = """
+    INSERT INTO session_performance_stats AS st
+        (session_id, extra_count, extra_sum, extra_sumsq, extra_min, extra_max)
+    SELECT %(session_id)s, COUNT(*), COALESCE(SUM(extra_notes), 0), COALESCE(SUM(extra_notes * extra_notes), 0),
+           MIN(extra_notes), MAX(extra_notes)
+    FROM extra_notes
+    WHERE session_id = %(session_id)s
+    ON CONFLICT (session_id) DO UPDATE
+    SET extra_count = EXCLUDED.extra_count,
+        extra_sum = EXCLUDED.extra_sum,
+        extra_sumsq = EXCLUDED.extra_sumsq,
+        extra_min = EXCLUDED.extra_min,
+        extra_max = EXCLUDED.extra_max
+"""
+
+RESET_SCORES_SQL = f"""
+    UPDATE session_performance_stats
+    SET score_count = 0, score_sum = 0, score_sumsq = 0, score_min = NULL, score_max = NULL,
+        score_histogram = array_fill(0, ARRAY[{SCORE_BUCKETS}]), score_out_of_range = 0
+    WHERE session_id = %(session_id)s
+"""
+
+# Colunas para juntar a SELECTs de session (LEFT JOIN session_performance_stats p)
+PERFORMANCE_STATS_COLUMNS = """
+    p.score_count, p.score_sum, p.score_sumsq, p.score_min, p.score_max, p.score_histogram, p.score_out_of_range,
+    p.extra_count, p.extra_sum, p.extra_sumsq, p.extra_min, p.extra_max
+"""
+
+
+def score_in_range(score):
+    return SCORE_MIN <= score <= SCORE_MAX
+
+
+def score_bucket(score):
+    """Posição (0-based) da nota no histograma; notas fora de 0..100 vão para as pontas."""
+    score = min(max(int(score), SCORE_MIN), SCORE_MAX)
+    return (score - SCORE_MIN) // SCORE_BUCKET_WIDTH
+
+
+def bucket_label(bucket):
+    low = SCORE_MIN + bucket * SCORE_BUCKET_WIDTH
+    high = min(low + SCORE_BUCKET_WIDTH - 1, SCORE_MAX)
+    return str(low) if low == high else f"{low}-{high}"
+
+
+def record_scores(cur, scores):
+    """Soma as notas ``[(session_id, score), ...]`` aos agregados, um statement para todas as sessões."""
+    per_session = {}
+    for session_id, score in scores:
+        session_id, score = int(session_id), int(score)
+        row = per_session.get(session_id)
+        if row is None:
+            row = per_session[session_id] = [session_id, 0, 0, 0, score, score, [0] * SCORE_BUCKETS, 0]
+        row[1] += 1
+        row[2] += score
+        row[3] += score * score
+        row[4] = min(row[4], score)
+        row[5] = max(row[5], score)
+        row[6][score_bucket(score)] += 1
+        if not score_in_range(score):
+            row[7] += 1
+            logging.warning(f"Score {score} of session {session_id} is outside {SCORE_MIN}..{SCORE_MAX}; "
+                            f"counted in the edge bucket and in score_out_of_range")
+
+    if per_session:
+        # Ordem fixa de session_id: dois lotes concorrentes travam as linhas na mesma ordem (sem deadlock)
+        execute_values(cur, RECORD_SCORES_SQL, [tuple(per_session[session_id]) for session_id in sorted(per_session)],
+                       template="(%s, %s, %s, %s, %s, %s, %s::integer[], %s)", page_size=len(per_session))
+
+
+def record_score(cur, session_id, score):
+    record_scores(cur, [(session_id, score)])
+
+
+def record_extra_note(cur, session_id, value):
+    cur.execute(RECORD_EXTRA_NOTE_SQL, {"session_id": session_id, "value": value})
+
+
+def refresh_extra_note_stats(cur, session_id):
+    cur.execute(REFRESH_EXTRA_NOTES_SQL, {"session_id": session_id})
+
+
+def reset_score_stats(cur, session_id):
+    """Chamado quando as respostas da sessão são apagadas (troca de estratégia/domínio)."""
+    cur.execute(RESET_SCORES_SQL, {"session_id": session_id})
+
+
+def _distribution(count, total, sumsq, minimum, maximum):
+    count = count or 0
+    if not count:
+        return {"count": 0, "avg": 0, "stddev": 0, "min": None, "max": None}
+    avg = float(total) / count
+    variance = max(float(sumsq) / count - avg * avg, 0.0)
+    return {"count": count, "avg": avg, "stddev": math.sqrt(variance), "min": minimum, "max": maximum}
+
+
+def performance_digest(row):
+    """
+    Resumo estatístico a partir das colunas PERFORMANCE_STATS_COLUMNS de uma
+    linha (NULLs = sessão sem notas ainda).
+    """
+    scores = _distribution(row.get('score_count'), row.get('score_sum'), row.get('score_sumsq'),
+                           row.get('score_min'), row.get('score_max'))
+    scores["histogram"] = {
+        bucket_label(bucket): count for bucket, count in enumerate(row.get('score_histogram') or []) if count
+    }
+    scores["out_of_range"] = row.get('score_out_of_range') or 0
+    extras = _distribution(row.get('extra_count'), row.get('extra_sum'), row.get('extra_sumsq'),
+                           row.get('extra_min'), row.get('extra_max'))
+    return {"scores": scores, "extras": extras}
@@ -0,0 +1,36 @@
+# Versão por sessão (migrations/0007) usada como ETag nas leituras.
+# Toda rota que altera a sessão ou suas tabelas filhas precisa incrementá-la:
+# nos UPDATEs da própria sessão com VERSION_BUMP_SQL, nas demais com bump_session_version.
+
+VERSION_BUMP_SQL = "version = version + 1"
+
+
+def bump_session_version(cur, session_ids):
+    if isinstance(session_ids, int):
+        session_ids = [session_ids]
+    # ::int[] para que a lista nunca seja comparada como text[] com a coluna integer
+    cur.execute(f"UPDATE session SET {VERSION_BUMP_SQL} WHERE id = ANY(%s::int[])", (list(session_ids),))
+
+
+def session_etag(session_id, version):
+    return f"s{session_id}-v{version}"
+
+
+def get_session_version(cur, session_id):
+    cur.execute("SELECT version FROM session WHERE id = %s", (session_id,))
+    row = cur.fetchone()
+    return row['version'] if row else None
+
+
+def get_sessions_list_etag(cur, after_id=None, suffix=""):
+    """
+    Cheap fingerprint of every session after ``after_id``: any insert changes
+    max(id), any delete changes the count and any bump changes the sum.
+    """
+    cur.execute("""
+        SELECT COUNT(*) AS total, COALESCE(SUM(version), 0) AS versions, COALESCE(MAX(id), 0) AS max_id
+        FROM session
+        WHERE id > %s
+    """, (after_id or 0,))
+    row = cur.fetchone()
+    return f"l{row['total']}-{row['versions']}-{row['max_id']}{suffix}"
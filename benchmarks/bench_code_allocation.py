@@ -0,0 +1,171 @@
+"""
+Session code allocation: SELECT-probe loop vs INSERT ... ON CONFLICT retry.
+
+Counts database round trips per allocated code at increasing fill ratios of
+the code space. The default mode simulates the table in memory; pass
+--database-url to run both strategies against a real PostgreSQL temp table.
+
+    python benchmarks/bench_code_allocation.py
+    python benchmarks/bench_code_allocation.py --database-url postgresql://... --code-length 3
+"""
+import argparse
+import random
+import string
+import time
+
+ALPHABET = string.ascii_uppercase + string.digits
+FILL_RATIOS = (0.0, 0.5, 0.9, 0.95, 0.99)
+
+
+def random_code(length):
+    return ''.join(random.choices(ALPHABET, k=length))
+
+
+def prefill(count, length):
+    taken = set()
+    while len(taken) < count:
+        taken.add(random_code(length))
+    return taken
+
+
+# ------------------------------------------------------------------------------
+# Simulação em memória (cada operação = 1 round trip)
+# ------------------------------------------------------------------------------
+
+def simulate_probe(taken, length):
+    round_trips = 0
+    while True:
+        code = random_code(length)
+        round_trips += 1  # SELECT 1 FROM session WHERE code = %s
+        if code not in taken:
+            break
+    round_trips += 1  # INSERT
+    taken.add(code)
+    return round_trips
+
+
+def simulate_conflict_retry(taken, length):
+    round_trips = 0
+    while True:
+        code = random_code(length)
+        round_trips += 1  # INSERT ... ON CONFLICT (code) DO NOTHING RETURNING id
+        if code not in taken:
+            taken.add(code)
+            return round_trips
+
+
+def simulate_batch_conflict_retry(taken, length, batch_size):
+    # Como _insert_session_rows: um INSERT multi-row por rodada, só os rejeitados voltam
+    round_trips = 0
+    missing = batch_size
+    while missing:
+        codes = set()
+        while len(codes) < missing:
+            codes.add(random_code(length))
+        round_trips += 1
+        accepted = codes - taken
+        taken |= accepted
+        missing -= len(accepted)
+    return round_trips
+
+
+def run_simulation(length, allocations, batch_size):
+    space = len(ALPHABET) ** length
+    print(f"Simulated code space: {space} codes (length {length}), {allocations} allocations per point")
+    print(f"{'fill':>6} | {'probe RT/code':>13} | {'conflict RT/code':>16} | {f'batch-{batch_size} RT/code':>18}")
+    for ratio in FILL_RATIOS:
+        base = prefill(int(space * ratio), length)
+        results = []
+        for strategy in (simulate_probe, simulate_conflict_retry):
+            taken = set(base)
+            total = sum(strategy(taken, length) for _ in range(allocations))
+            results.append(total / allocations)
+
+        taken = set(base)
+        batches = max(1, allocations // batch_size)
+        total = sum(simulate_batch_conflict_retry(taken, length, batch_size) for _ in range(batches))
+        results.append(total / (batches * batch_size))
+        print(f"{ratio:>6.2f} | {results[0]:>13.2f} | {results[1]:>16.2f} | {results[2]:>18.2f}")
+
+
+# ------------------------------------------------------------------------------
+# PostgreSQL real
+# ------------------------------------------------------------------------------
+
+def _setup_table(cur, taken):
+    from psycopg2.extras import execute_values
+
+    cur.execute("DROP TABLE IF EXISTS bench_session_codes")
+    cur.execute("CREATE TEMP TABLE bench_session_codes (id SERIAL PRIMARY KEY, code VARCHAR(50) NOT NULL UNIQUE)")
+    if taken:
+        execute_values(cur, "INSERT INTO bench_session_codes (code) VALUES %s",
+                       [(c,) for c in taken], page_size=10000)
+
+
+def db_probe(cur, length):
+    round_trips = 0
+    while True:
+        code = random_code(length)
+        cur.execute("SELECT 1 FROM bench_session_codes WHERE code = %s", (code,))
+        round_trips += 1
+        if not cur.fetchone():
+            break
+    cur.execute("INSERT INTO bench_session_codes (code) VALUES (%s) RETURNING id", (code,))
+    return round_trips + 1
+
+
+def db_conflict_retry(cur, length):
+    round_trips = 0
+    while True:
+        cur.execute("""
+            INSERT INTO bench_session_codes (code) VALUES (%s)
+            ON CONFLICT (code) DO NOTHING
+            RETURNING id
+        """, (random_code(length),))
+        round_trips += 1
+        if cur.fetchone():
+            return round_trips
+
+
+def run_database(db_url, length, allocations):
+    import psycopg2
+
+    space = len(ALPHABET) ** length
+    conn = psycopg2.connect(db_url)
+    print(f"PostgreSQL code space: {space} codes (length {length}), {allocations} allocations per point")
+    print(f"{'fill':>6} | {'probe RT/code':>13} | {'probe ms/code':>13} | {'conflict RT/code':>16} | {'conflict ms/code':>16}")
+    try:
+        with conn.cursor() as cur:
+            for ratio in FILL_RATIOS:
+                base = prefill(int(space * ratio), length)
+                row = []
+                for strategy in (db_probe, db_conflict_retry):
+                    _setup_table(cur, base)
+                    started = time.perf_counter()
+                    total = sum(strategy(cur, length) for _ in range(allocations))
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    row += [total / allocations, elapsed_ms / allocations]
+                print(f"{ratio:>6.2f} | {row[0]:>13.2f} | {row[1]:>13.3f} | {row[2]:>16.2f} | {row[3]:>16.3f}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--code-length', type=int, default=3,
+                        help="Tamanho do código (3 deixa o espaço pequeno o bastante para encher)")
+    parser.add_argument('--allocations', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help="Tamanho do lote simulado (POST /sessions/create_batch)")
+    parser.add_argument('--database-url', help="Roda contra um PostgreSQL real em vez da simulação")
+    args = parser.parse_args()
+
+    if args.database_url:
+        run_database(args.database_url, args.code_length, args.allocations)
+    else:
+        run_simulation(args.code_length, args.allocations, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
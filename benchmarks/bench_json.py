@@ -0,0 +1,122 @@
+"""
+JSON serialization of GET /sessions: Flask's default provider vs orjson.
+
+Builds a realistic listing of --sessions sessions, then times the full
+response body. Each session has datetimes, ratings, link lists, and
+--students verified answers with a JSONB answers list of --exercises items.
+It compares three encoders:
+
+    flask-json       stdlib json, answers decoded to Python (current behaviour)
+    orjson           OrjsonProvider, answers decoded to Python
+    orjson+raw       OrjsonProvider, answers kept as jsonb::text (RawJSON)
+
+Also times the psycopg2-side decode that RawJSON avoids (json.loads of each
+answers column).
+
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --sessions 1000 --students 30 --exercises 20 --repeat 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.services.json_provider import OrjsonProvider, RawJSON  # noqa: E402
+
+
+# ------------------------------------------------------------------------------
+# Payload (mesmo formato de load_session_details)
+# ------------------------------------------------------------------------------
+
+def build_answers(exercises):
+    return [{"exercise_id": 100 + i, "answer": random.randint(0, 3), "correct": random.random() < 0.6}
+            for i in range(exercises)]
+
+
+def build_session(session_id, students, exercises, raw):
+    started = datetime(2025, 3, 1, 8, 0) + timedelta(minutes=session_id)
+    answers = []
+    for n in range(students):
+        value = build_answers(exercises)
+        answers.append({
+            "id": session_id * 1000 + n, "student_name": f"aluno_{n}", "student_id": str(n),
+            "answers": RawJSON(json.dumps(value)) if raw else value,
+            "score": random.randint(0, 10), "session_id": session_id,
+        })
+    return {
+        "id": session_id, "code": f"S{session_id:05d}", "status": "finished",
+        "start_time": started, "current_tactic_started_at": started + timedelta(minutes=12),
+        "current_tactic_index": 3, "use_agent": True, "end_on_next_completion": False,
+        "executed_indices": [0, 1, 2, 3], "rating_average": round(random.uniform(1, 5), 2), "rating_count": students,
+        "version": 7, "strategies": ["1"], "teachers": ["2"], "students": [str(n) for n in range(students)],
+        "domains": ["4", "5"], "verified_answers": answers,
+        "extra_notes": [{"id": session_id, "student_id": 1, "session_id": session_id, "extra_notes": 1.5}],
+    }
+
+
+def build_payload(sessions, students, exercises, raw):
+    random.seed(42)
+    return [build_session(i, students, exercises, raw) for i in range(1, sessions + 1)]
+
+
+# ------------------------------------------------------------------------------
+# Medição
+# ------------------------------------------------------------------------------
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--exercises", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    flask_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+
+    decoded = build_payload(args.sessions, args.students, args.exercises, raw=False)
+    raw = build_payload(args.sessions, args.students, args.exercises, raw=True)
+    raw_texts = [a["answers"].text for s in raw for a in s["verified_answers"]]
+
+    with app.app_context():
+        cases = [
+            ("flask-json", lambda: flask_provider.response(decoded).get_data()),
+            ("orjson", lambda: orjson_provider.response(decoded).get_data()),
+            ("orjson+raw", lambda: orjson_provider.response(raw).get_data()),
+        ]
+        print(f"{args.sessions} sessions x {args.students} answers x {args.exercises} exercises, "
+              f"best of {args.repeat}")
+        print(f"{'encoder':<14}{'ms':>10}{'MB':>8}{'speedup':>10}")
+        baseline = None
+        for name, fn in cases:
+            elapsed, body = best_of(fn, args.repeat)
+            baseline = baseline or elapsed
+            print(f"{name:<14}{elapsed * 1000:>10.1f}{len(body) / 1e6:>8.2f}{baseline / elapsed:>9.1f}x")
+
+    decode, _ = best_of(lambda: [json.loads(text) for text in raw_texts], args.repeat)
+    print(f"\njsonb decode skipped by RawJSON (json.loads of {len(raw_texts)} answers): {decode * 1000:.1f} ms")
+    if getattr(orjson_provider, "_fragment", None) is None:
+        print("note: orjson < 3.9 has no Fragment; RawJSON is parsed during serialization")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Serving throughput: Flask dev server vs gunicorn (gunicorn.conf.py).
+
+Fires concurrent keep-alive GET requests at each target for a fixed time and
+reports requests/s, latency percentiles and errors. With --spawn both servers
+are started locally from this checkout (dev server on --dev-port, gunicorn on
+--gunicorn-port) and stopped at the end; otherwise pass running targets.
+
+    python benchmarks/bench_serving.py --spawn --path /metrics
+    python benchmarks/bench_serving.py --target dev=http://localhost:5001 --target prod=http://localhost:8000 \\
+        --path /sessions --concurrency 64 --duration 20
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------------------------------------------
+# Carga: N threads, cada uma com sua conexão keep-alive
+# ------------------------------------------------------------------------------
+
+def worker(base_url, path, stop_at, latencies, errors, lock):
+    parts = urlsplit(base_url)
+    conn = None
+    local_latencies, local_errors = [], 0
+    while time.monotonic() < stop_at:
+        if conn is None:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                local_errors += 1
+            else:
+                local_latencies.append(time.perf_counter() - started)
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run_load(base_url, path, concurrency, duration):
+    latencies, errors, lock = [], [], threading.Lock()
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=worker, args=(base_url, path, stop_at, latencies, errors, lock))
+               for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    return sorted(latencies), sum(errors), elapsed
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+# ------------------------------------------------------------------------------
+# Servidores locais (--spawn)
+# ------------------------------------------------------------------------------
+
+def wait_ready(base_url, path, timeout=30.0):
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request("GET", path)
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{base_url} did not come up within {timeout}s")
+
+
+def spawn_servers(args):
+    env = dict(os.environ, FLASK_DEBUG="0")
+    dev = subprocess.Popen(
+        [sys.executable, "-m", "flask", "--app", "wsgi", "run", "--host", "127.0.0.1",
+         "--port", str(args.dev_port), "--with-threads"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    prod = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{args.gunicorn_port}",
+         "--access-logfile", "/dev/null", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    targets = [("flask-dev", f"http://127.0.0.1:{args.dev_port}"),
+               ("gunicorn", f"http://127.0.0.1:{args.gunicorn_port}")]
+    return [dev, prod], targets
+
+
+def parse_target(value):
+    name, _, url = value.partition("=")
+    if not url:
+        raise argparse.ArgumentTypeError("target must be name=http://host:port")
+    return name, url.rstrip("/")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", action="append", type=parse_target, default=[],
+                        help="name=base_url of a running server (repeatable)")
+    parser.add_argument("--spawn", action="store_true", help="start the dev server and gunicorn locally")
+    parser.add_argument("--dev-port", type=int, default=5101)
+    parser.add_argument("--gunicorn-port", type=int, default=5102)
+    parser.add_argument("--path", default="/metrics")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    processes, targets = [], list(args.target)
+    if args.spawn:
+        processes, spawned = spawn_servers(args)
+        targets += spawned
+    if not targets:
+        parser.error("pass --spawn or at least one --target")
+
+    try:
+        print(f"GET {args.path}  concurrency={args.concurrency}  duration={args.duration}s")
+        print(f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, base_url in targets:
+            wait_ready(base_url, args.path)
+            latencies, errors, elapsed = run_load(base_url, args.path, args.concurrency, args.duration)
+            print(f"{name:<12}{len(latencies) / elapsed:>10.1f}"
+                  f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 95) * 1000:>10.2f}"
+                  f"{percentile(latencies, 99) * 1000:>10.2f}{errors:>8}")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=40)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,82 @@
 import os
 from dotenv import load_dotenv
 
-load_dotenv('config.env')
+# Único ponto que lê o config.env (create_app não carrega de novo)
+load_dotenv(os.path.join(os.getcwd(), 'config.env'))
 
 
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # As rotas usam psycopg2 direto; o Flask-SQLAlchemy só é importado e ligado ao app com SQLALCHEMY_ENABLED=1
+    SQLALCHEMY_ENABLED = os.getenv('SQLALCHEMY_ENABLED', '0') == '1'
     # Adicione a chave aqui
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
\ No newline at end of file
+    GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+
+    # Pool de conexões PostgreSQL (um por worker)
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    # Segundos esperando uma conexão livre antes de responder 503
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5.0))
+    # Conexões ociosas há mais tempo que isso recebem um "SELECT 1" no checkout (0 = sempre, -1 = nunca)
+    DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30.0))
+    # Conexões acima do mínimo são fechadas após esse tempo ociosas (-1 = nunca)
+    DB_POOL_MAX_IDLE = float(os.getenv('DB_POOL_MAX_IDLE', 300.0))
+    # statement_timeout do PostgreSQL em ms (0 = sem limite)
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+    # Cache read-through de GET /sessions e GET /sessions/<id>
+    # memory (por worker), redis (compartilhado, requer o pacote redis) ou none
+    SESSION_CACHE_BACKEND = os.getenv('SESSION_CACHE_BACKEND', 'memory')
+    SESSION_CACHE_URL = os.getenv('SESSION_CACHE_URL')
+    SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 1000))
+    SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', 60.0))
+
+    # Cache dos resumos gerados pelo LLM, endereçado pelo hash do prompt + parâmetros do modelo
+    # memory (por worker), redis (compartilhado) ou none
+    LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'memory')
+    LLM_CACHE_URL = os.getenv('LLM_CACHE_URL')
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 500))
+    LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 3600.0))
+
+    # Gateway LLM (cliente único por worker, compatível com a API da OpenAI)
+    LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'https://api.groq.com/openai/v1')
+    # Deadline total de uma chamada em segundos, retries incluídos
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 20.0))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+    # Chamadas simultâneas por worker; quem excede espera até LLM_ACQUIRE_TIMEOUT segundos
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+    LLM_ACQUIRE_TIMEOUT = float(os.getenv('LLM_ACQUIRE_TIMEOUT', 5.0))
+    # Falhas seguidas que abrem o circuito, e segundos até tentar de novo
+    LLM_CIRCUIT_FAILURES = int(os.getenv('LLM_CIRCUIT_FAILURES', 5))
+    LLM_CIRCUIT_RESET = float(os.getenv('LLM_CIRCUIT_RESET', 30.0))
+
+    # Jobs assíncronos dos endpoints de agente (?async=1): threads por worker e fila máxima
+    AGENT_JOB_WORKERS = int(os.getenv('AGENT_JOB_WORKERS', 4))
+    AGENT_JOB_QUEUE_SIZE = int(os.getenv('AGENT_JOB_QUEUE_SIZE', 32))
+    # Segundos após os quais GET /jobs/<id> reporta como failed um job que o worker
+    # abandonou (OOM, SIGKILL): running conta de started_at, pending de created_at
+    AGENT_JOB_STALE_AFTER = float(os.getenv('AGENT_JOB_STALE_AFTER', LLM_TIMEOUT + 60))
+    AGENT_JOB_PENDING_STALE_AFTER = float(os.getenv('AGENT_JOB_PENDING_STALE_AFTER', 600.0))
+    # Jobs mais antigos que isso (dias) são apagados a cada submit; 0 desliga
+    AGENT_JOB_RETENTION_DAYS = int(os.getenv('AGENT_JOB_RETENTION_DAYS', 7))
+
+    # Write-behind de /sessions/submit_answer (opt-in): respostas de vários requests
+    # gravadas em um único INSERT/COMMIT a cada MAX_DELAY_MS ou MAX_BATCH registros.
+    # A resposta HTTP só sai depois do COMMIT.
+    ANSWER_WRITE_BEHIND = os.getenv('ANSWER_WRITE_BEHIND', '0') == '1'
+    ANSWER_BUFFER_MAX_BATCH = int(os.getenv('ANSWER_BUFFER_MAX_BATCH', 200))
+    ANSWER_BUFFER_MAX_DELAY_MS = float(os.getenv('ANSWER_BUFFER_MAX_DELAY_MS', 5.0))
+    # Fila cheia: o request espera até ENQUEUE_TIMEOUT segundos e então recebe 503
+    ANSWER_BUFFER_MAX_PENDING = int(os.getenv('ANSWER_BUFFER_MAX_PENDING', 5000))
+    ANSWER_BUFFER_ENQUEUE_TIMEOUT = float(os.getenv('ANSWER_BUFFER_ENQUEUE_TIMEOUT', 1.0))
+
+    # Serialização das respostas: orjson (padrão; cai para o json da stdlib se não estiver instalado) ou default.
+    # JSON_DATETIME_FORMAT=iso troca as datas HTTP (formato atual do Flask) por ISO 8601 — muda o contrato!
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    JSON_DATETIME_FORMAT = os.getenv('JSON_DATETIME_FORMAT', 'http')
+
+    # Aplica as migrations pendentes (migrations/*.sql) ao criar o app.
+    # Desligue (AUTO_MIGRATE=0) quando o deploy rodar "python migrate.py" separadamente.
+    AUTO_MIGRATE = os.getenv('AUTO_MIGRATE', '1') == '1'
\ No newline at end of file
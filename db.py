@@ -1,11 +1,23 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
 
 # PostgreSQL connection
-def create_connection(db_url):
+def create_connection(db_url, statement_timeout_ms=None):
     try:
-        connection = psycopg2.connect(db_url)
-        
+        options = {}
+        if statement_timeout_ms:
+            # Aplicado pelo servidor a cada statement desta conexão
+            options['options'] = f"-c statement_timeout={int(statement_timeout_ms)}"
+
+        connection = psycopg2.connect(db_url, **options)
+
         # connection = psycopg2.connect(
         #     dbname="postgres",        # nome do banco
         #     user="user",        # usuário
@@ -21,4 +33,309 @@ def create_connection(db_url):
 
     except psycopg2.Error as e:
         print(f"PostgreSQL connection error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+# ==============================================================================
+# POOL DE CONEXÕES (um por processo/worker)
+# ==============================================================================
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - Never holds more than ``maxconn`` connections open.
+    - ``getconn`` waits at most ``timeout`` seconds for a free slot.
+    - Connections idle for longer than ``health_check_interval`` seconds are
+      pinged before being handed out (0 pings on every checkout, None never).
+    - Idle connections above ``minconn`` are closed after ``max_idle`` seconds.
+    """
+
+    def __init__(self, db_url, minconn=1, maxconn=10, timeout=5.0,
+                 health_check_interval=30.0, max_idle=300.0,
+                 statement_timeout_ms=None, connect=create_connection):
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError("Invalid pool size: need 0 <= minconn <= maxconn and maxconn >= 1")
+
+        self.db_url = db_url
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_idle = max_idle
+        self.statement_timeout_ms = statement_timeout_ms
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at)
+        self._size = 0        # conexões abertas + slots reservados
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "failed_health_checks": 0,
+            "wait_time_total_ms": 0.0,
+            "wait_time_max_ms": 0.0,
+        }
+        self._waiting = 0
+
+    # ----------------------------------------------------------------------
+    def _open(self):
+        conn = self._connect(self.db_url, self.statement_timeout_ms)
+        if conn is None:
+            raise Exception("Failed to connect to database")
+        return conn
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["discarded"] += 1
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if self.health_check_interval is None or idle_for < self.health_check_interval:
+            return True
+        try:
+            # Ping fora de transação para não precisar de um ROLLBACK extra
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.autocommit = False
+            return True
+        except Exception:
+            self._stats["failed_health_checks"] += 1
+            return False
+
+    def _reap_idle(self, now):
+        # Chamado com o lock; fecha conexões ociosas demais acima do mínimo
+        if self.max_idle is None:
+            return
+        while len(self._idle) and self._size > self.minconn:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.max_idle:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._discard(conn)
+
+    # ----------------------------------------------------------------------
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout is not None else None
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise Exception("Connection pool is closed")
+
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size >= self.maxconn:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise PoolTimeout(
+                                f"Timed out after {self.timeout}s waiting for a database connection "
+                                f"(pool size {self.maxconn})"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+                now = time.monotonic()
+                waited_ms = (now - started) * 1000
+                if self._idle:
+                    conn, returned_at = self._idle.pop()  # LIFO: conexão mais "quente"
+                    self._reap_idle(now)
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1  # reserva o slot antes de conectar fora do lock
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+            elif not self._is_healthy(conn, now - returned_at):
+                with self._cond:
+                    self._discard(conn)
+                    self._size -= 1
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total_ms"] += waited_ms
+                self._stats["wait_time_max_ms"] = max(self._stats["wait_time_max_ms"], waited_ms)
+            return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                # Rotas que retornam cedo (ex.: 404) deixam a transação aberta
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+        else:
+            discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def warmup(self):
+        """Opens connections until ``minconn`` are available."""
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._size >= self.minconn:
+                        break
+                    self._size += 1
+                try:
+                    opened.append(self._open())
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+        finally:
+            with self._cond:
+                now = time.monotonic()
+                self._idle.extend((conn, now) for conn in opened)
+                self._cond.notify_all()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                **self._stats,
+            }
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_setting(name, default, cast):
+    """Lê a configuração do app Flask (se houver) ou do ambiente."""
+    value = None
+    try:
+        from flask import current_app
+        value = current_app.config.get(name)
+    except RuntimeError:
+        pass  # Fora de um app context
+    if value is None:
+        value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return cast(value)
+
+
+def _optional_float(value):
+    value = float(value)
+    return None if value < 0 else value
+
+
+def get_db_url():
+    db_url = None
+    try:
+        from flask import current_app
+        db_url = current_app.config.get("SQLALCHEMY_DATABASE_URI")
+    except RuntimeError:
+        pass
+    return db_url or os.getenv("DATABASE_URL")
+
+
+def get_pool():
+    """
+    Returns this process' pool, creating it on first use.
+
+    The pool is tied to the PID that created it, so a worker forked from a
+    preloaded master never reuses the master's sockets.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(
+                get_db_url(),
+                minconn=get_setting("DB_POOL_MIN_SIZE", 1, int),
+                maxconn=get_setting("DB_POOL_MAX_SIZE", 10, int),
+                timeout=get_setting("DB_POOL_TIMEOUT", 5.0, _optional_float),
+                health_check_interval=get_setting("DB_POOL_HEALTH_CHECK_INTERVAL", 30.0, _optional_float),
+                max_idle=get_setting("DB_POOL_MAX_IDLE", 300.0, _optional_float),
+                statement_timeout_ms=get_setting("DB_STATEMENT_TIMEOUT_MS", 0, int),
+            )
+            _pool_pid = pid
+    return _pool
+
+
+def pool_stats():
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
+
+
+def close_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _pool_pid = None
+
+
+@contextmanager
+def get_db_connection():
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
@@ -0,0 +1,139 @@
+"""
+Gunicorn configuration for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every knob can be overridden through the environment (GUNICORN_WORKERS,
+GUNICORN_WORKER_CLASS, GUNICORN_THREADS, GUNICORN_SSE_CLIENTS,
+GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, PORT...).
+
+Concurrency limit: every open /sessions/<id>/events stream holds one
+thread (gthread) for the whole lesson. With gthread, an instance serves at
+most ``workers * threads`` concurrent requests, SSE streams included. Once
+that many students are connected, every other route queues behind them.
+
+- gthread (default): set GUNICORN_SSE_CLIENTS to the number of SSE
+  subscribers expected per instance. Each worker then gets
+  ceil(GUNICORN_SSE_CLIENTS / workers) threads on top of GUNICORN_THREADS,
+  so regular requests keep GUNICORN_THREADS free threads.
+- gevent (GUNICORN_WORKER_CLASS=gevent, requires ``pip install gevent
+  psycogreen``): a stream costs a greenlet, not a thread. The limit becomes
+  ``workers * GUNICORN_WORKER_CONNECTIONS`` (default 1000). psycopg2 is made
+  cooperative with psycogreen.
+- Alternatively, route /sessions/*/events at the proxy to a separate gunicorn
+  started with GUNICORN_WORKER_CLASS=gevent, and keep gthread for the rest.
+"""
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import threading
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5001')}")
+
+# Processos x threads: as rotas passam a maior parte do tempo esperando
+# Postgres/LLM, então threads por worker rendem mais que só processos.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+
+# gthread: threads para as requisições normais + uma por stream SSE esperado
+sse_clients = int(os.getenv("GUNICORN_SSE_CLIENTS", "0"))
+threads = int(os.getenv("GUNICORN_THREADS", "4")) + math.ceil(sse_clients / workers)
+
+# gevent/eventlet: conexões simultâneas (greenlets) por worker
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# O app (e as migrações de AUTO_MIGRATE) sobe uma vez no master; os workers herdam via fork.
+# Com gevent o padrão é não pré-carregar: os locks criados no import ficariam sem monkey patch.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0" if worker_class == "gevent" else "1") == "1"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recicla workers de tempos em tempos (jitter evita reciclar todos juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
+
+
+def pre_fork(server, worker):
+    # O master pode ter aberto conexões (migrações); os workers nunca as reutilizam
+    from db import close_pool
+    close_pool()
+
+
+def post_worker_init(worker):
+    """
+    Warms this worker's pool and caches before it accepts requests. Runs
+    after gevent's monkey patching, so locks and sockets are cooperative.
+    """
+    if worker_class == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            # Sem psycogreen cada query bloqueia todas as greenlets do worker
+            worker.log.warning("GUNICORN_WORKER_CLASS=gevent without psycogreen: psycopg2 calls block the worker")
+
+    _stop_streams_on_sigterm()
+
+    from db import get_pool
+    from app.services.cache import get_session_cache
+    from app.services.llm_cache import get_llm_cache
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        get_session_cache()
+        get_llm_cache()
+        if app.config["SQLALCHEMY_DATABASE_URI"].startswith("postgres"):
+            try:
+                get_pool().warmup()
+            except Exception as e:
+                # Sem banco na subida o worker ainda atende; o pool conecta sob demanda
+                logging.warning(f"Worker {worker.pid}: pool warmup failed: {e}")
+
+
+def _stop_streams_on_sigterm():
+    """
+    SSE streams only end on 'finished', so the graceful shutdown would wait
+    for them until graceful_timeout and then SIGKILL the worker. On SIGTERM
+    the event hub is stopped first, which closes every open stream, and then
+    gunicorn's own handler runs.
+    """
+    from app.services.session_events import stop_event_hub
+
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        # Fora do handler: stop() usa locks que a thread interrompida pode estar segurando
+        threading.Thread(target=stop_event_hub, name="stop-session-events", daemon=True).start()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    """
+    Runs after the worker stopped accepting requests and finished the
+    in-flight ones (or graceful_timeout expired): flushes pending writes,
+    waits for background jobs, then closes the database connections.
+    """
+    from db import close_pool
+    from app.services.agent_jobs import shutdown_job_runner
+    from app.services.answer_writes import shutdown_answer_buffer
+    from app.services.session_events import stop_event_hub
+
+    for name, step in (("answer buffer", lambda: shutdown_answer_buffer(timeout=graceful_timeout)),
+                       ("agent jobs", lambda: shutdown_job_runner(wait=True)),
+                       ("session events", stop_event_hub),
+                       ("db pool", close_pool)):
+        try:
+            step()
+        except Exception as e:
+            server.log.warning(f"Worker {worker.pid}: {name} shutdown failed: {e}")
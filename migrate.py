@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+SEED_FILE = os.path.join(MIGRATIONS_DIR, 'seed.sql')
+
+# Chave arbitrária do pg_advisory_xact_lock: serializa workers subindo juntos
+MIGRATION_LOCK_KEY = 7263541
+
+_MIGRATION_FILE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Returns [(version, name, path)] for every NNNN_name.sql file, ordered by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort()
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def run_migrations(conn, directory=MIGRATIONS_DIR):
+    """
+    Applies every pending migration in a single transaction and records it in
+    schema_migrations. Safe to call from several processes at once.
+    Returns the list of versions applied.
+    """
+    applied_now = []
+    try:
+        with conn.cursor() as cur:
+            # Conexões do pool vêm com -c statement_timeout=DB_STATEMENT_TIMEOUT_MS: a espera pelo
+            # lock enquanto outro worker migra e o DDL/backfill pesado não podem ser cortados
+            cur.execute("SET LOCAL statement_timeout = 0")
+            cur.execute("SET LOCAL lock_timeout = 0")
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(200) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+                )
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            applied = {row['version'] if isinstance(row, dict) else row[0] for row in cur.fetchall()}
+
+            for version, name, path in load_migrations(directory):
+                if version in applied:
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    cur.execute(f.read())
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                applied_now.append(version)
+                logging.info(f"Migration {version:04d}_{name} applied")
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied_now
+
+
+def current_version(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') AS t")
+        row = cur.fetchone()
+        if (row['t'] if isinstance(row, dict) else row[0]) is None:
+            return 0
+        cur.execute("SELECT COALESCE(MAX(version), 0) AS v FROM schema_migrations")
+        row = cur.fetchone()
+        return row['v'] if isinstance(row, dict) else row[0]
+
+
+def run_seed(conn, path=SEED_FILE):
+    with conn.cursor() as cur, open(path, encoding='utf-8') as f:
+        cur.execute(f.read())
+    conn.commit()
+
+
+def main():
+    from config import Config
+    from db import create_connection
+
+    parser = argparse.ArgumentParser(description="Aplica as migrations pendentes do banco do serviço control.")
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI,
+                        help="URL do PostgreSQL (padrão: DATABASE_URL)")
+    parser.add_argument('--seed', action='store_true', help="Insere os dados de demonstração após migrar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    conn = create_connection(args.database_url)
+    if conn is None:
+        raise SystemExit(1)
+
+    try:
+        applied = run_migrations(conn)
+        print(f"Applied: {applied or 'nothing'} (schema version {current_version(conn)})")
+        if args.seed:
+            run_seed(conn)
+            print("Seed data inserted.")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+-- Antes: update_schema.py / ensure_end_flag_column
+ALTER TABLE session ADD COLUMN IF NOT EXISTS end_on_next_completion BOOLEAN DEFAULT FALSE;
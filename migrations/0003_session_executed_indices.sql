@@ -0,0 +1,2 @@
+-- Antes: ensure_executed_indices_column
+ALTER TABLE session ADD COLUMN IF NOT EXISTS executed_indices TEXT DEFAULT '[]';
@@ -0,0 +1,12 @@
+-- Antes: ensure_rating_tables
+CREATE TABLE IF NOT EXISTS session_ratings (
+    id SERIAL PRIMARY KEY,
+    session_id INTEGER NOT NULL,
+    student_id VARCHAR(50) NOT NULL,
+    rating INTEGER NOT NULL,
+    CONSTRAINT fk_rating_session FOREIGN KEY (session_id) REFERENCES session(id) ON DELETE CASCADE,
+    UNIQUE(session_id, student_id)
+);
+
+ALTER TABLE session ADD COLUMN IF NOT EXISTS rating_average FLOAT DEFAULT 0.0;
+ALTER TABLE session ADD COLUMN IF NOT EXISTS rating_count INTEGER DEFAULT 0;
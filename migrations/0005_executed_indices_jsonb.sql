@@ -0,0 +1,8 @@
+-- executed_indices vira JSONB para que o histórico seja anexado no próprio UPDATE
+-- (executed_indices || to_jsonb(current_tactic_index)), sem ler/reescrever o texto no Python.
+UPDATE session SET executed_indices = '[]' WHERE executed_indices IS NULL OR executed_indices = '';
+
+ALTER TABLE session ALTER COLUMN executed_indices DROP DEFAULT;
+ALTER TABLE session ALTER COLUMN executed_indices TYPE JSONB USING executed_indices::jsonb;
+ALTER TABLE session ALTER COLUMN executed_indices SET DEFAULT '[]'::jsonb;
+ALTER TABLE session ALTER COLUMN executed_indices SET NOT NULL;
@@ -0,0 +1,17 @@
+-- Soma corrente das avaliações: o voto ajusta sum/count no mesmo statement do upsert,
+-- sem recalcular AVG(rating) sobre todas as linhas da sessão.
+ALTER TABLE session ADD COLUMN IF NOT EXISTS rating_sum BIGINT NOT NULL DEFAULT 0;
+
+UPDATE session SET rating_count = 0 WHERE rating_count IS NULL;
+UPDATE session SET rating_average = 0.0 WHERE rating_average IS NULL;
+
+UPDATE session s
+SET rating_sum = r.total,
+    rating_count = r.cnt,
+    rating_average = r.total::float / r.cnt
+FROM (
+    SELECT session_id, SUM(rating) AS total, COUNT(*) AS cnt
+    FROM session_ratings
+    GROUP BY session_id
+) r
+WHERE s.id = r.session_id;
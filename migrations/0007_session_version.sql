@@ -0,0 +1,3 @@
+-- Versão da sessão: incrementada por toda rota que altera a sessão ou suas tabelas filhas.
+-- Serve de ETag para GET /sessions e GET /sessions/<id> (304 sem carregar os detalhes).
+ALTER TABLE session ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
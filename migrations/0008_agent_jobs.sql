@@ -0,0 +1,16 @@
+-- Jobs assíncronos dos endpoints de agente (?async=1). O estado fica no banco
+-- para que qualquer worker responda GET /jobs/<id>, não só o que executou o job.
+CREATE TABLE IF NOT EXISTS agent_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | running | done | failed
+    http_status INTEGER,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_jobs_created_at ON agent_jobs (created_at);
@@ -0,0 +1,6 @@
+-- Histórico de notas por aluno (GET /students/<id>/grades_history e /students/grades_history?ids=...)
+-- filtra as três tabelas por student_id; sem índice cada consulta era um seq scan.
+CREATE INDEX IF NOT EXISTS idx_verified_answers_student_id ON verified_answers (student_id);
+CREATE INDEX IF NOT EXISTS idx_extra_notes_student_id ON extra_notes (student_id);
+-- UNIQUE(session_id, student_id) não serve para filtrar só por student_id
+CREATE INDEX IF NOT EXISTS idx_session_ratings_student_id ON session_ratings (student_id);
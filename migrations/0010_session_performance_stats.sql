@@ -0,0 +1,44 @@
+-- Agregados de desempenho por sessão, mantidos incrementalmente por submit_answer e
+-- add_extra_notes. O resumo do agente lê uma linha em vez de todas as notas.
+-- score_histogram[n + 1] = quantidade de respostas com nota n (0..10; fora da faixa vai para as pontas).
+CREATE TABLE IF NOT EXISTS session_performance_stats (
+    session_id INTEGER PRIMARY KEY,
+    score_count INTEGER NOT NULL DEFAULT 0,
+    score_sum BIGINT NOT NULL DEFAULT 0,
+    score_sumsq BIGINT NOT NULL DEFAULT 0,
+    score_min INTEGER,
+    score_max INTEGER,
+    score_histogram INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[11]),
+    extra_count INTEGER NOT NULL DEFAULT 0,
+    extra_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    extra_sumsq DOUBLE PRECISION NOT NULL DEFAULT 0,
+    extra_min DOUBLE PRECISION,
+    extra_max DOUBLE PRECISION,
+    CONSTRAINT fk_session_performance_stats
+        FOREIGN KEY (session_id) REFERENCES session (id) ON DELETE CASCADE
+);
+
+INSERT INTO session_performance_stats (session_id, score_count, score_sum, score_sumsq, score_min, score_max, score_histogram)
+SELECT v.session_id, COUNT(*), SUM(v.score), SUM(v.score::bigint * v.score), MIN(v.score), MAX(v.score),
+       ARRAY(
+           SELECT COUNT(h.id)::integer
+           FROM generate_series(0, 10) AS b(bucket)
+           LEFT JOIN verified_answers h
+               ON h.session_id = v.session_id AND LEAST(GREATEST(h.score, 0), 10) = b.bucket
+           GROUP BY b.bucket
+           ORDER BY b.bucket
+       )
+FROM verified_answers v
+GROUP BY v.session_id
+ON CONFLICT (session_id) DO NOTHING;
+
+INSERT INTO session_performance_stats (session_id, extra_count, extra_sum, extra_sumsq, extra_min, extra_max)
+SELECT session_id, COUNT(*), SUM(extra_notes), SUM(extra_notes * extra_notes), MIN(extra_notes), MAX(extra_notes)
+FROM extra_notes
+GROUP BY session_id
+ON CONFLICT (session_id) DO UPDATE
+SET extra_count = EXCLUDED.extra_count,
+    extra_sum = EXCLUDED.extra_sum,
+    extra_sumsq = EXCLUDED.extra_sumsq,
+    extra_min = EXCLUDED.extra_min,
+    extra_max = EXCLUDED.extra_max;
@@ -0,0 +1,49 @@
+-- submit_answer e add_extra_notes passam a gravar com um único INSERT ... ON CONFLICT,
+-- que precisa de uma restrição única. Duplicatas criadas pela antiga corrida
+-- SELECT-then-INSERT são removidas antes.
+
+-- Mantém a primeira resposta de cada aluno (a que o 409 protegia)
+DELETE FROM verified_answers v
+USING verified_answers older
+WHERE v.session_id = older.session_id
+  AND v.student_id = older.student_id
+  AND v.id > older.id;
+
+-- Mantém a nota extra mais recente
+DELETE FROM extra_notes e
+USING extra_notes newer
+WHERE e.session_id = newer.session_id
+  AND e.estudante_username = newer.estudante_username
+  AND e.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_verified_answers_session_student
+    ON verified_answers (session_id, student_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_extra_notes_session_username
+    ON extra_notes (session_id, estudante_username);
+
+-- Agregados de migrations/0010 recalculados sem as duplicatas
+DELETE FROM session_performance_stats;
+
+INSERT INTO session_performance_stats (session_id, score_count, score_sum, score_sumsq, score_min, score_max, score_histogram)
+SELECT v.session_id, COUNT(*), SUM(v.score), SUM(v.score::bigint * v.score), MIN(v.score), MAX(v.score),
+       ARRAY(
+           SELECT COUNT(h.id)::integer
+           FROM generate_series(0, 10) AS b(bucket)
+           LEFT JOIN verified_answers h
+               ON h.session_id = v.session_id AND LEAST(GREATEST(h.score, 0), 10) = b.bucket
+           GROUP BY b.bucket
+           ORDER BY b.bucket
+       )
+FROM verified_answers v
+GROUP BY v.session_id;
+
+INSERT INTO session_performance_stats (session_id, extra_count, extra_sum, extra_sumsq, extra_min, extra_max)
+SELECT session_id, COUNT(*), SUM(extra_notes), SUM(extra_notes * extra_notes), MIN(extra_notes), MAX(extra_notes)
+FROM extra_notes
+GROUP BY session_id
+ON CONFLICT (session_id) DO UPDATE
+SET extra_count = EXCLUDED.extra_count,
+    extra_sum = EXCLUDED.extra_sum,
+    extra_sumsq = EXCLUDED.extra_sumsq,
+    extra_min = EXCLUDED.extra_min,
+    extra_max = EXCLUDED.extra_max;
@@ -0,0 +1,20 @@
+-- As notas de verified_answers vão de 0 a 100 (seed.sql grava 50), não de 0 a 10:
+-- com o histograma de 0010 quase toda nota caía na última posição.
+-- score_histogram passa a ter faixas de 10 pontos: [1] = 0-9, ..., [10] = 90-99, [11] = 100.
+-- Notas fora de 0..100 continuam nas pontas e são contadas em score_out_of_range.
+ALTER TABLE session_performance_stats ADD COLUMN IF NOT EXISTS score_out_of_range INTEGER NOT NULL DEFAULT 0;
+
+UPDATE session_performance_stats st
+SET score_histogram = ARRAY(
+        SELECT COUNT(h.id)::integer
+        FROM generate_series(0, 10) AS b(bucket)
+        LEFT JOIN verified_answers h
+            ON h.session_id = st.session_id AND LEAST(GREATEST(h.score, 0), 100) / 10 = b.bucket
+        GROUP BY b.bucket
+        ORDER BY b.bucket
+    ),
+    score_out_of_range = (
+        SELECT COUNT(*)
+        FROM verified_answers v
+        WHERE v.session_id = st.session_id AND (v.score < 0 OR v.score > 100)
+    );
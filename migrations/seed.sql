@@ -0,0 +1,43 @@
+-- Dados de demonstração (antigo agente_sessao-db.sql).
+-- Use apenas em um banco recém-migrado: python migrate.py --seed
+
+
+-- Inserindo Sessões
+INSERT INTO session (status, code, start_time, current_tactic_index, current_tactic_started_at, original_strategy_id, use_agent)
+VALUES
+('aguardando',  'CODE1234', NULL, 0, NULL, NULL, FALSE),
+('in-progress', 'LIVE5678', NOW(), 1, NOW(), NULL, FALSE),
+('finished',    'DONE9012', NOW() - INTERVAL '2 hour', 5, NOW() - INTERVAL '1 hour', NULL, FALSE);
+
+-- Vinculando Estratégias
+INSERT INTO session_strategies (session_id, strategy_id) VALUES
+(1, '1'),
+(2, '3'),
+(3, '2');
+
+-- Vinculando Professores
+INSERT INTO session_teachers (session_id, teacher_id) VALUES
+(1, '1'),
+(2, '1'),
+(3, '1');
+
+-- Vinculando Alunos
+INSERT INTO session_students (session_id, student_id) VALUES
+(1, '1'),
+(2, '1'),
+(3, '1');
+
+-- Vinculando Domínios
+INSERT INTO session_domains (session_id, domain_id) VALUES
+(1, '1'),
+(2, '1'),
+(3, '2');
+
+-- Inserindo Notas Extras
+INSERT INTO extra_notes (estudante_username, student_id, extra_notes, session_id) VALUES
+('aluno_demo', 1, 9.5, 2),
+('aluno_demo', 1, 8.0, 3);
+
+-- Inserindo Respostas Verificadas
+INSERT INTO verified_answers (student_name, student_id, answers, score, session_id) VALUES
+('aluno_demo', '1', '[{"exercise_id": 101, "answer": 2, "correct": true}, {"exercise_id": 102, "answer": 0, "correct": false}]'::jsonb, 50, 2);
\ No newline at end of file
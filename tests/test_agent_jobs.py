@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+from control.app.routes.agente_control_routes import agente_control_bp
+from control.app.services.agent_jobs import AgentJobRunner, JobQueueFull, STALE_JOB_ERROR, get_job
+
+
+class TestAgentJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.cur = MagicMock()
+        conn = MagicMock()
+        conn.__enter__.return_value = conn
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        patcher = patch('control.app.services.agent_jobs.get_db_connection', return_value=conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _statuses(self):
+        return [c.args[0].split("status = '")[1].split("'")[0]
+                for c in self.cur.execute.call_args_list if "status = '" in c.args[0]]
+
+    def test_records_job_and_stores_result(self):
+        runner = AgentJobRunner(self.app, max_workers=1, max_queue=1)
+        job_id = runner.submit('agent_summary', {"session_id": 1}, lambda: ({"summary": "ok"}, 200))
+        runner.shutdown()
+
+        insert = self.cur.execute.call_args_list[0].args
+        self.assertIn("INSERT INTO agent_jobs", insert[0])
+        self.assertEqual(insert[1][0], job_id)
+        self.assertEqual(self._statuses(), ['running', 'done'])
+        self.assertEqual(self.cur.execute.call_args_list[-1].args[1][1:], (200, job_id))
+        self.assertEqual(runner.stats()['done'], 1)
+
+    def test_failure_is_recorded(self):
+        def boom():
+            raise RuntimeError("groq down")
+
+        runner = AgentJobRunner(self.app, max_workers=1, max_queue=0)
+        runner.submit('agent_summary', {}, boom)
+        runner.shutdown()
+
+        self.assertEqual(self._statuses(), ['running', 'failed'])
+        self.assertEqual(self.cur.execute.call_args_list[-1].args[1][0], "groq down")
+        self.assertEqual(runner.stats()['failed'], 1)
+
+    def test_rejects_when_full(self):
+        import threading
+        release = threading.Event()
+        runner = AgentJobRunner(self.app, max_workers=1, max_queue=1)
+        runner.submit('agent_summary', {}, lambda: (release.wait(5), ({}, 200))[1])
+        runner.submit('agent_summary', {}, lambda: ({}, 200))
+
+        with self.assertRaises(JobQueueFull):
+            runner.submit('agent_summary', {}, lambda: ({}, 200))
+
+        release.set()
+        runner.shutdown()
+        self.assertEqual(runner.stats()['rejected'], 1)
+
+    def test_submit_prunes_jobs_past_retention(self):
+        runner = AgentJobRunner(self.app, max_workers=1, max_queue=0, retention_days=3)
+        runner.submit('agent_summary', {}, lambda: ({}, 200))
+        runner.shutdown()
+
+        delete = self.cur.execute.call_args_list[1].args
+        self.assertIn("DELETE FROM agent_jobs WHERE created_at <", delete[0])
+        self.assertEqual(delete[1], (3,))
+
+    def test_retention_zero_keeps_every_job(self):
+        runner = AgentJobRunner(self.app, max_workers=1, max_queue=0, retention_days=0)
+        runner.submit('agent_summary', {}, lambda: ({}, 200))
+        runner.shutdown()
+
+        self.assertFalse(any("DELETE" in c.args[0] for c in self.cur.execute.call_args_list))
+
+
+class TestGetJob(unittest.TestCase):
+    def test_abandoned_jobs_are_reported_as_failed(self):
+        cur = MagicMock()
+
+        get_job(cur, 'abc123', stale_after=80, pending_stale_after=600)
+
+        sql, params = cur.execute.call_args.args
+        self.assertIn("status = 'running' AND started_at < NOW() - make_interval(secs => %s)", sql)
+        self.assertIn("status = 'pending' AND created_at < NOW() - make_interval(secs => %s)", sql)
+        self.assertIn("CASE WHEN stale THEN 'failed' ELSE status END AS status", sql)
+        self.assertEqual(params, (80, 600, 'abc123', STALE_JOB_ERROR))
+
+    def test_stale_deadline_defaults_to_llm_timeout_plus_margin(self):
+        app = Flask(__name__)
+        app.config.update(LLM_TIMEOUT=30.0)
+        cur = MagicMock()
+
+        with app.app_context():
+            get_job(cur, 'abc123')
+
+        self.assertEqual(cur.execute.call_args.args[1][:2], (90.0, 600.0))
+
+
+class TestAsyncAgentRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(agente_control_bp)
+        self.client = self.app.test_client()
+
+    @patch('control.app.routes.agente_control_routes.get_job_runner')
+    def test_async_summary_returns_202_with_job_url(self, mock_runner):
+        mock_runner.return_value.submit.return_value = 'abc123'
+
+        response = self.client.get('/sessions/7/agent_summary?async=1')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()['status_url'], '/jobs/abc123')
+        self.assertTrue(response.headers['Location'].endswith('/jobs/abc123'))
+        kind, params = mock_runner.return_value.submit.call_args.args[:2]
+        self.assertEqual((kind, params), ('agent_summary', {"session_id": 7}))
+
+    @patch('control.app.routes.agente_control_routes.get_job_runner')
+    def test_full_queue_returns_503(self, mock_runner):
+        mock_runner.return_value.submit.side_effect = JobQueueFull("full")
+
+        response = self.client.get('/students/5/grades_history?async=1')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    @patch('control.app.routes.agente_control_routes.get_job')
+    @patch('control.app.routes.agente_control_routes.get_db_connection')
+    def test_poll_job(self, mock_conn, mock_get_job):
+        mock_get_job.return_value = {"id": "abc123", "status": "done", "http_status": 200, "result": {"summary": "ok"}}
+        self.assertEqual(self.client.get('/jobs/abc123').get_json()['result'], {"summary": "ok"})
+
+        mock_get_job.return_value = None
+        self.assertEqual(self.client.get('/jobs/missing').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+from control.app.routes.agente_control_routes import agente_control_bp
+
+
+class TestAgentSummaryBatch(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(agente_control_bp)
+        self.client = self.app.test_client()
+
+        self.cur = MagicMock()
+        conn = MagicMock()
+        conn.__enter__.return_value = conn
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        patcher = patch('control.app.routes.agente_control_routes.get_db_connection', return_value=conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cur.fetchall.return_value = [
+            {'id': 1, 'status': 'in-progress', 'rating_average': 4.0, 'rating_count': 2, 'total_strategies': 3,
+             'score_count': 2, 'score_sum': 160, 'score_sumsq': 13600, 'score_min': 60, 'score_max': 100,
+             'score_histogram': [0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 1], 'score_out_of_range': 0,
+             'extra_count': 0, 'extra_sum': 0, 'extra_sumsq': 0, 'extra_min': None, 'extra_max': None},
+            # Sessão sem linha em session_performance_stats (LEFT JOIN)
+            {'id': 2, 'status': 'finished', 'rating_average': 0.0, 'rating_count': 0, 'total_strategies': 1,
+             'score_count': None, 'score_sum': None, 'score_sumsq': None, 'score_min': None, 'score_max': None,
+             'score_histogram': None,
+             'extra_count': None, 'extra_sum': None, 'extra_sumsq': None, 'extra_min': None, 'extra_max': None},
+        ]
+
+    @patch('control.app.routes.agente_control_routes.cached_chat_completion')
+    def test_set_based_metrics_and_partial_failures(self, mock_complete):
+        def complete(model, messages, **params):
+            if "(ID 2)" in messages[1]["content"]:
+                raise RuntimeError("LLM circuit is open, failing fast")
+            return "Resumo.", False
+        mock_complete.side_effect = complete
+
+        response = self.client.post('/sessions/agent_summary/batch', json={"session_ids": [2, 1, 99, 1]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cur.execute.call_count, 1)
+        body = response.get_json()
+        self.assertEqual((body['succeeded'], body['failed']), (1, 2))
+        second, first, missing = body['results']
+        self.assertEqual((first['session_id'], first['ok'], first['summary']), (1, True, "Resumo."))
+        self.assertEqual(first['metrics'], {"exercise_avg": 80.0, "extra_avg": 0, "participation_count": 2})
+        self.assertEqual((second['session_id'], second['ok']), (2, False))
+        self.assertIn("circuit", second['error'])
+        self.assertEqual(second['metrics'], {"exercise_avg": 0, "extra_avg": 0, "participation_count": 0})
+        prompt = next(c.args[1][1]["content"] for c in mock_complete.call_args_list if "(ID 1)" in c.args[1][1]["content"])
+        self.assertIn("notas 60-69: 1, notas 100: 1", prompt)
+        self.assertIn("80.0 / 100 (desvio padrão 20.0, mínima 60, máxima 100)", prompt)
+        self.assertEqual((missing['session_id'], missing['ok']), (99, False))
+
+    def test_rejects_invalid_input(self):
+        self.assertEqual(self.client.post('/sessions/agent_summary/batch', json={"session_ids": []}).status_code, 400)
+        self.assertEqual(self.client.post('/sessions/agent_summary/batch', json=["x"]).status_code, 400)
+        self.cur.execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+from unittest.mock import patch
+from flask import Flask
+
+from control.app.routes.agente_control_routes import agente_control_bp
+
+CONTEXT = {
+    "session_id": 3,
+    "status": "in-progress",
+    "messages": [{"role": "user", "content": "prompt"}],
+    "metrics": {"exercise_avg": 8.0, "extra_avg": 0, "participation_count": 2},
+}
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestAgentSummaryStream(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(agente_control_bp)
+        self.client = self.app.test_client()
+        patcher = patch('control.app.routes.agente_control_routes._session_summary_context', return_value=CONTEXT)
+        self.mock_context = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('control.app.routes.agente_control_routes.cached_chat_completion', return_value=("Turma bem.", False))
+    @patch('control.app.routes.agente_control_routes.stream_chat_completion')
+    def test_metrics_first_then_tokens_then_same_final_payload(self, mock_stream, mock_complete):
+        mock_stream.return_value = (iter(["Turma ", "bem."]), False)
+
+        response = self.client.get('/sessions/3/agent_summary?stream=1')
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = _events(response.get_data(as_text=True))
+        self.assertEqual([name for name, _ in events], ['metrics', 'token', 'token', 'summary'])
+        self.assertEqual(events[0][1]['metrics'], CONTEXT['metrics'])
+        self.assertEqual(events[-1][1], self.client.get('/sessions/3/agent_summary').get_json())
+
+    @patch('control.app.routes.agente_control_routes.stream_chat_completion', side_effect=RuntimeError("circuit open"))
+    def test_llm_failure_is_reported_as_event(self, mock_stream):
+        events = _events(self.client.get('/sessions/3/agent_summary?stream=1').get_data(as_text=True))
+
+        self.assertEqual(events[-1], ('error', {"error": "circuit open"}))
+
+    def test_unknown_session(self):
+        self.mock_context.return_value = None
+
+        self.assertEqual(self.client.get('/sessions/3/agent_summary?stream=1').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+from control.app.services.answer_writes import AnswerBufferFull, AnswerWriteBuffer, insert_answers
+
+
+class TestInsertAnswers(unittest.TestCase):
+    @patch('control.app.services.answer_writes.bump_session_version')
+    @patch('control.app.services.answer_writes.record_scores')
+    @patch('control.app.services.answer_writes.execute_values')
+    def test_one_insert_for_existing_sessions(self, mock_execute_values, mock_record_scores, mock_bump):
+        cur = MagicMock()
+        cur.fetchall.return_value = [{'id': 1}]
+        mock_execute_values.return_value = [{'session_id': 1, 'student_id': '8', 'score': 9}]
+
+        statuses, session_ids = insert_answers(cur, {
+            (1, '8'): ('Ana', '8', '[1]', 9, 1),
+            (1, '9'): ('Bia', '9', '[2]', 4, 1),
+            (2, '7'): ('Caio', '7', '[]', 5, 2),
+        })
+
+        self.assertEqual(statuses, {(1, '8'): 'inserted', (1, '9'): 'duplicate', (2, '7'): 'session_not_found'})
+        self.assertEqual(session_ids, [1])
+        self.assertEqual([row[0] for row in mock_execute_values.call_args.args[2]], ['Ana', 'Bia'])
+        mock_record_scores.assert_called_once_with(cur, [(1, 9)])
+        mock_bump.assert_called_once_with(cur, [1])
+
+
+class TestAnswerWriteBuffer(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+        def fake_insert(cur, answers):
+            self.release.wait(5)
+            self.batches.append(list(answers))
+            return {key: 'inserted' for key in answers}, sorted({key[0] for key in answers})
+
+        for target, value in [('insert_answers', fake_insert), ('get_db_connection', MagicMock()),
+                              ('invalidate_sessions', MagicMock())]:
+            patcher = patch(f'control.app.services.answer_writes.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_groups_concurrent_submits_into_one_commit(self):
+        buffer = AnswerWriteBuffer(Flask(__name__), max_batch=10, max_delay=0.2)
+
+        futures = [buffer.submit(1, str(student), ('x',)) for student in range(3)]
+        futures.append(buffer.submit(1, '0', ('again',)))
+
+        self.assertEqual([f.result(timeout=5) for f in futures], ['inserted'] * 3 + ['duplicate'])
+        self.assertEqual(self.batches, [[(1, '0'), (1, '1'), (1, '2')]])
+        buffer.shutdown()
+
+    def test_flushes_every_max_batch_records(self):
+        buffer = AnswerWriteBuffer(Flask(__name__), max_batch=2, max_delay=5.0)
+
+        futures = [buffer.submit(1, str(student), ('x',)) for student in range(4)]
+
+        for f in futures:
+            f.result(timeout=2)
+        self.assertEqual([len(batch) for batch in self.batches], [2, 2])
+        buffer.shutdown()
+
+    def test_back_pressure_and_drain_on_shutdown(self):
+        self.release.clear()  # primeiro flush fica preso no "banco"
+        buffer = AnswerWriteBuffer(Flask(__name__), max_batch=1, max_delay=0, max_pending=2, enqueue_timeout=0.05)
+
+        first = buffer.submit(1, 'a', ('x',))
+        while buffer.stats()['pending']:
+            pass
+        queued = [buffer.submit(1, 'b', ('x',)), buffer.submit(1, 'c', ('x',))]
+        with self.assertRaises(AnswerBufferFull):
+            buffer.submit(1, 'd', ('x',))
+
+        self.release.set()
+        buffer.shutdown()
+
+        self.assertEqual([f.result(timeout=0) for f in [first] + queued], ['inserted'] * 3)
+        with self.assertRaises(AnswerBufferFull):
+            buffer.submit(1, 'e', ('x',))
+        self.assertEqual(buffer.stats()['rejected'], 1)
+
+    def test_failed_flush_fails_every_waiter(self):
+        with patch('control.app.services.answer_writes.insert_answers', side_effect=RuntimeError("db down")):
+            buffer = AnswerWriteBuffer(Flask(__name__), max_batch=5, max_delay=0.05)
+            futures = [buffer.submit(1, str(student), ('x',)) for student in range(2)]
+
+            for f in futures:
+                with self.assertRaises(RuntimeError):
+                    f.result(timeout=5)
+            buffer.shutdown()
+
+    def test_bad_record_only_fails_its_own_waiter(self):
+        def insert(cur, answers):
+            self.batches.append(list(answers))
+            if (1, 'bad') in answers:
+                raise RuntimeError("value too long for type character varying(50)")
+            return {key: 'inserted' for key in answers}, [1]
+
+        with patch('control.app.services.answer_writes.insert_answers', side_effect=insert):
+            buffer = AnswerWriteBuffer(Flask(__name__), max_batch=5, max_delay=0.2)
+            good, bad, other = [buffer.submit(1, student, ('x',)) for student in ('a', 'bad', 'b')]
+
+            self.assertEqual((good.result(timeout=5), other.result(timeout=5)), ('inserted', 'inserted'))
+            with self.assertRaises(RuntimeError):
+                bad.result(timeout=5)
+            buffer.shutdown()
+
+        self.assertEqual(self.batches, [[(1, 'a'), (1, 'bad'), (1, 'b')], [(1, 'a')], [(1, 'bad')], [(1, 'b')]])
+        self.assertEqual((buffer.stats()['flushed'], buffer.stats()['failed']), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
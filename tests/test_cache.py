@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import patch
+
+from control.app.services.cache import LocalLRUCache, create_cache, NullCache
+
+
+class TestLocalLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LocalLRUCache(max_entries=2, ttl=None)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 'a')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_expires_after_ttl(self):
+        cache = LocalLRUCache(ttl=10)
+        with patch('control.app.services.cache.time.monotonic', return_value=100.0):
+            cache.set(1, 'a')
+        with patch('control.app.services.cache.time.monotonic', return_value=111.0):
+            self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()['stale'], 1)
+
+    def test_drops_entries_failing_freshness_check(self):
+        cache = LocalLRUCache()
+        cache.set(1, {'version': 3})
+
+        self.assertIsNone(cache.get(1, is_fresh=lambda doc: doc['version'] == 4))
+        self.assertIsNone(cache.get(1))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stale']), (0, 2, 1))
+
+    def test_delete_invalidates(self):
+        cache = LocalLRUCache()
+        cache.set(1, 'a')
+        cache.delete(1)
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_factory(self):
+        self.assertIsInstance(create_cache('memory'), LocalLRUCache)
+        self.assertIsInstance(create_cache('none'), NullCache)
+        with self.assertRaises(ValueError):
+            create_cache('memcached')
+
+
+if __name__ == '__main__':
+    unittest.main()
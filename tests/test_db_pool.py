@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from psycopg2 import extensions
+
+from control.db import ConnectionPool, PoolTimeout
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.connect = MagicMock(side_effect=lambda url, timeout: make_conn())
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault('maxconn', 2)
+        return ConnectionPool("postgresql://test", connect=self.connect, **kwargs)
+
+    def test_reuses_returned_connection(self):
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_times_out_when_exhausted(self):
+        pool = self.make_pool(maxconn=1, timeout=0.05)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        pool = self.make_pool(maxconn=1, timeout=2)
+        conn = pool.getconn()
+        got = []
+
+        waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+        waiter.start()
+        time.sleep(0.05)
+        pool.putconn(conn)
+        waiter.join(1)
+
+        self.assertEqual(got, [conn])
+
+    def test_rolls_back_open_transaction_on_return(self):
+        pool = self.make_pool()
+        conn = pool.getconn()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(conn)
+
+        conn.rollback.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_discards_closed_connection(self):
+        pool = self.make_pool()
+        conn = pool.getconn()
+        conn.closed = 1
+
+        pool.putconn(conn)
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['discarded'], 1)
+
+    def test_replaces_connection_failing_health_check(self):
+        pool = self.make_pool(health_check_interval=0)
+        bad = pool.getconn()
+        pool.putconn(bad)
+        bad.cursor.return_value.__enter__.return_value.execute.side_effect = Exception("server closed")
+
+        conn = pool.getconn()
+
+        self.assertIsNot(conn, bad)
+        self.assertEqual(pool.stats()['failed_health_checks'], 1)
+
+    def test_warmup_opens_min_connections(self):
+        pool = self.make_pool(minconn=2, maxconn=4)
+        pool.warmup()
+
+        stats = pool.stats()
+        self.assertEqual(stats['idle'], 2)
+        self.assertEqual(stats['created'], 2)
+
+    def test_passes_statement_timeout_to_connect(self):
+        pool = self.make_pool(statement_timeout_ms=1500)
+        pool.getconn()
+        self.connect.assert_called_once_with("postgresql://test", 1500)
+
+
+if __name__ == '__main__':
+    unittest.main()
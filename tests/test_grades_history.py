@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+from control.app.routes.agente_control_routes import PoolTimeout, agente_control_bp
+from control.app.routes.session_routes import session_bp
+
+
+class TestGradesHistory(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(agente_control_bp)
+        self.client = self.app.test_client()
+
+        self.cur = MagicMock()
+        conn = MagicMock()
+        conn.__enter__.return_value = conn
+        conn.cursor.return_value.__enter__.return_value = self.cur
+        patcher = patch('control.app.routes.agente_control_routes.get_db_connection', return_value=conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cur.fetchall.return_value = [
+            {'student_id': '8', 'session_id': 1, 'notes': [10, 7], 'extra_notes': [], 'student_rating': 5},
+            {'student_id': '8', 'session_id': 2, 'notes': [], 'extra_notes': [9.5], 'student_rating': None},
+            {'student_id': '9', 'session_id': 1, 'notes': [4], 'extra_notes': [], 'student_rating': None},
+        ]
+
+    @patch('control.app.routes.agente_control_routes.cached_chat_completion', return_value=("Em melhora.", False))
+    @patch('control.app.routes.agente_control_routes.Config')
+    def test_single_student_uses_one_query(self, mock_config, mock_complete):
+        mock_config.GROQ_API_KEY = 'key'
+        self.cur.fetchall.return_value = self.cur.fetchall.return_value[:2]
+
+        response = self.client.get('/students/8/grades_history')
+
+        self.assertEqual(self.cur.execute.call_count, 1)
+        params = self.cur.execute.call_args.args[1]
+        self.assertEqual((params['ids'], params['int_ids']), (['8'], [8]))
+        self.assertEqual(response.get_json(), {
+            "student_performance_summary": "Em melhora.",
+            "raw_history_by_session": {
+                "1": {"notes": [10, 7], "extra_notes": [], "student_rating": 5},
+                "2": {"notes": [], "extra_notes": [9.5]},
+            }
+        })
+
+    @patch('control.app.routes.agente_control_routes.cached_chat_completion')
+    def test_batch_lookup(self, mock_complete):
+        response = self.client.get('/students/grades_history?ids=8,9,ana,8')
+
+        self.assertEqual(self.cur.execute.call_count, 1)
+        params = self.cur.execute.call_args.args[1]
+        self.assertEqual((params['ids'], params['int_ids']), (['8', '9', 'ana'], [8, 9]))
+        students = response.get_json()['students']
+        self.assertEqual(list(students), ['8', '9', 'ana'])
+        self.assertEqual(students['9'], {"raw_history_by_session": {"1": {"notes": [4], "extra_notes": []}}})
+        self.assertEqual(students['ana'], {"raw_history_by_session": {}})
+        mock_complete.assert_not_called()
+
+    def test_batch_requires_ids(self):
+        self.assertEqual(self.client.get('/students/grades_history').status_code, 400)
+
+
+class TestAgentRoutesPoolExhaustion(unittest.TestCase):
+    def setUp(self):
+        # O handler de PoolTimeout é registrado pelo session_bp para o app inteiro
+        self.app = Flask(__name__)
+        self.app.register_blueprint(session_bp)
+        self.app.register_blueprint(agente_control_bp)
+        self.client = self.app.test_client()
+
+        patcher = patch('control.app.routes.agente_control_routes.get_db_connection',
+                        side_effect=PoolTimeout("no connection available"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_timeout_returns_503_like_the_session_routes(self):
+        responses = [
+            self.client.get('/sessions/7/agent_summary'),
+            self.client.get('/sessions/7/agent_summary?stream=1'),
+            self.client.post('/sessions/agent_summary/batch', json={"session_ids": [7]}),
+            self.client.get('/students/8/grades_history'),
+            self.client.get('/students/grades_history?ids=8,9'),
+        ]
+
+        for response in responses:
+            self.assertEqual((response.status_code, response.get_json()), (503, {"error": "Database busy, try again"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
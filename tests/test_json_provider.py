@@ -0,0 +1,92 @@
+import json
+import pickle
+import sys
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from control.app.services.json_provider import (
+    RawJSON, OrjsonProvider, StdJSONProvider, create_json_provider
+)
+from control.app.services.session_loader import load_session_details
+
+PAYLOAD = {
+    "id": 1,
+    "start_time": datetime(2025, 3, 1, 14, 30, 5),
+    "rating_average": Decimal("4.50"),
+    "histogram": {10: 1, 7: 2},
+    "verified_answers": [{"id": 5, "student_name": "Ana", "answers": [{"exercise_id": 101, "correct": True}]}],
+}
+
+
+class TestJSONProviders(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.expected = json.loads(DefaultJSONProvider(self.app).dumps(PAYLOAD))
+        self.raw_payload = dict(PAYLOAD, verified_answers=[
+            dict(PAYLOAD["verified_answers"][0], answers=RawJSON('[{"exercise_id": 101, "correct": true}]'))
+        ])
+
+    def test_orjson_matches_flask_default_wire_format(self):
+        provider = OrjsonProvider(self.app)
+
+        self.assertEqual(json.loads(provider.dumps(PAYLOAD)), self.expected)
+        self.assertEqual(json.loads(provider.dumps(self.raw_payload)), self.expected)
+        self.assertEqual(self.expected["start_time"], "Sat, 01 Mar 2025 14:30:05 GMT")
+
+    def test_orjson_fragment_embeds_raw_text(self):
+        provider = OrjsonProvider(self.app)
+        provider._fragment = MagicMock(side_effect=lambda text: json.loads(text))
+
+        provider.dumps(self.raw_payload)
+
+        provider._fragment.assert_called_once_with('[{"exercise_id": 101, "correct": true}]')
+
+    def test_iso_datetimes_are_opt_in(self):
+        provider = create_json_provider(self.app, "orjson", datetime_format="iso")
+        self.assertEqual(json.loads(provider.dumps(PAYLOAD))["start_time"], "2025-03-01T14:30:05")
+
+    def test_stdlib_provider_decodes_raw_json(self):
+        provider = StdJSONProvider(self.app)
+        self.assertEqual(json.loads(provider.dumps(self.raw_payload)), self.expected)
+
+    def test_response_is_compact_json(self):
+        self.app.json = OrjsonProvider(self.app)
+        with self.app.app_context():
+            response = self.app.json.response({"b": 1, "a": [1, 2]})
+        self.assertEqual(response.get_data(), b'{"a":[1,2],"b":1}\n')
+        self.assertEqual(response.mimetype, "application/json")
+
+    def test_falls_back_without_orjson(self):
+        with patch.dict(sys.modules, {"orjson": None}):
+            self.assertIsInstance(create_json_provider(self.app, "orjson"), StdJSONProvider)
+
+    def test_raw_json_survives_pickle(self):
+        # Cache redis guarda os documentos com pickle
+        raw = RawJSON('{"a": 1}')
+        self.assertEqual(pickle.loads(pickle.dumps(raw)), raw)
+
+
+class TestLoaderRawJSON(unittest.TestCase):
+    def test_answers_are_loaded_as_raw_json(self):
+        conn, cur = MagicMock(), MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        cur.fetchall.side_effect = [
+            [{'id': 1, 'status': 'aguardando', 'executed_indices': []}],
+            [], [], [], [],
+            [{'id': 5, 'session_id': 1, 'student_id': '8', 'answers': '[1, 2]', 'score': 10}],
+            [],
+        ]
+
+        session, = load_session_details(conn, [1])
+
+        self.assertEqual(session['verified_answers'][0]['answers'], RawJSON('[1, 2]'))
+        self.assertIn("answers::text", cur.execute.call_args_list[5][0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
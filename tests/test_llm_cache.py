@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from control.app.services.cache import LocalLRUCache
+from control.app.services.llm_cache import llm_cache_key, cached_chat_completion
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LocalLRUCache()
+        patcher = patch('control.app.services.llm_cache.get_llm_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.gateway = MagicMock()
+        self.gateway.complete.return_value = "Turma engajada."
+        patcher = patch('control.app.services.llm_cache.get_llm_gateway', return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.messages = [{"role": "user", "content": "Notas: [10, 8]"}]
+
+    def test_key_depends_on_prompt_and_model_params(self):
+        key = llm_cache_key("m", self.messages, temperature=0.2)
+
+        self.assertEqual(key, llm_cache_key("m", [dict(self.messages[0])], temperature=0.2))
+        self.assertNotEqual(key, llm_cache_key("m", [{"role": "user", "content": "Notas: [10, 9]"}], temperature=0.2))
+        self.assertNotEqual(key, llm_cache_key("m", self.messages, temperature=0.7))
+        self.assertNotEqual(key, llm_cache_key("other", self.messages, temperature=0.2))
+
+    def test_identical_inputs_call_the_llm_once(self):
+        first = cached_chat_completion("m", self.messages, temperature=0.2)
+        second = cached_chat_completion("m", self.messages, temperature=0.2)
+
+        self.assertEqual(first, ("Turma engajada.", False))
+        self.assertEqual(second, ("Turma engajada.", True))
+        self.gateway.complete.assert_called_once_with("m", self.messages, temperature=0.2)
+
+    def test_changed_inputs_miss(self):
+        cached_chat_completion("m", self.messages, temperature=0.2)
+        cached_chat_completion("m", [{"role": "user", "content": "Notas: []"}], temperature=0.2)
+
+        self.assertEqual(self.gateway.complete.call_count, 2)
+
+    def test_empty_completion_is_not_cached(self):
+        self.gateway.complete.return_value = None
+
+        cached_chat_completion("m", self.messages)
+        cached_chat_completion("m", self.messages)
+
+        self.assertEqual(self.gateway.complete.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from control.app.services.llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable
+
+
+class StubOpenAIServer:
+    """
+    Local OpenAI-compatible server. ``script`` is a list of actions consumed one
+    per request: an int HTTP status, a float delay in seconds, or a completion text.
+    """
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.client_ports = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append(body)
+                stub.client_ports.add(self.client_address[1])
+                action = stub.script.pop(0) if stub.script else "ok"
+
+                if isinstance(action, float):
+                    time.sleep(action)
+                    action = "late"
+                if isinstance(action, int):
+                    self._send(action, {"error": {"message": "stub error", "type": "server_error"}})
+                    return
+                if body.get("stream"):
+                    self._send_stream(body["model"], action.split(" "))
+                    return
+                self._send(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": action}}],
+                })
+
+            def _send_stream(self, model, words):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [{"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": model,
+                           "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                          for word in words]
+                for data in [json.dumps(event) for event in events] + ["[DONE]"]:
+                    chunk = f"data: {data}\n\n".encode()
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestLLMGateway(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubOpenAIServer()
+        self.addCleanup(self.stub.close)
+
+    def _gateway(self, **kwargs):
+        options = dict(timeout=2.0, max_retries=2, backoff_base=0.01, backoff_max=0.02,
+                       failure_threshold=2, reset_timeout=60.0)
+        options.update(kwargs)
+        gateway = LLMGateway(self.stub.url, "test-key", **options)
+        self.addCleanup(gateway.close)
+        return gateway
+
+    def _ask(self, gateway):
+        return gateway.complete("stub-model", [{"role": "user", "content": "oi"}], temperature=0.2)
+
+    def test_reuses_one_connection(self):
+        gateway = self._gateway()
+        self.stub.script = ["a", "b", "c"]
+
+        self.assertEqual([self._ask(gateway) for _ in range(3)], ["a", "b", "c"])
+        self.assertEqual(len(self.stub.client_ports), 1)
+        self.assertEqual(self.stub.requests[0]["temperature"], 0.2)
+
+    def test_retries_transient_errors(self):
+        gateway = self._gateway()
+        self.stub.script = [503, 429, "recovered"]
+
+        self.assertEqual(self._ask(gateway), "recovered")
+        self.assertEqual(gateway.stats()["retries"], 2)
+
+    def test_client_errors_are_not_retried(self):
+        gateway = self._gateway()
+        self.stub.script = [400]
+
+        with self.assertRaises(Exception):
+            self._ask(gateway)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(gateway.breaker.state, "closed")
+
+    def test_deadline_bounds_the_whole_call(self):
+        gateway = self._gateway(timeout=0.3, max_retries=5)
+        self.stub.script = [1.0] * 6
+
+        started = time.monotonic()
+        with self.assertRaises(Exception):
+            self._ask(gateway)
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_circuit_opens_and_fails_fast(self):
+        gateway = self._gateway(max_retries=0)
+        self.stub.script = [500, 500]
+
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                self._ask(gateway)
+        with self.assertRaises(LLMUnavailable):
+            self._ask(gateway)
+
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(gateway.stats()["short_circuited"], 1)
+
+    def test_open_circuit_fails_fast_even_when_every_slot_is_busy(self):
+        gateway = self._gateway(max_concurrency=1, acquire_timeout=1.5)
+        gateway.breaker.record_failure()
+        gateway.breaker.record_failure()
+        gateway._slots.acquire()  # slot preso numa chamada que vai estourar
+
+        started = time.monotonic()
+        with self.assertRaises(LLMUnavailable):
+            self._ask(gateway)
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual((gateway.stats()["short_circuited"], gateway.stats()["rejected"]), (1, 0))
+        gateway._slots.release()
+
+    def test_half_open_trial_is_given_back_when_no_slot_is_free(self):
+        gateway = self._gateway(max_concurrency=1, acquire_timeout=0.1, reset_timeout=0.0)
+        gateway.breaker.record_failure()
+        gateway.breaker.record_failure()
+        gateway._slots.acquire()
+
+        with self.assertRaises(LLMUnavailable):
+            self._ask(gateway)
+        self.assertEqual(gateway.stats()["rejected"], 1)
+
+        gateway._slots.release()
+        self.assertEqual(self._ask(gateway), "ok")
+        self.assertEqual(gateway.breaker.state, "closed")
+
+    def test_streams_tokens_and_releases_the_slot(self):
+        gateway = self._gateway(max_concurrency=1)
+        self.stub.script = [503, "turma bem engajada"]
+
+        chunks = list(gateway.stream("stub-model", [{"role": "user", "content": "oi"}]))
+
+        self.assertEqual(chunks, ["turma ", "bem ", "engajada "])
+        self.assertTrue(self.stub.requests[-1]["stream"])
+        self.assertEqual(gateway.stats()["retries"], 1)
+        self.assertEqual(gateway.stats()["in_flight"], 0)
+
+    def test_concurrency_limit(self):
+        gateway = self._gateway(max_concurrency=1, acquire_timeout=0.1)
+        self.stub.script = [0.5]
+        worker = threading.Thread(target=self._ask, args=(gateway,))
+        worker.start()
+        time.sleep(0.1)
+
+        with self.assertRaises(LLMUnavailable):
+            self._ask(gateway)
+        worker.join()
+        self.assertEqual(gateway.stats()["rejected"], 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_allows_a_single_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 11.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+        now[0] = 22.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_released_trial_can_be_taken_again(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 11.0
+
+        self.assertTrue(breaker.allow())
+        breaker.release_trial()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from control.migrate import load_migrations, run_migrations, MIGRATIONS_DIR
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for filename, sql in [("0001_first.sql", "CREATE TABLE a ();"),
+                              ("0002_second.sql", "CREATE TABLE b ();"),
+                              ("notes.txt", "ignored")]:
+            with open(os.path.join(self.tmp.name, filename), "w") as f:
+                f.write(sql)
+
+        self.conn = MagicMock()
+        self.cur = MagicMock()
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repo_migrations_are_ordered_and_unique(self):
+        versions = [m[0] for m in load_migrations(MIGRATIONS_DIR)]
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertEqual(versions[0], 1)
+
+    def test_applies_only_pending_versions(self):
+        self.cur.fetchall.return_value = [{'version': 1}]
+
+        applied = run_migrations(self.conn, self.tmp.name)
+
+        self.assertEqual(applied, [2])
+        self.cur.execute.assert_any_call("CREATE TABLE b ();")
+        self.cur.execute.assert_any_call(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (2, "second"))
+        executed = [c[0][0] for c in self.cur.execute.call_args_list]
+        self.assertNotIn("CREATE TABLE a ();", executed)
+        self.conn.commit.assert_called_once()
+
+    def test_lifts_the_pool_statement_timeout_before_taking_the_lock(self):
+        self.cur.fetchall.return_value = []
+
+        run_migrations(self.conn, self.tmp.name)
+
+        executed = [c[0][0] for c in self.cur.execute.call_args_list]
+        self.assertEqual(executed[:3], ["SET LOCAL statement_timeout = 0", "SET LOCAL lock_timeout = 0",
+                                        "SELECT pg_advisory_xact_lock(%s)"])
+
+    def test_rolls_back_when_a_migration_fails(self):
+        self.cur.fetchall.return_value = []
+
+        def execute(sql, *args):
+            if sql == "CREATE TABLE b ();":
+                raise Exception("boom")
+        self.cur.execute.side_effect = execute
+
+        with self.assertRaises(Exception):
+            run_migrations(self.conn, self.tmp.name)
+
+        self.conn.rollback.assert_called_once()
+        self.conn.commit.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+
+from control.app.routes.session_routes import session_bp
+from control.app.services.session_events import HUB_STOPPED, SessionEventHub, notify_sql
+
+
+class TestSessionEventHub(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(SessionEventHub, '_listen_forever')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hub = SessionEventHub("postgresql://test", queue_size=2)
+
+    def test_fans_out_only_to_subscribers_of_the_session(self):
+        a1, a2 = self.hub.subscribe(1), self.hub.subscribe(1)
+        b = self.hub.subscribe(2)
+
+        self.hub.dispatch(json.dumps({"event": "tactic_changed", "session_id": 1, "current_tactic_index": 4}))
+
+        self.assertEqual(a1.get_nowait()['current_tactic_index'], 4)
+        self.assertEqual(a2.get_nowait()['current_tactic_index'], 4)
+        self.assertTrue(b.empty())
+
+    def test_slow_subscriber_keeps_latest_events(self):
+        q = self.hub.subscribe(1)
+        for index in range(3):
+            self.hub.dispatch(json.dumps({"event": "tactic_changed", "session_id": 1, "current_tactic_index": index}))
+
+        self.assertEqual([q.get_nowait()['current_tactic_index'] for _ in range(2)], [1, 2])
+
+    def test_unsubscribe_stops_delivery(self):
+        q = self.hub.subscribe(1)
+        self.hub.unsubscribe(1, q)
+
+        self.hub.dispatch(json.dumps({"event": "finished", "session_id": 1}))
+
+        self.assertTrue(q.empty())
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+    def test_stop_wakes_every_subscriber(self):
+        q1, q2 = self.hub.subscribe(1), self.hub.subscribe(2)
+        for index in range(2):
+            self.hub.dispatch(json.dumps({"event": "tactic_changed", "session_id": 1, "current_tactic_index": index}))
+
+        self.hub.stop()
+
+        # Fila cheia: o sentinela ainda entra (descartando o evento mais antigo)
+        self.assertEqual([q1.get_nowait() for _ in range(2)][-1], HUB_STOPPED)
+        self.assertIs(q2.get_nowait(), HUB_STOPPED)
+        self.assertIs(self.hub.subscribe(3).get_nowait(), HUB_STOPPED)
+
+    def test_notify_sql_rejects_unknown_events(self):
+        with self.assertRaises(ValueError):
+            notify_sql("'); DROP TABLE session; --")
+
+
+class TestSessionEventsRoute(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(session_bp)
+        self.client = self.app.test_client()
+
+        patcher = patch.object(SessionEventHub, '_listen_forever')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hub = SessionEventHub("postgresql://test")
+
+        for target, value in [('get_event_hub', MagicMock(return_value=self.hub)),
+                              ('get_db_connection', MagicMock())]:
+            patcher = patch(f'control.app.routes.session_routes.{target}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch('control.app.routes.session_routes.load_session_state')
+    def test_streams_snapshot_then_changes_until_finished(self, mock_state):
+        mock_state.return_value = {"event": "snapshot", "session_id": 1, "status": "in-progress"}
+
+        response = self.client.get('/sessions/1/events', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+
+        self.hub.dispatch(json.dumps({"event": "tactic_changed", "session_id": 1, "current_tactic_index": 2}))
+        self.hub.dispatch(json.dumps({"event": "finished", "session_id": 1, "status": "finished"}))
+        body = response.get_data(as_text=True)
+
+        self.assertEqual([line for line in body.splitlines() if line.startswith('event:')],
+                         ['event: snapshot', 'event: tactic_changed', 'event: finished'])
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+    @patch('control.app.routes.session_routes.load_session_state')
+    def test_stream_ends_when_hub_stops(self, mock_state):
+        mock_state.return_value = {"event": "snapshot", "session_id": 1, "status": "in-progress"}
+
+        response = self.client.get('/sessions/1/events', buffered=False)
+        self.hub.stop()
+        body = response.get_data(as_text=True)
+
+        self.assertEqual([line for line in body.splitlines() if line.startswith('event:')], ['event: snapshot'])
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+    @patch('control.app.routes.session_routes.load_session_state', return_value=None)
+    def test_unknown_session(self, mock_state):
+        response = self.client.get('/sessions/1/events')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.hub.subscriber_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
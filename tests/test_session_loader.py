@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from control.app.services.cache import LocalLRUCache
+from control.app.services.session_loader import (
+    InvalidFields, load_session_details, get_session_details, load_session_details_cached, invalidate_sessions,
+    parse_session_fields
+)
+
+
+class TestSessionLoader(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cur = MagicMock()
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+
+    def test_loads_many_sessions_with_constant_queries(self):
+        self.cur.fetchall.side_effect = [
+            [{'id': 1, 'status': 'aguardando', 'executed_indices': '[0, 1]'},
+             {'id': 2, 'status': 'finished', 'executed_indices': None}],
+            [{'session_id': 1, 'strategy_id': '3'}, {'session_id': 2, 'strategy_id': '4'}],
+            [{'session_id': 2, 'teacher_id': '7'}],
+            [{'session_id': 1, 'student_id': '8'}, {'session_id': 1, 'student_id': '9'}],
+            [],
+            [{'id': 5, 'session_id': 2, 'student_id': '8', 'score': 10}],
+            [],
+        ]
+
+        sessions = load_session_details(self.conn, [2, 1, 99])
+
+        self.assertEqual(self.cur.execute.call_count, 7)
+        self.assertEqual([s['id'] for s in sessions], [2, 1])
+        second, first = sessions
+        self.assertEqual(first['strategies'], ['3'])
+        self.assertEqual(first['students'], ['8', '9'])
+        self.assertEqual(first['executed_indices'], [0, 1])
+        self.assertEqual(second['teachers'], ['7'])
+        self.assertEqual(second['executed_indices'], [])
+        self.assertEqual(second['verified_answers'], [{'id': 5, 'session_id': 2, 'student_id': '8', 'score': 10}])
+        self.assertEqual(first['domains'], [])
+
+    def test_missing_session_stops_after_first_query(self):
+        self.cur.fetchall.return_value = []
+
+        self.assertIsNone(get_session_details(self.conn, 1))
+        self.assertEqual(self.cur.execute.call_count, 1)
+
+    def test_empty_id_list_runs_no_query(self):
+        self.assertEqual(load_session_details(self.conn, []), [])
+        self.cur.execute.assert_not_called()
+
+
+class TestSparseFields(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cur = MagicMock()
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+
+    def test_parse_fields(self):
+        self.assertIsNone(parse_session_fields(None, ''))
+        fields = parse_session_fields('current_tactic_index, code,status', None)
+        self.assertEqual(fields.columns, ('id', 'status', 'code', 'current_tactic_index', 'version'))
+        self.assertEqual(fields.children, ())
+        # Só include: todas as colunas e apenas os filhos pedidos
+        fields = parse_session_fields(None, 'teachers')
+        self.assertIn('rating_average', fields.columns)
+        self.assertEqual(fields.children, ('teachers',))
+        with self.assertRaises(InvalidFields):
+            parse_session_fields('status', 'code')  # coluna não é filho
+        with self.assertRaises(InvalidFields):
+            parse_session_fields('status; DROP TABLE session', None)
+
+    def test_selects_only_requested_columns_and_children(self):
+        self.cur.fetchall.side_effect = [
+            [{'id': 1, 'version': 3, 'status': 'finished', 'use_agent': None}],
+            [{'session_id': 1, 'student_id': '8'}],
+        ]
+        fields = parse_session_fields('status,use_agent', 'students')
+
+        session, = load_session_details(self.conn, [1], fields)
+
+        self.assertEqual(self.cur.execute.call_count, 2)
+        self.assertEqual(self.cur.execute.call_args_list[0][0][0],
+                         "SELECT id, status, use_agent, version FROM session WHERE id = ANY(%s)")
+        self.assertIn("session_students", self.cur.execute.call_args_list[1][0][0])
+        self.assertEqual(session, {'id': 1, 'version': 3, 'status': 'finished', 'use_agent': None,
+                                   'students': ['8']})
+
+
+class TestCachedSessionLoader(unittest.TestCase):
+    def setUp(self):
+        self.cache = LocalLRUCache()
+        patcher = patch('control.app.services.session_loader.get_session_cache', return_value=self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.conn = MagicMock()
+
+    @patch('control.app.services.session_loader.load_session_details')
+    def test_loads_only_misses_and_stale_entries_in_one_batch(self, mock_load):
+        self.cache.set(1, {'id': 1, 'version': 2})
+        self.cache.set(2, {'id': 2, 'version': 1})
+        mock_load.return_value = [{'id': 2, 'version': 2}, {'id': 3, 'version': 1}]
+
+        sessions = load_session_details_cached(self.conn, [(1, 2), (2, 2), (3, 1)])
+
+        mock_load.assert_called_once_with(self.conn, [2, 3])
+        self.assertEqual(sessions, [{'id': 1, 'version': 2}, {'id': 2, 'version': 2}, {'id': 3, 'version': 1}])
+        self.assertEqual(self.cache.get(3), {'id': 3, 'version': 1})
+
+    @patch('control.app.services.session_loader.load_session_details')
+    def test_invalidation_forces_reload(self, mock_load):
+        self.cache.set(1, {'id': 1, 'version': 2})
+        invalidate_sessions('1')
+        mock_load.return_value = [{'id': 1, 'version': 2}]
+
+        load_session_details_cached(self.conn, [(1, 2)])
+
+        mock_load.assert_called_once_with(self.conn, [1])
+
+    @patch('control.app.services.session_loader.load_session_details')
+    def test_sparse_reads_project_cached_documents_and_never_store(self, mock_load):
+        self.cache.set(1, {'id': 1, 'version': 2, 'status': 'finished', 'code': 'A', 'students': ['8']})
+        mock_load.return_value = [{'id': 2, 'version': 1, 'status': 'aguardando'}]
+        fields = parse_session_fields('status', None)
+
+        sessions = load_session_details_cached(self.conn, [(1, 2), (2, 1)], fields)
+
+        mock_load.assert_called_once_with(self.conn, [2], fields)
+        self.assertEqual(sessions, [{'id': 1, 'version': 2, 'status': 'finished'},
+                                    {'id': 2, 'version': 1, 'status': 'aguardando'}])
+        self.assertIsNone(self.cache.get(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,463 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from control.app.routes.session_routes import session_bp
+
+
+class SessionRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.register_blueprint(session_bp)
+        self.client = self.app.test_client()
+
+        patcher = patch('control.app.routes.session_routes.get_db_connection')
+        mock_get_db_conn = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.conn = MagicMock()
+        self.cur = MagicMock()
+        mock_get_db_conn.return_value.__enter__.return_value = self.conn
+        self.conn.cursor.return_value.__enter__.return_value = self.cur
+
+
+class TestListSessions(SessionRoutesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cur.fetchone.return_value = {'total': 3, 'versions': 9, 'max_id': 13}
+
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_keyset_page_returns_next_cursor(self, mock_load):
+        self.cur.fetchall.return_value = [{'id': 11, 'version': 1}, {'id': 12, 'version': 1}, {'id': 13, 'version': 1}]
+        mock_load.side_effect = lambda conn, versions, fields=None: [{'id': i} for i, _ in versions]
+
+        response = self.client.get('/sessions?after_id=10&limit=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"sessions": [{'id': 11}, {'id': 12}], "next_cursor": 12})
+        self.cur.execute.assert_any_call(
+            "SELECT id, version FROM session WHERE id > %s ORDER BY id LIMIT %s", (10, 3))
+
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_last_page_has_no_cursor(self, mock_load):
+        self.cur.fetchall.return_value = [{'id': 11, 'version': 1}]
+        mock_load.side_effect = lambda conn, versions, fields=None: [{'id': i} for i, _ in versions]
+
+        response = self.client.get('/sessions?after_id=10&limit=2')
+
+        self.assertIsNone(response.json['next_cursor'])
+
+    def test_rejects_non_integer_cursor(self):
+        response = self.client.get('/sessions?after_id=abc')
+        self.assertEqual(response.status_code, 400)
+
+    @patch('control.app.routes.session_routes.load_session_details')
+    def test_ndjson_stream_uses_named_cursor(self, mock_load):
+        self.cur.fetchmany.side_effect = [[{'id': 1}, {'id': 2}], []]
+        mock_load.side_effect = lambda conn, ids, fields=None: [{'id': i} for i in ids]
+
+        response = self.client.get('/sessions?format=ndjson')
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'id': 1}, {'id': 2}])
+        self.conn.cursor.assert_any_call(name='list_sessions_stream')
+
+
+class TestConditionalGet(SessionRoutesTestCase):
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_session_matching_etag_skips_full_load(self, mock_details):
+        self.cur.fetchone.return_value = {'version': 4}
+
+        response = self.client.get('/sessions/1', headers={'If-None-Match': '"s1-v4"'})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], '"s1-v4"')
+        mock_details.assert_not_called()
+
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_session_stale_etag_returns_body_with_new_tag(self, mock_details):
+        self.cur.fetchone.return_value = {'version': 5}
+        mock_details.return_value = [{'id': 1, 'version': 5}]
+
+        response = self.client.get('/sessions/1', headers={'If-None-Match': '"s1-v4"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], '"s1-v5"')
+
+    def test_unknown_session_is_404(self):
+        self.cur.fetchone.return_value = None
+
+        response = self.client.get('/sessions/1')
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_list_matching_etag_skips_load(self, mock_load):
+        self.cur.fetchone.return_value = {'total': 2, 'versions': 7, 'max_id': 2}
+
+        response = self.client.get('/sessions', headers={'If-None-Match': '"l2-7-2"'})
+
+        self.assertEqual(response.status_code, 304)
+        mock_load.assert_not_called()
+
+
+class TestSparseFieldsets(SessionRoutesTestCase):
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_fields_are_passed_to_loader_and_vary_the_etag(self, mock_details):
+        self.cur.fetchone.return_value = {'version': 4}
+        mock_details.return_value = [{'id': 1, 'version': 4, 'status': 'aguardando'}]
+
+        response = self.client.get('/sessions/1?fields=status,code&include=students')
+
+        self.assertEqual(response.status_code, 200)
+        fields = mock_details.call_args[0][2]
+        self.assertEqual(fields.columns, ('id', 'status', 'code', 'version'))
+        self.assertEqual(fields.children, ('students',))
+        etag = response.headers['ETag'].strip('"')
+        self.assertTrue(etag.startswith('s1-v4-f'))
+
+        # A ETag do documento completo não vale para a projeção
+        response = self.client.get('/sessions/1?fields=status,code&include=students',
+                                   headers={'If-None-Match': '"s1-v4"'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/sessions/1?include=students&fields=code,status',
+                                   headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_field_is_400(self):
+        response = self.client.get('/sessions/1?fields=status,password')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json['error'])
+        self.cur.execute.assert_not_called()
+
+    @patch('control.app.routes.session_routes.load_session_details_cached')
+    def test_list_sessions_with_fields(self, mock_load):
+        self.cur.fetchone.return_value = {'total': 1, 'versions': 1, 'max_id': 1}
+        self.cur.fetchall.return_value = [{'id': 1, 'version': 1}]
+        mock_load.return_value = [{'id': 1, 'version': 1, 'status': 'finished'}]
+
+        response = self.client.get('/sessions?fields=status')
+
+        self.assertEqual(response.json, [{'id': 1, 'version': 1, 'status': 'finished'}])
+        self.assertEqual(mock_load.call_args[0][2].children, ())
+        self.assertIn('-f', response.headers['ETag'])
+
+
+class TestCreateSessionsBatch(SessionRoutesTestCase):
+    @patch('control.app.routes.session_routes.generate_unique_code')
+    @patch('control.app.routes.session_routes.execute_values')
+    def test_inserts_all_sessions_in_one_transaction(self, mock_execute_values, mock_code):
+        mock_code.side_effect = ['AAAA1111', 'BBBB2222']
+        mock_execute_values.side_effect = lambda cur, sql, rows, **kw: (
+            [{'id': 100 + i, 'code': row[1]} for i, row in enumerate(rows)] if kw.get('fetch') else None)
+
+        response = self.client.post('/sessions/create_batch', json={"sessions": [
+            {"strategies": [1], "students": [5, 6]},
+            {"strategies": [2], "teachers": [9]},
+        ]})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([s['id'] for s in response.json['sessions']], [100, 101])
+        inserts = {call[0][1].split()[2]: call[0][2] for call in mock_execute_values.call_args_list[1:]}
+        self.assertEqual(inserts['session_strategies'], [(100, '1'), (101, '2')])
+        self.assertEqual(inserts['session_students'], [(100, '5'), (100, '6')])
+        self.assertEqual(inserts['session_teachers'], [(101, '9')])
+        self.assertNotIn('session_domains', inserts)
+        self.conn.commit.assert_called_once()
+
+    @patch('control.app.routes.session_routes.generate_unique_code')
+    @patch('control.app.routes.session_routes.execute_values')
+    def test_retries_only_codes_rejected_by_unique_constraint(self, mock_execute_values, mock_code):
+        mock_code.side_effect = ['TAKEN000', 'FREE0001', 'FREE0002']
+        mock_execute_values.side_effect = [
+            [{'id': 1, 'code': 'FREE0001'}],  # TAKEN000 hit ON CONFLICT DO NOTHING
+            [{'id': 2, 'code': 'FREE0002'}],
+            None,
+        ]
+
+        response = self.client.post('/sessions/create_batch', json=[{"strategies": [1]}, {"strategies": [2]}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(s['code'] for s in response.json['sessions']), ['FREE0001', 'FREE0002'])
+        retry_rows = mock_execute_values.call_args_list[1][0][2]
+        self.assertEqual(retry_rows, [('aguardando', 'FREE0002', 0)])
+        self.cur.execute.assert_not_called()  # no SELECT probes
+
+    def test_rejects_specs_without_strategies(self):
+        response = self.client.post('/sessions/create_batch', json=[{"strategies": [1]}, {"students": [2]}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['invalid_indexes'], [1])
+        self.conn.commit.assert_not_called()
+
+
+class TestTacticTransitions(SessionRoutesTestCase):
+    def test_next_tactic_is_one_statement(self):
+        self.cur.fetchone.return_value = {'current_tactic_index': 3, 'executed_indices': [0, 1, 2]}
+
+        response = self.client.post('/sessions/tactic/next/1')
+
+        self.assertEqual(response.json, {"success": True, "current_tactic_index": 3, "executed_indices": [0, 1, 2]})
+        self.assertEqual(self.cur.execute.call_count, 1)
+        sql = self.cur.execute.call_args[0][0]
+        self.assertIn("|| to_jsonb(COALESCE(current_tactic_index, 0))", sql)
+        self.assertIn("end_on_next_completion IS NOT TRUE", sql)
+        self.conn.commit.assert_called_once()
+
+    @patch('control.app.routes.session_routes._end_session')
+    def test_next_tactic_ends_session_when_flag_set(self, mock_end):
+        self.cur.fetchone.side_effect = [None, {'end_on_next_completion': True}]
+
+        response = self.client.post('/sessions/tactic/next/1')
+
+        self.assertEqual(response.json['session_status'], 'finished')
+        mock_end.assert_called_once_with(self.conn, 1)
+
+    def test_next_tactic_unknown_session(self):
+        self.cur.fetchone.return_value = None
+
+        response = self.client.post('/sessions/tactic/next/1')
+
+        self.assertEqual(response.status_code, 404)
+        self.conn.commit.assert_not_called()
+
+    def test_prev_tactic_clamps_in_sql(self):
+        self.cur.fetchone.return_value = {'current_tactic_index': 0, 'executed_indices': []}
+
+        response = self.client.post('/sessions/tactic/prev/1')
+
+        self.assertEqual(response.json['current_tactic_index'], 0)
+        self.assertIn("GREATEST(", self.cur.execute.call_args[0][0])
+
+    def test_set_tactic_requires_index(self):
+        response = self.client.post('/sessions/tactic/set/1', json={})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestRatings(SessionRoutesTestCase):
+    def test_rate_locks_session_then_updates_aggregates(self):
+        self.cur.fetchone.side_effect = [{'id': 1}, {'rating_average': 4.5, 'rating_count': 2}]
+
+        response = self.client.post('/sessions/1/rate', json={'student_id': 7, 'rating': 5})
+
+        self.assertEqual(response.json, {"success": True, "average": 4.5, "count": 2})
+        self.assertEqual(self.cur.execute.call_count, 2)
+        self.assertEqual(self.cur.execute.call_args_list[0].args,
+                         ("SELECT id FROM session WHERE id = %s FOR NO KEY UPDATE", (1,)))
+        sql, params = self.cur.execute.call_args[0]
+        self.assertNotIn("AVG(", sql)
+        self.assertEqual(params, {"session_id": 1, "student_ids": ['7'], "ratings": [5]})
+
+    def test_same_student_twice_reads_previous_vote_after_the_lock(self):
+        # Duplo clique: cada voto trava a sessão antes de calcular o delta contra o voto anterior
+        self.cur.fetchone.side_effect = [{'id': 1}, {'rating_average': 5.0, 'rating_count': 1},
+                                         {'id': 1}, {'rating_average': 5.0, 'rating_count': 1}]
+
+        first = self.client.post('/sessions/1/rate', json={'student_id': 7, 'rating': 5})
+        second = self.client.post('/sessions/1/rate', json={'student_id': 7, 'rating': 5})
+
+        self.assertEqual(first.json['count'], 1)
+        self.assertEqual(second.json['count'], 1)
+        statements = [c.args[0] for c in self.cur.execute.call_args_list]
+        self.assertEqual(len(statements), 4)
+        for lock, upsert in (statements[0:2], statements[2:4]):
+            self.assertIn("FOR NO KEY UPDATE", lock)
+            self.assertIn("previous AS", upsert)
+            self.assertNotIn("FOR UPDATE", upsert)
+        self.assertEqual(self.conn.commit.call_count, 2)
+
+    def test_rate_unknown_session(self):
+        self.cur.fetchone.return_value = None
+
+        response = self.client.post('/sessions/1/rate', json={'student_id': 7, 'rating': 5})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.cur.execute.call_count, 1)
+        self.conn.commit.assert_not_called()
+
+    def test_rate_batch_keeps_last_vote_per_student(self):
+        self.cur.fetchone.return_value = {'rating_average': 3.0, 'rating_count': 2}
+
+        response = self.client.post('/sessions/1/rate_batch', json={"ratings": [
+            {"student_id": 1, "rating": 5}, {"student_id": 2, "rating": 4}, {"student_id": 1, "rating": 2}]})
+
+        self.assertEqual(response.json['accepted'], 2)
+        params = self.cur.execute.call_args[0][1]
+        self.assertEqual(dict(zip(params['student_ids'], params['ratings'])), {'1': 2, '2': 4})
+
+    def test_rate_batch_rejects_invalid_items(self):
+        response = self.client.post('/sessions/1/rate_batch', json=[
+            {"student_id": 1, "rating": 9}, {"rating": 3}, {"student_id": 2, "rating": 3}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['invalid_indexes'], [0, 1])
+        self.cur.execute.assert_not_called()
+
+
+class TestUpsertWrites(SessionRoutesTestCase):
+    ANSWER = {'student_id': 8, 'student_name': 'Ana', 'session_id': 1, 'answers': [1, 2], 'score': 7}
+
+    def _sql(self):
+        return [c.args[0] for c in self.cur.execute.call_args_list]
+
+    @patch('control.app.routes.session_routes.record_score')
+    def test_submit_answer_inserts_without_prior_select(self, mock_record_score):
+        self.cur.fetchone.return_value = {'id': 30}
+
+        response = self.client.post('/sessions/submit_answer', json=self.ANSWER)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ON CONFLICT (session_id, student_id) DO NOTHING", self._sql()[0])
+        self.assertFalse(any(sql.lstrip().startswith("SELECT") for sql in self._sql()))
+        mock_record_score.assert_called_once_with(self.cur, 1, 7)
+        self.conn.commit.assert_called_once()
+
+    @patch('control.app.routes.session_routes.record_score')
+    def test_submit_answer_normalises_string_session_id(self, mock_record_score):
+        self.cur.fetchone.return_value = {'id': 30}
+
+        response = self.client.post('/sessions/submit_answer', json=dict(self.ANSWER, session_id="5"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cur.execute.call_args_list[0].args[1][-1], 5)
+        mock_record_score.assert_called_once_with(self.cur, 5, 7)
+        bump_sql, bump_params = self.cur.execute.call_args_list[-1].args
+        self.assertIn("ANY(%s::int[])", bump_sql)
+        self.assertEqual(bump_params, ([5],))
+
+    def test_submit_answer_conflict_is_409(self):
+        self.cur.fetchone.return_value = None
+
+        response = self.client.post('/sessions/submit_answer', json=self.ANSWER)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.cur.execute.call_count, 1)
+        self.conn.commit.assert_not_called()
+
+    def test_extra_notes_insert_and_update_keep_responses(self):
+        note = {'session_id': 1, 'student_id': 8, 'estudante_username': 'ana', 'extra_notes': 9.5}
+
+        self.cur.fetchone.return_value = {'inserted': True}
+        response = self.client.post('/sessions/add_extra_notes', json=note)
+        self.assertEqual((response.status_code, response.json), (201, {"message": "Extra notes added successfully"}))
+
+        self.cur.fetchone.return_value = {'inserted': False}
+        response = self.client.post('/sessions/add_extra_notes', json=note)
+        self.assertEqual((response.status_code, response.json), (200, {"message": "Extra notes updated successfully"}))
+        self.assertIn("ON CONFLICT (session_id, estudante_username) DO UPDATE", self._sql()[0])
+
+    def test_enter_session_is_one_statement(self):
+        self.cur.fetchone.return_value = {'id': 4, 'inserted': True}
+
+        response = self.client.post('/sessions/enter', json={'session_code': 'AB12', 'requester_id': 8, 'type': 'student'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cur.execute.call_count, 1)
+        sql, params = self.cur.execute.call_args.args
+        self.assertIn("INSERT INTO session_students", sql)
+        self.assertEqual(params, {"code": "AB12", "requester_id": "8"})
+        self.conn.commit.assert_called_once()
+
+    def test_enter_session_already_enrolled_or_unknown(self):
+        self.cur.fetchone.return_value = {'id': 4, 'inserted': False}
+        response = self.client.post('/sessions/enter', json={'session_code': 'AB12', 'requester_id': 3, 'type': 'teacher'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("INSERT INTO session_teachers", self.cur.execute.call_args.args[0])
+        self.conn.commit.assert_not_called()
+
+        self.cur.fetchone.return_value = None
+        response = self.client.post('/sessions/enter', json={'session_code': 'ZZ', 'requester_id': 3, 'type': 'teacher'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestSubmitAnswersBatch(SessionRoutesTestCase):
+    @patch('control.app.routes.session_routes.insert_answers')
+    def test_per_record_status_in_one_transaction(self, mock_insert):
+        mock_insert.return_value = ({(1, '8'): 'inserted', (1, '9'): 'duplicate', (2, '7'): 'session_not_found'}, [1])
+
+        response = self.client.post('/sessions/submit_answers', json={"answers": [
+            {'student_id': 8, 'student_name': 'Ana', 'session_id': 1, 'answers': [1], 'score': 9},
+            {'student_id': 9, 'student_name': 'Bia', 'session_id': 1, 'answers': [2], 'score': 4},
+            {'student_id': 8, 'student_name': 'Ana', 'session_id': 1, 'answers': [3], 'score': 1},
+            {'student_id': 7, 'student_name': 'Caio', 'session_id': 2, 'answers': [], 'score': 5},
+            {'student_id': 6, 'session_id': 1},
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.json['results']],
+                         ['inserted', 'duplicate', 'duplicate', 'session_not_found', 'invalid'])
+        self.assertEqual((response.json['inserted'], response.json['duplicate']), (1, 2))
+
+        mock_insert.assert_called_once()
+        self.assertEqual(list(mock_insert.call_args.args[1]), [(1, '8'), (1, '9'), (2, '7')])
+        self.conn.commit.assert_called_once()
+
+    @patch('control.app.routes.session_routes.insert_answers')
+    def test_records_that_do_not_fit_the_columns_are_invalid(self, mock_insert):
+        mock_insert.return_value = ({(1, '8'): 'inserted'}, [1])
+
+        response = self.client.post('/sessions/submit_answers', json=[
+            {'student_id': 8, 'student_name': 'Ana', 'session_id': 1, 'answers': [1], 'score': 9},
+            {'student_id': 'x' * 51, 'student_name': 'Bia', 'session_id': 1, 'answers': [], 'score': 4},
+            {'student_id': 9, 'student_name': 'B' * 101, 'session_id': 1, 'answers': [], 'score': 4},
+            {'student_id': 10, 'student_name': 'Caio', 'session_id': 1, 'answers': [], 'score': 2 ** 31},
+            {'student_id': 11, 'student_name': 'Dani', 'session_id': 2 ** 31, 'answers': []},
+        ])
+
+        self.assertEqual([r['status'] for r in response.json['results']],
+                         ['inserted', 'invalid', 'invalid', 'invalid', 'invalid'])
+        self.assertEqual(list(mock_insert.call_args.args[1]), [(1, '8')])
+        self.conn.commit.assert_called_once()
+
+    @patch('control.app.routes.session_routes.insert_answers', return_value=({}, []))
+    def test_nothing_valid_commits_nothing(self, mock_insert):
+        response = self.client.post('/sessions/submit_answers', json=[{'student_id': 1}])
+
+        self.assertEqual(response.json['invalid'], 1)
+        self.conn.commit.assert_not_called()
+
+    def test_rejects_empty_batch(self):
+        self.assertEqual(self.client.post('/sessions/submit_answers', json=[]).status_code, 400)
+
+
+class TestSubmitAnswerWriteBehind(SessionRoutesTestCase):
+    ANSWER = {'student_id': 8, 'student_name': 'Ana', 'session_id': 1, 'answers': [1, 2], 'score': 7}
+
+    def setUp(self):
+        super().setUp()
+        self.app.config['ANSWER_WRITE_BEHIND'] = True
+        patcher = patch('control.app.routes.session_routes.get_answer_buffer')
+        self.buffer = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_acknowledges_after_group_commit(self):
+        self.buffer.submit.return_value.result.return_value = 'inserted'
+
+        response = self.client.post('/sessions/submit_answer', json=self.ANSWER)
+
+        self.assertEqual((response.status_code, response.json), (200, self.ANSWER))
+        self.assertEqual(self.buffer.submit.call_args.args[:2], (1, '8'))
+        self.cur.execute.assert_not_called()
+
+    def test_record_that_does_not_fit_never_reaches_the_buffer(self):
+        response = self.client.post('/sessions/submit_answer', json=dict(self.ANSWER, student_name='A' * 101))
+
+        self.assertEqual(response.status_code, 400)
+        self.buffer.submit.assert_not_called()
+
+    def test_maps_statuses_and_back_pressure(self):
+        from control.app.services.answer_writes import AnswerBufferFull
+
+        self.buffer.submit.return_value.result.return_value = 'duplicate'
+        self.assertEqual(self.client.post('/sessions/submit_answer', json=self.ANSWER).status_code, 409)
+
+        self.buffer.submit.side_effect = AnswerBufferFull("full")
+        response = self.client.post('/sessions/submit_answer', json=self.ANSWER)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from control.app.services.session_stats import bucket_label, performance_digest, record_scores, score_bucket
+
+
+class TestSessionStats(unittest.TestCase):
+    @patch('control.app.services.session_stats.execute_values')
+    def test_record_scores_aggregates_per_session_in_one_statement(self, mock_execute_values):
+        record_scores(MagicMock(), [(4, '70'), (5, 100), (4, 35)])
+
+        mock_execute_values.assert_called_once()
+        rows = mock_execute_values.call_args.args[2]
+        self.assertEqual(rows, [
+            (4, 2, 105, 6125, 35, 70, [0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0], 0),
+            (5, 1, 100, 10000, 100, 100, [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1], 0),
+        ])
+
+    @patch('control.app.services.session_stats.execute_values')
+    def test_no_scores_no_statement(self, mock_execute_values):
+        record_scores(MagicMock(), [])
+        mock_execute_values.assert_not_called()
+
+    @patch('control.app.services.session_stats.execute_values')
+    def test_rows_are_locked_in_session_id_order(self, mock_execute_values):
+        record_scores(MagicMock(), [(9, 10), (2, 20), (5, 30), (2, 40)])
+
+        self.assertEqual([row[0] for row in mock_execute_values.call_args.args[2]], [2, 5, 9])
+
+    def test_buckets_span_0_to_100(self):
+        # seed.sql: 1 de 2 acertos = 50
+        self.assertEqual([score_bucket(s) for s in (0, 9, 10, 50, 99, 100)], [0, 0, 1, 5, 9, 10])
+        self.assertEqual((bucket_label(0), bucket_label(5), bucket_label(10)), ("0-9", "50-59", "100"))
+
+    @patch('control.app.services.session_stats.execute_values')
+    def test_out_of_range_scores_go_to_the_edges_and_are_counted(self, mock_execute_values):
+        self.assertEqual((score_bucket(-3), score_bucket(142)), (0, 10))
+
+        with self.assertLogs(level='WARNING'):
+            record_scores(MagicMock(), [(1, -3), (1, 142), (1, 50)])
+
+        row, = mock_execute_values.call_args.args[2]
+        self.assertEqual(row[6], [1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+        self.assertEqual(row[7], 2)
+
+    def test_digest_from_aggregates(self):
+        digest = performance_digest({
+            'score_count': 4, 'score_sum': 280, 'score_sumsq': 20600, 'score_min': 50, 'score_max': 90,
+            'score_histogram': [0, 0, 0, 0, 0, 1, 0, 1, 1, 1, 0], 'score_out_of_range': 0,
+            'extra_count': 0, 'extra_sum': 0, 'extra_sumsq': 0,
+        })
+
+        self.assertEqual(digest['scores']['avg'], 70.0)
+        self.assertAlmostEqual(digest['scores']['stddev'], 15.811, places=2)
+        self.assertEqual(digest['scores']['histogram'], {"50-59": 1, "70-79": 1, "80-89": 1, "90-99": 1})
+        self.assertEqual(digest['scores']['out_of_range'], 0)
+        self.assertEqual(digest['extras'], {"count": 0, "avg": 0, "stddev": 0, "min": None, "max": None})
+
+    def test_digest_of_session_without_stats_row(self):
+        digest = performance_digest({'score_count': None, 'score_histogram': None})
+
+        self.assertEqual((digest['scores']['count'], digest['scores']['histogram']), (0, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Orçamento do import de wsgi.py (cold start do Vercel); ajustável para máquinas lentas
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", 1500))
+LAZY_MODULES = ("openai", "httpx", "sqlalchemy", "flask_sqlalchemy")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import wsgi
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({"elapsed_ms": elapsed_ms, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def run_python(code, **env_overrides):
+    env = dict(os.environ, AUTO_MIGRATE="0", SQLALCHEMY_ENABLED="0", PYTHONDONTWRITEBYTECODE="1")
+    env.update(env_overrides)
+    env.pop("PYTHONPATH", None)
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+def run_probe(code):
+    out = run_python(code)
+    out.check_returncode()
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+class TestColdStart(unittest.TestCase):
+    def test_wsgi_import_skips_llm_client_and_sqlalchemy(self):
+        result = run_probe(PROBE)
+        self.assertEqual(result["loaded"], [])
+
+    def test_wsgi_import_within_budget(self):
+        # Melhor de 3: o primeiro import pode pagar o disco frio
+        elapsed = min(run_probe(PROBE)["elapsed_ms"] for _ in range(3))
+        self.assertLess(elapsed, IMPORT_BUDGET_MS,
+                        f"import wsgi took {elapsed:.0f}ms (budget {IMPORT_BUDGET_MS:.0f}ms)")
+
+    def test_sqlalchemy_still_available_on_demand(self):
+        result = run_probe(
+            "import json, sys\n"
+            "from app import db\n"
+            "print(json.dumps({'type': type(db).__name__, 'loaded': 'flask_sqlalchemy' in sys.modules}))"
+        )
+        self.assertEqual(result, {"type": "SQLAlchemy", "loaded": True})
+
+
+class TestStartupMigrations(unittest.TestCase):
+    def test_failed_migration_aborts_startup(self):
+        # Porta 1: conexão recusada na hora, as migrations não podem rodar
+        out = run_python("import wsgi", AUTO_MIGRATE="1", DATABASE_URL="postgresql://user@127.0.0.1:1/db",
+                         DB_POOL_TIMEOUT="1")
+
+        self.assertNotEqual(out.returncode, 0)
+        self.assertIn("Startup migrations failed", out.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()